@@ -0,0 +1,122 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+"""Time RankSeries analytics on a synthetic per-minute rank history against scalar baselines.
+
+    python benchmarks/bench_analytics.py --years 3
+"""
+
+import argparse
+import bisect
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from data_management.analytics import RankSeries
+from data_management.history_store import RankHistoryStore
+
+DAY = 24 * 3600
+LOOKBACK_DAYS = [1, 2, 3, 4, 5, 6, 7, 30, 60, 90, 180, 365]
+
+def synthetic_series(years, seed=7):
+    """Per-minute ranks: a slow random walk plus daily seasonality, clipped to 1..200."""
+    rng = np.random.default_rng(seed)
+    count = int(years * 365 * 24 * 60)
+    ts = 1_600_000_000 + np.arange(count, dtype=np.int64) * 60
+    walk = np.cumsum(rng.normal(0, 0.05, count))
+    daily = 5 * np.sin(2 * np.pi * (ts % DAY) / DAY)
+    ranks = np.clip(np.round(60 + walk + daily), 1, 200).astype(np.int16)
+    prices = 30_000 + np.cumsum(rng.normal(0, 15, count)) - 40 * walk
+    return ts, ranks, prices
+
+def timed(function, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+def python_rolling_mean(ts, ranks, window):
+    samples, total, means = deque(), 0, []
+    for t, rank in zip(ts, ranks):
+        samples.append((t, rank))
+        total += rank
+        while samples[0][0] <= t - window:
+            total -= samples.popleft()[1]
+        means.append(total / len(samples))
+    return means
+
+def python_drawdown(ranks):
+    best, deepest = None, 0
+    for rank in ranks:
+        best = rank if best is None or rank < best else best
+        deepest = max(deepest, rank - best)
+    return deepest
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--skip-sqlite', action='store_true', help="Skip loading the series into SQLite")
+    args = parser.parse_args()
+
+    ts, ranks, prices = synthetic_series(args.years)
+    series = RankSeries(ts, ranks)
+    now = int(ts[-1])
+    targets = [now - days * DAY for days in LOOKBACK_DAYS]
+    ts_list, ranks_list = ts.tolist(), ranks.tolist()
+    print(f"{len(series):,} samples ({args.years:g} years per minute), "
+          f"{series.ts.nbytes / 2**20 + series.ranks.nbytes / 2**20:.1f} MiB as arrays\n")
+
+    rows = []
+    baseline_ms, expected = timed(lambda: [ranks_list[bisect.bisect_right(ts_list, t) - 1] for t in targets])
+    vector_ms, result = timed(lambda: series.lookback(targets))
+    assert result.tolist() == expected
+    rows.append(("12 lookbacks", 'bisect on lists', baseline_ms, vector_ms))
+
+    if not args.skip_sqlite:
+        with tempfile.TemporaryDirectory() as directory:
+            store = RankHistoryStore(os.path.join(directory, 'bench.db'))
+            store.add_samples('bench', zip(ts_list, ranks_list))
+            sqlite_ms, expected = timed(lambda: [store.rank_at('bench', t)[1] for t in targets])
+            load_ms, loaded = timed(lambda: RankSeries.load('bench', store=store), repeat=1)
+            store.close()
+        assert expected == result.tolist() and len(loaded) == len(series)
+        rows.append(("12 lookbacks", 'SQLite rank_at x12', sqlite_ms, vector_ms))
+        print(f"Loading the series from SQLite: {load_ms:.0f} ms\n")
+
+    recent = series.between(now - 90 * DAY)
+    baseline_ms, expected = timed(lambda: python_rolling_mean(recent.ts.tolist(), recent.ranks.tolist(), DAY), repeat=1)
+    vector_ms, (mean, _) = timed(lambda: recent.rolling(DAY))
+    assert np.allclose(mean, expected)
+    rows.append(("24h rolling mean, 90d", 'deque loop', baseline_ms, vector_ms))
+
+    baseline_ms, expected = timed(lambda: python_drawdown(ranks_list), repeat=1)
+    vector_ms, result = timed(lambda: series.max_drawdown())
+    assert result[0] == expected
+    rows.append(("max drawdown", 'python loop', baseline_ms, vector_ms))
+
+    vector_ms, correlation = timed(lambda: series.correlation(ts, prices))
+    rows.append(("rank/BTC correlation", '-', float('nan'), vector_ms))
+    vector_ms, _ = timed(lambda: series.percentiles())
+    rows.append(("percentiles", '-', float('nan'), vector_ms))
+
+    print(f"{'operation':<24}{'baseline':<20}{'baseline ms':>12}{'numpy ms':>10}{'speedup':>9}")
+    for operation, baseline, baseline_ms, vector_ms in rows:
+        speedup = f"{baseline_ms / vector_ms:>8.0f}x" if baseline_ms == baseline_ms else f"{'':>9}"
+        print(f"{operation:<24}{baseline:<20}{baseline_ms:>12.2f}{vector_ms:>10.2f}{speedup}")
+    print(f"\nrank/BTC correlation: {correlation:.3f}")
+
+if __name__ == "__main__":
+    main()
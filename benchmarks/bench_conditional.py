@@ -0,0 +1,117 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+"""Compare unconditional scrapes with scrape_rank's conditional requests and region hashing.
+
+The stub server moves the rank every --change-every requests. With --validators it
+answers If-None-Match/If-Modified-Since with 304; without, every page carries a
+fresh nonce (like a real App Store page), so only the rank-region hash can skip parsing.
+
+    python benchmarks/bench_conditional.py --requests 300 --change-every 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from email.utils import formatdate
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from api.apps import scrape_rank
+from api.conditional import conditional_pages
+from api.extractors import extract_rank
+from api.http_client import http_client
+
+def page(rank, nonce):
+    return ('<html><head><meta name="request-id" content="' + nonce + '"></head><body>' + 'x' * 200_000 +
+            '<a href="https://apps.apple.com/us/charts/iphone/finance-apps/6015" class="inline-list__item">'
+            f'No. {rank} in Finance</a></body></html>')
+
+class StubServer:
+    def __init__(self, change_every, validators):
+        self.change_every = change_every
+        self.validators = validators
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+
+    def version(self):
+        return self.requests // self.change_every
+
+    async def handle(self, request):
+        version = self.version()
+        self.requests += 1
+        etag = f'"v{version}"'
+        last_modified = formatdate(1_700_000_000 + version * 60, usegmt=True)
+        if self.validators and request.headers.get('If-None-Match') == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={'ETag': etag, 'Last-Modified': last_modified})
+        body = page(10 + version % 50, str(self.requests))
+        self.bytes_sent += len(body)
+        headers = {'ETag': etag, 'Last-Modified': last_modified} if self.validators else {}
+        return web.Response(text=body, content_type='text/html', headers=headers)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/us/app/stub/id1"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+async def unconditional(url):
+    response = await http_client.fetch_text(url)
+    return await extract_rank(response.text)
+
+async def run_mode(name, scrape, total, change_every, validators):
+    server = StubServer(change_every, validators)
+    url = await server.start()
+    # Each mode gets fresh validators, so earlier runs cannot produce 304s.
+    conditional_pages._pages.clear()
+    parsed_before = conditional_pages.stats.parsed
+    try:
+        ranks = []
+        start = time.perf_counter()
+        for _ in range(total):
+            expected = 10 + server.version() % 50
+            rank = await scrape(url)
+            assert rank == expected, (rank, expected)
+            ranks.append(rank)
+        elapsed = time.perf_counter() - start
+    finally:
+        await server.stop()
+    parsed = conditional_pages.stats.parsed - parsed_before if scrape is not unconditional else total
+    print(f"{name:<28} {elapsed * 1000 / total:7.2f} ms/scrape  {server.bytes_sent / 2**20:7.1f} MiB sent  "
+          f"304s={server.not_modified:>4}  parses={parsed:>4}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--change-every', type=int, default=20, help="Requests between rank changes")
+    args = parser.parse_args()
+
+    await http_client.start()
+    try:
+        await run_mode("unconditional", unconditional, args.requests, args.change_every, True)
+        await run_mode("conditional (304s)", scrape_rank, args.requests, args.change_every, True)
+        await run_mode("region hash (no validators)", scrape_rank, args.requests, args.change_every, False)
+    finally:
+        await http_client.close()
+    print(f"\nscrape stats: {conditional_pages.stats.as_dict()}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+"""Compare rank extractors on the fixture corpus: correctness, parse time and peak memory per page.
+
+    python benchmarks/bench_extractors.py --pad-kb 1000 --repeat 5
+"""
+
+import argparse
+import glob
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bs4 import BeautifulSoup
+
+from api.extractors import RegexRankExtractor, SoupRankExtractor, SelectolaxRankExtractor, ChainedRankExtractor, rank_region
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+FILLER = ('<div class="we-customer-review lockup"><h3 class="we-truncate">Great app</h3>'
+          '<p dir="ltr" data-test-bidi>Easy to use, fast transfers, in the top charts.</p></div>\n')
+
+class FullSoupExtractor:
+    """The original implementation: a full html.parser DOM and a lambda-filtered find."""
+
+    name = 'full-soup (baseline)'
+
+    def extract(self, page, category='Finance'):
+        soup = BeautifulSoup(page, 'html.parser')
+        rank_element = soup.find('a', class_='inline-list__item', href=True, string=lambda t: t and f'in {category}' in t)
+        if rank_element:
+            return int(''.join(filter(str.isdigit, rank_element.get_text(strip=True))))
+        return None
+
+def load_corpus(pad_kb):
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, '*.html'))):
+        with open(path, 'r', encoding='utf-8') as file:
+            page = file.read()
+        # Reviews and scripts follow the header on a live page, so padding goes after it.
+        padding = FILLER * max(0, pad_kb * 1024 // len(FILLER))
+        page = page.replace('</main>', padding + '</main>')
+        match = re.search(r'_rank_(\d+|none)', os.path.basename(path))
+        expected = None if match.group(1) == 'none' else int(match.group(1))
+        corpus.append((os.path.basename(path), page, expected))
+    return corpus
+
+def measure(extractor, corpus, repeat):
+    timings, peaks, failures = [], [], []
+    for name, page, expected in corpus:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rank = extractor.extract(page)
+            timings.append((time.perf_counter() - start) * 1000)
+        tracemalloc.start()
+        extractor.extract(page)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+        if rank != expected:
+            failures.append(f"{name}: got {rank}, expected {expected}")
+    return timings, peaks, failures
+
+def check_regions(corpus):
+    """rank_region must hold the anchor the rank is read from, or its hash would miss rank changes."""
+    failures = []
+    for name, page, expected in corpus:
+        region = rank_region(page)
+        rank = RegexRankExtractor().extract(region) if region is not None else None
+        if rank != expected:
+            failures.append(f"{name}: rank_region gives {rank}, expected {expected}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pad-kb', type=int, default=1000, help="Filler added to each fixture page, in KiB")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.pad_kb)
+    extractors = [FullSoupExtractor(), SoupRankExtractor(), RegexRankExtractor()]
+    try:
+        extractors.append(SelectolaxRankExtractor())
+    except ImportError:
+        print("selectolax not installed, skipping it.")
+    extractors.append(ChainedRankExtractor([RegexRankExtractor(), SoupRankExtractor()]))
+
+    average_kb = statistics.mean(len(page) for _, page, _ in corpus) / 1024
+    print(f"{len(corpus)} pages, ~{average_kb:.0f} KiB each, {args.repeat} runs per page\n")
+    print(f"{'extractor':<24}{'p50 ms':>10}{'max ms':>10}{'peak KiB':>12}  result")
+    failed = False
+    for extractor in extractors:
+        timings, peaks, failures = measure(extractor, corpus, args.repeat)
+        status = 'ok' if not failures else f"{len(failures)} wrong"
+        failed = failed or bool(failures)
+        print(f"{extractor.name:<24}{statistics.median(timings):>10.2f}{max(timings):>10.2f}{max(peaks):>12.0f}  {status}")
+        for failure in failures:
+            print(f"    {failure}")
+    region_failures = check_regions(corpus)
+    print(f"\nrank_region: {'ok' if not region_failures else f'{len(region_failures)} wrong'}")
+    for failure in region_failures:
+        print(f"    {failure}")
+    sys.exit(1 if failed or region_failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+"""Compare a fresh aiohttp session per request with the pooled HttpClient.
+
+Runs against a local stub server, so no traffic reaches the App Store.
+
+    python benchmarks/bench_http_client.py --requests 400 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from api.http_client import HttpClient
+
+PAGE = ('<html><body>' + 'x' * 200_000 +
+        '<a href="https://apps.apple.com/us/charts/iphone/finance-apps/6015" class="inline-list__item">No. 3 in Finance</a>'
+        '</body></html>')
+
+class StubServer:
+    def __init__(self, latency):
+        self.latency = latency
+        self.connections = set()
+
+    async def handle(self, request):
+        self.connections.add(request.transport.get_extra_info('peername'))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.Response(text=PAGE, content_type='text/html')
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/us/app/stub/id1"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def run_mode(name, fetch, url, total, concurrency, server):
+    server.connections.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await fetch(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<16} connections={len(server.connections):>5}  p50={statistics.median(latencies):7.2f} ms  "
+          f"p99={percentile(latencies, 99):7.2f} ms  throughput={total / elapsed:8.1f} req/s")
+    return len(server.connections)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.005, help="Server-side delay per request, in seconds")
+    args = parser.parse_args()
+
+    server = StubServer(args.latency)
+    url = await server.start()
+
+    async def fresh_session(url):
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as response:
+                await response.text()
+
+    client = HttpClient(limit_per_host=args.concurrency)
+    await client.start()
+
+    try:
+        fresh = await run_mode("fresh session", fresh_session, url, args.requests, args.concurrency, server)
+        pooled = await run_mode("pooled client", client.get_text, url, args.requests, args.concurrency, server)
+        print(f"handshakes saved: {fresh - pooled} of {fresh} ({(fresh - pooled) / max(fresh, 1):.0%})")
+    finally:
+        await client.close()
+        await server.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+"""A Discord client that never connects: outbound calls are recorded instead of sent."""
+
+import asyncio
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timezone
+
+import discord
+from discord.ext import commands
+
+class Recorder:
+    """Outbound Discord calls, with the time each one was made."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.messages = 0
+        self.presences = []
+        self.queued = defaultdict(deque)
+        self.dm_latencies = []
+
+    def track(self, delivery):
+        """Note when each message is queued on delivery, so DMs can report queue-to-send latency."""
+        send = delivery.send
+
+        def tracked_send(user_id, build):
+            self.queued[user_id].append(time.perf_counter())
+            send(user_id, build)
+        delivery.send = tracked_send
+
+    def delivered(self, user_id, count):
+        queued, now = self.queued.get(user_id), time.perf_counter()
+        for _ in range(min(count, len(queued or ()))):
+            self.dm_latencies.append(now - queued.popleft())
+
+    async def call(self, kind, count=1):
+        self.calls[kind] += 1
+        self.messages += count if kind == 'dm' else 0
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+class FakeUser:
+    def __init__(self, user_id, recorder):
+        self.id = user_id
+        self.name = self.display_name = f"user{user_id}"
+        self.avatar = None
+        self.recorder = recorder
+
+    async def send(self, content=None, embeds=None, embed=None, files=None, file=None):
+        for attachment in (files or []) + ([file] if file else []):
+            attachment.close()
+        self.recorder.delivered(self.id, len(embeds or [embed]))
+        await self.recorder.call('dm', len(embeds or [embed]))
+
+class FakeBot(commands.Bot):
+    """commands.Bot with every network call replaced by the recorder.
+
+    Slash commands register on the real CommandTree, so their callbacks can be
+    invoked directly with FakeInteraction objects.
+    """
+
+    def __init__(self, recorder):
+        super().__init__(command_prefix='!', intents=discord.Intents.default())
+        self.recorder = recorder
+        self.fake_users = {}
+        self.loop = asyncio.get_running_loop()
+
+    def get_user(self, user_id):
+        if user_id not in self.fake_users:
+            self.fake_users[user_id] = FakeUser(user_id, self.recorder)
+        return self.fake_users[user_id]
+
+    async def fetch_user(self, user_id):
+        await self.recorder.call('fetch_user')
+        return self.get_user(user_id)
+
+    async def change_presence(self, *, activity=None, status=None):
+        self.recorder.presences.append((time.monotonic(), activity.name if activity else None))
+        await self.recorder.call('presence')
+
+class FakeCommand:
+    def __init__(self, name):
+        self.name = self.qualified_name = name
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self, ephemeral=False, thinking=False):
+        self._done = True
+        await self.interaction.recorder.call('defer')
+
+    async def send_message(self, content=None, embed=None, embeds=None, file=None, files=None, ephemeral=False, **kwargs):
+        self._done = True
+        await self.interaction.recorder.call('response')
+        self.interaction.finish('ephemeral' if ephemeral else 'message')
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, embed=None, ephemeral=False, **kwargs):
+        await self.interaction.recorder.call('followup')
+        self.interaction.finish('ephemeral' if ephemeral else 'followup')
+
+class FakeInteraction:
+    """Enough of discord.Interaction for the commands in commands.py.
+
+    finished records when the user would have seen the final answer: the first
+    message, or the edit of a deferred response.
+    """
+
+    def __init__(self, bot, user_id, command, guild_id=1):
+        self.client = bot
+        self.recorder = bot.recorder
+        self.user = bot.get_user(user_id)
+        self.guild_id = guild_id
+        self.command = FakeCommand(command)
+        self.created_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.finished = None
+        self.outcome = None
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    def finish(self, outcome):
+        if self.finished is None:
+            self.finished = time.perf_counter()
+            self.outcome = outcome
+
+    async def edit_original_response(self, content=None, embed=None, attachments=None, **kwargs):
+        for attachment in attachments or []:
+            attachment.close()
+        await self.recorder.call('edit')
+        self.finish('error' if content and content.startswith('🚨') else 'edited')
+
+    async def delete_original_response(self):
+        await self.recorder.call('delete')
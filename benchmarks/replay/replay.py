@@ -0,0 +1,321 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+"""Replay scripted App Store ranks through the bot without touching the App Store or Discord.
+
+A local stub serves product pages whose rank follows a fixed script per app (with
+optional latency and errors), and a fake Discord client records every DM, response
+and presence change. Each scenario runs in its own process and working directory:
+
+    commands       N concurrent slash commands from N users (rank, alerts, ranking-data, ...)
+    alerts         RankTracker.run with N stored alerts until the rank script has been replayed
+    notifications  RankTracker.run with N daily notifications due at the same minute
+
+    python benchmarks/replay/replay.py --scenario all --json results.json
+    python benchmarks/replay/replay.py --scenario alerts --alerts 100000 --latency 0.05 --error-rate 0.1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, '..', '..', 'src')
+sys.path.insert(0, HERE)
+sys.path.insert(0, SRC)
+
+from stub_store import StubAppStore, load_template
+from fake_discord import Recorder, FakeBot, FakeInteraction
+
+SCENARIOS = ('commands', 'alerts', 'notifications')
+# A 1x1 transparent PNG, standing in for the logos and sentiment images.
+PNG = bytes.fromhex('89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+                    '1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082')
+SWEEP = [100, 60, 30, 10, 1, 40, 90, 150, 200, 120]
+
+def load_apps():
+    with open(os.path.join(SRC, 'api', 'apps.json'), 'r') as file:
+        return json.load(file)
+
+def rank_scripts(apps, steps=200, seed=3):
+    """Per app: a sweep over the whole 1..200 range (so most alerts fire), then a random walk."""
+    rng = random.Random(seed)
+    scripts = {}
+    for app in apps:
+        rank, walk = rng.randint(20, 80), []
+        for _ in range(steps):
+            rank = min(200, max(1, rank + rng.randint(-5, 5)))
+            walk.append(rank)
+        scripts[app['app_store_id']] = SWEEP + walk
+    return scripts
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def prepare_workdir(stub_url, apps, args):
+    """Point the bot at the stub and run it from a scratch directory with placeholder assets."""
+    workdir = tempfile.mkdtemp(prefix='replay-')
+    os.chdir(workdir)
+    os.makedirs('data')
+    os.makedirs('assets')
+    images = {app.get(key) for app in apps for key in ('icon', 'logo') if app.get(key)}
+    images |= {f"assets/{name}.png" for name in ('extreme_greed', 'greed', 'optimism', 'doubt', 'anxiety', 'fear', 'capitulation',
+                                                  'Logo_App_Store', 'CryptoAppRank_Logo')}
+    for path in images:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(PNG)
+
+    os.environ.update({
+        'APP_STORE_BASE_URL': stub_url,
+        'BTC_PRICE_URL': f"{stub_url}/price",
+        'METRICS_PORT': '0',
+        'STATUS_MIN_INTERVAL': '1',
+        'RANK_POLL_INTERVAL': str(args.poll_interval),
+        'RANK_POLL_MIN_INTERVAL': str(args.poll_interval / 2),
+        'RANK_POLL_MAX_INTERVAL': str(args.poll_interval * 2),
+        'RANK_POLL_JITTER': '0',
+        'RANK_BACKOFF_MAX': '2',
+        'BREAKER_COOLDOWN': '1',
+        'RANK_CACHE_TTL': str(args.poll_interval),
+    })
+    return workdir
+
+async def wait_for(condition, timeout, interval=0.05):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(interval)
+    return True
+
+async def run_commands(args, stub, recorder):
+    from commands import setup_commands
+    from tracker import RankTracker
+    from data_management.subscriptions import subscriptions
+
+    bot = FakeBot(recorder)
+    await setup_commands(bot)
+    # As in MyBot.setup_hook: the journals are loaded by the process that owns them.
+    subscriptions.load()
+    bot.tracker = RankTracker(bot)
+    apps = ['coinbase', 'cwallet', 'binance', 'cryptocom']
+    mix = ([(name, {}) for name in apps] * 3
+           + [('set-alert', {'app_name': 'coinbase', 'operator': '<', 'rank': 10})] * 2
+           + [('myalerts', {})] * 2 + [('ranking-data', {})] + [('about', {})])
+    rng = random.Random(5)
+
+    async def invoke(index):
+        name, kwargs = rng.choice(mix)
+        interaction = FakeInteraction(bot, 10_000 + index, name)
+        try:
+            await bot.tree.get_command(name).callback(interaction, **kwargs)
+        except Exception as e:
+            logging.error(f"/{name} raised {e!r}")
+            interaction.finish('exception')
+        return interaction
+
+    start = time.perf_counter()
+    interactions = await asyncio.gather(*(invoke(index) for index in range(args.commands)))
+    elapsed = time.perf_counter() - start
+    latencies = [(i.finished - i.started) * 1000 for i in interactions if i.finished is not None]
+    outcomes = {}
+    for interaction in interactions:
+        outcomes[interaction.outcome or 'unanswered'] = outcomes.get(interaction.outcome or 'unanswered', 0) + 1
+    return {
+        'operations': args.commands,
+        'elapsed_s': elapsed,
+        'throughput': args.commands / elapsed,
+        'p50_ms': percentile(latencies, 50),
+        'p99_ms': percentile(latencies, 99),
+        'outcomes': outcomes,
+    }
+
+async def run_tracker(tracker, done, timeout):
+    task = asyncio.create_task(tracker.run())
+    try:
+        finished = await wait_for(lambda: task.done() or done(), timeout)
+        if task.done():
+            task.result()
+        return finished
+    finally:
+        task.cancel()
+        await tracker.delivery.stop()
+
+async def run_alerts(args, stub, recorder, apps):
+    from services.alerts import OPERATORS
+    from data_management.subscriptions import subscriptions
+    from tracker import RankTracker
+
+    rng = random.Random(7)
+    alerts = [{'user_id': index, 'app_name': rng.choice(apps)['id'], 'operator': rng.choice(OPERATORS), 'rank': rng.randint(1, 200)}
+              for index in range(args.alerts)]
+    with open('data/alerts.json', 'w') as file:
+        json.dump(alerts, file)
+    subscriptions.load()
+
+    bot = FakeBot(recorder)
+    start = time.perf_counter()
+    tracker = RankTracker(bot)
+    bot.tracker = tracker
+    recorder.track(tracker.delivery)
+    load_s = time.perf_counter() - start
+    sweep_done = lambda: all(stub.steps[app['app_store_id']] >= len(SWEEP) for app in apps)
+    handled = lambda: tracker.delivery.sent + tracker.delivery.failed >= args.alerts - len(tracker.alerts.index)
+    drained = lambda: sweep_done() and not tracker.delivery.depth() and handled()
+    finished = await run_tracker(tracker, drained, args.duration)
+    elapsed = time.perf_counter() - start
+    fired = args.alerts - len(tracker.alerts.index)
+    delivery = tracker.delivery.stats()
+    return {
+        'operations': fired,
+        'elapsed_s': elapsed,
+        'throughput': recorder.messages / elapsed,
+        'p50_ms': percentile(recorder.dm_latencies, 50) * 1000,
+        'p99_ms': percentile(recorder.dm_latencies, 99) * 1000,
+        'completed': finished,
+        'alerts_loaded_s': round(load_s, 2),
+        'alerts_fired': fired,
+        'dm_sent': recorder.messages,
+        'dm_failed': delivery['failed'],
+        'presence_updates': len(recorder.presences),
+    }
+
+async def run_notifications(args, stub, recorder, apps):
+    from data_management.subscriptions import subscriptions
+    from tracker import RankTracker
+
+    # Due at the first full minute that leaves the poller time to publish a rank for every app.
+    due = (datetime.now(timezone.utc) + timedelta(seconds=args.poll_interval * 4 + 2 * len(apps) + 2)).replace(second=0, microsecond=0) + timedelta(minutes=1)
+    rng = random.Random(11)
+    notifs = [{'user_id': index, 'app_name': rng.choice(apps)['id'], 'interval': 'daily', 'hour': due.strftime('%H:%M'),
+               'timezone': 'UTC', 'week': due.strftime('%U'), 'last_sent_week': None, 'last_sent_day': None}
+              for index in range(args.notifications)]
+    with open('data/notifs.json', 'w') as file:
+        json.dump(notifs, file)
+    subscriptions.load()
+
+    bot = FakeBot(recorder)
+    tracker = RankTracker(bot)
+    bot.tracker = tracker
+    recorder.track(tracker.delivery)
+    print(f"  notifications are due at {due:%H:%M:%S} UTC, {(due - datetime.now(timezone.utc)).total_seconds():.0f}s from now", file=sys.stderr)
+    delivered = lambda: recorder.messages >= args.notifications and not tracker.delivery.depth()
+    finished = await run_tracker(tracker, delivered, args.duration + (due - datetime.now(timezone.utc)).total_seconds())
+    elapsed = max(time.time() - due.timestamp(), 1e-6)
+    delivery = tracker.delivery.stats()
+    return {
+        'operations': recorder.messages,
+        'elapsed_s': elapsed,
+        'throughput': recorder.messages / elapsed,
+        'p50_ms': percentile(recorder.dm_latencies, 50) * 1000,
+        'p99_ms': percentile(recorder.dm_latencies, 99) * 1000,
+        'completed': finished,
+        'dm_sent': recorder.messages,
+        'dm_failed': delivery['failed'],
+    }
+
+async def run_scenario(args):
+    apps = load_apps()
+    stub = StubAppStore(rank_scripts(apps), template=load_template(pad_kb=args.pad_kb), latency=args.latency,
+                        error_rate=args.error_rate, validators=not args.no_validators)
+    url = await stub.start()
+    prepare_workdir(url, apps, args)
+    recorder = Recorder(latency=args.discord_latency)
+
+    from api.http_client import http_client
+    from data_management.journal import close_journals
+    from data_management.subscriptions import subscriptions
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    # The bot prints a line per command and per save; keep the report readable.
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with quiet:
+            if args.scenario == 'commands':
+                result = await run_commands(args, stub, recorder)
+            elif args.scenario == 'alerts':
+                result = await run_alerts(args, stub, recorder, apps)
+            else:
+                result = await run_notifications(args, stub, recorder, apps)
+    finally:
+        subscriptions.close()
+        close_journals()
+        await http_client.close()
+        await stub.stop()
+    result.update(scenario=args.scenario, outbound=stub.counts(), discord_calls=dict(recorder.calls))
+    return result
+
+def report(results):
+    print(f"\n{'scenario':<15}{'ops':>9}{'elapsed s':>11}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'App Store':>11}{'304s':>7}{'errors':>8}")
+    for result in results:
+        outbound = result['outbound']
+        print(f"{result['scenario']:<15}{result['operations']:>9}{result['elapsed_s']:>11.2f}{result['throughput']:>10.0f}"
+              f"{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}{outbound['app_requests']:>11}{outbound['not_modified']:>7}{outbound['errors']:>8}")
+    for result in results:
+        details = {key: value for key, value in result.items()
+                   if key not in ('scenario', 'operations', 'elapsed_s', 'throughput', 'p50_ms', 'p99_ms', 'outbound')}
+        print(f"  {result['scenario']}: {details}")
+
+def child_argv(args, scenario, output):
+    argv = ['--scenario', scenario, '--json', output]
+    for option in ('commands', 'alerts', 'notifications', 'latency', 'error_rate', 'pad_kb', 'discord_latency', 'poll_interval', 'duration'):
+        argv += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+    return argv + ['--no-validators'] * args.no_validators + ['--verbose'] * args.verbose
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', choices=SCENARIOS + ('all',), default='all')
+    parser.add_argument('--commands', type=int, default=1000)
+    parser.add_argument('--alerts', type=int, default=100_000)
+    parser.add_argument('--notifications', type=int, default=50_000)
+    parser.add_argument('--latency', type=float, default=0.02, help="Stub App Store latency per request, in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of App Store requests answered with a 503")
+    parser.add_argument('--no-validators', action='store_true', help="Serve pages without ETags (no 304s)")
+    parser.add_argument('--pad-kb', type=int, default=200, help="Filler added to each page, in KiB")
+    parser.add_argument('--discord-latency', type=float, default=0.0, help="Delay of every fake Discord call, in seconds")
+    parser.add_argument('--poll-interval', type=float, default=0.5, help="RANK_POLL_INTERVAL for the tracker scenarios")
+    parser.add_argument('--duration', type=float, default=120, help="Timeout of the tracker scenarios, in seconds")
+    parser.add_argument('--json', help="Write the results to this file")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    args.json = os.path.abspath(args.json) if args.json else None
+
+    if args.scenario != 'all':
+        results = [asyncio.run(run_scenario(args))]
+    else:
+        # One process per scenario: the bot's module-level state must not leak between them.
+        results = []
+        for scenario in SCENARIOS:
+            print(f"Running {scenario}...")
+            with tempfile.NamedTemporaryFile(suffix='.json') as output:
+                subprocess.run([sys.executable, os.path.abspath(__file__), *child_argv(args, scenario, output.name)], check=True,
+                               stdout=None if args.verbose else subprocess.DEVNULL)
+                with open(output.name) as file:
+                    results.extend(json.load(file))
+
+    report(results)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+"""Local stand-in for the App Store (and the BTC price API) used by the replay harness."""
+
+import asyncio
+import os
+import random
+import re
+from collections import Counter
+
+from aiohttp import web
+
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'fixtures')
+RANK_PATTERN = re.compile(r'No\.&nbsp;\d+ in Finance')
+
+def load_template(name='coinbase_rank_3.html', pad_kb=0):
+    with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as file:
+        page = file.read()
+    if pad_kb:
+        page = page.replace('</body>', '<div hidden>' + 'x' * (pad_kb * 1024) + '</div></body>')
+    return page
+
+class StubAppStore:
+    """Serves a recorded product page whose Finance rank follows a script per app.
+
+    scripts maps an App Store id to a list of ranks; every request for that app
+    moves one step along its list (looping at the end), so a run replays the same
+    rank sequence. latency delays each answer and error_rate answers that share of
+    requests with error_status instead. Pages carry an ETag, and If-None-Match
+    requests for an unchanged rank get a 304 like the real CDN.
+    """
+
+    def __init__(self, scripts, template=None, latency=0.0, error_rate=0.0, error_status=503,
+                 validators=True, btc_price=60000.0, seed=1):
+        self.scripts = {str(app_store_id): list(ranks) for app_store_id, ranks in scripts.items()}
+        self.template = template or load_template()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.validators = validators
+        self.btc_price = btc_price
+        self.random = random.Random(seed)
+        self.steps = Counter()
+        self.requests = Counter()
+        self.statuses = Counter()
+        self.bytes_sent = 0
+        self._pages = {}
+        self._runner = None
+        self.base_url = None
+
+    def page(self, rank):
+        if rank not in self._pages:
+            self._pages[rank] = RANK_PATTERN.sub(f'No.&nbsp;{rank} in Finance', self.template).encode('utf-8')
+        return self._pages[rank]
+
+    def current_rank(self, app_store_id):
+        """Rank the next request for app_store_id will be served."""
+        script = self.scripts[str(app_store_id)]
+        return script[self.steps[str(app_store_id)] % len(script)]
+
+    def _answer(self, kind, status, **kwargs):
+        self.requests[kind] += 1
+        self.statuses[status] += 1
+        return web.Response(status=status, **kwargs)
+
+    async def handle_app(self, request):
+        app_store_id = request.match_info['app_store_id']
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if app_store_id not in self.scripts:
+            return self._answer('app', 404, text='Not Found')
+        if self.error_rate and self.random.random() < self.error_rate:
+            return self._answer('app', self.error_status, text='Unavailable', headers={'Retry-After': '1'})
+
+        script = self.scripts[app_store_id]
+        rank = script[self.steps[app_store_id] % len(script)]
+        self.steps[app_store_id] += 1
+        etag = f'"{app_store_id}-{rank}"'
+        if self.validators and request.headers.get('If-None-Match') == etag:
+            return self._answer('app', 304, headers={'ETag': etag})
+        body = self.page(rank)
+        self.bytes_sent += len(body)
+        headers = {'ETag': etag} if self.validators else {}
+        return self._answer('app', 200, body=body, content_type='text/html', charset='utf-8', headers=headers)
+
+    async def handle_price(self, request):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer('price', 200, text=f'{{"bitcoin": {{"usd": {self.btc_price}}}}}', content_type='application/json')
+
+    async def start(self, host='127.0.0.1', port=0):
+        app = web.Application()
+        app.router.add_get('/{country}/app/{slug}/id{app_store_id}', self.handle_app)
+        app.router.add_get('/price', self.handle_price)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def counts(self):
+        return {
+            'app_requests': self.requests['app'],
+            'price_requests': self.requests['price'],
+            'not_modified': self.statuses[304],
+            'errors': sum(count for status, count in self.statuses.items() if status >= 400),
+            'mib_sent': round(self.bytes_sent / 2**20, 2),
+        }
@@ -6,76 +6,127 @@
 #  Everyone is permitted to copy and distribute verbatim copies
 #  of this license document, but changing it is not allowed.
 
-import requests
+import asyncio
+import time
 import aiohttp
-from data_management.database import AppRankTracker
-from bs4 import BeautifulSoup
-
-async def current_rank_coinbase():
-    url = "https://apps.apple.com/us/app/coinbase-buy-bitcoin-ether/id886427730"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                text = await response.text()
-                soup = BeautifulSoup(text, 'html.parser')
-                rank_element = soup.find('a', class_='inline-list__item', href=True, text=lambda t: 'in Finance' in t)
-                if rank_element:
-                    rank_text = rank_element.get_text(strip=True)
-                    return ''.join(filter(str.isdigit, rank_text))
-    return None
+from api.cache import rank_cache
+from api.circuit import breakers
+from api.http_client import http_client
+from api.registry import registry
+from api.extractors import extract_rank, rank_region
+from api.conditional import conditional_pages
+from services.prices import price_feed
+from services.metrics import metrics
+from config import RANK_FETCH_CONCURRENCY
 
-async def current_rank_wallet():
-    url = "https://apps.apple.com/us/app/coinbase-wallet-nfts-crypto/id1278383455"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                text = await response.text()
-                soup = BeautifulSoup(text, 'html.parser')
-                rank_element = soup.find('a', class_='inline-list__item', href=True, text=lambda t: 'in Finance' in t)
-                if rank_element:
-                    rank_text = rank_element.get_text(strip=True)
-                    return ''.join(filter(str.isdigit, rank_text))
-    return None
+_scrape_slots = asyncio.Semaphore(RANK_FETCH_CONCURRENCY)
+_app_by_url = {app.url: app.id for app in registry}
+scrape_seconds = metrics.histogram('scrape_seconds', 'Time to scrape an App Store page, from request to rank.', ('app',))
 
-async def current_rank_binance():
-    url = "https://apps.apple.com/us/app/binance-us-buy-bitcoin-eth/id1492670702"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                text = await response.text()
-                soup = BeautifulSoup(text, 'html.parser')
-                rank_element = soup.find('a', class_='inline-list__item', href=True, text=lambda t: 'in Finance' in t)
-                if rank_element:
-                    rank_text = rank_element.get_text(strip=True)
-                    return ''.join(filter(str.isdigit, rank_text))
-    return None
+class RankFetchError(Exception):
+    """A scrape failed. status is the HTTP status, 0 for a network error and None when the host's circuit is open."""
 
-async def current_rank_cryptodotcom():
-    url = "https://apps.apple.com/us/app/crypto-com-buy-bitcoin-sol/id1262148500"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                text = await response.text()
-                soup = BeautifulSoup(text, 'html.parser')
-                rank_element = soup.find('a', class_='inline-list__item', href=True, text=lambda t: 'in Finance' in t)
-                if rank_element:
-                    rank_text = rank_element.get_text(strip=True)
-                    return ''.join(filter(str.isdigit, rank_text))
-    return None
+    def __init__(self, status, url, retry_after=None):
+        super().__init__(f"HTTP {status} for URL: {url}" if status is not None else f"Circuit open for URL: {url}")
+        self.status = status
+        self.url = url
+        self.retry_after = retry_after
 
-async def get_bitcoin_price_usd():
-    """Fetch the current price of Bitcoin in USD from the CoinGecko API asynchronously."""
-    url = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=USD"
+async def scrape_rank(url, category='Finance'):
+    """Scrape the rank of an App Store page, or None if the page shows no rank.
+
+    Raises RankFetchError on HTTP and network errors. 429 and 5xx responses and
+    network errors count against the host's circuit breaker. Requests are
+    conditional, and a page whose rank region is unchanged is not parsed again.
+    """
+    breaker = breakers.for_url(url)
+    probe = breaker.state == 'half-open'
+    if not breaker.allow():
+        raise RankFetchError(None, url, breaker.retry_in())
+    try:
+        with scrape_seconds.time(app=_app_by_url.get(url, 'other')):
+            return await _scrape(url, category, breaker)
+    finally:
+        if probe:
+            breaker.end_probe()
+
+async def _scrape(url, category, breaker):
+    try:
+        async with _scrape_slots:
+            response = await http_client.fetch_text(url, headers=conditional_pages.headers(url))
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        breaker.failure()
+        raise RankFetchError(0, url) from e
+    if response.status == 429 or response.status >= 500:
+        breaker.failure(response.retry_after)
+        raise RankFetchError(response.status, url, response.retry_after)
+    breaker.success()
+    conditional_pages.stats.requests += 1
+    if response.status == 304 and conditional_pages.get(url).rank is not None:
+        return conditional_pages.not_modified(url)
+    if response.status != 200:
+        raise RankFetchError(response.status, url)
+
+    digest = conditional_pages.digest(rank_region(response.text, category))
+    if conditional_pages.unchanged_region(url, digest):
+        rank = conditional_pages.get(url).rank
+    else:
+        started = time.perf_counter()
+        rank = await extract_rank(response.text, category)
+        conditional_pages.record_parse(time.perf_counter() - started)
+    conditional_pages.update(url, response, digest, rank)
+    return rank
+
+async def fetch_app_rank(url, category='Finance'):
+    """Scrape the Finance category rank of an App Store page, bypassing the cache."""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                response.raise_for_status()
-                data = await response.json()
-                bitcoin_price = data['bitcoin']['usd']
-                return bitcoin_price
-    except aiohttp.ClientResponseError as e:
-        print(f"HTTP request failed: {e}")
-        return "Unavailable"
+        rank = await scrape_rank(url, category)
+        if rank is None:
+            print("Rank element not found.")
+        return rank
+    except RankFetchError as e:
+        print(e)
     except Exception as e:
-        print(f"Failed to fetch Bitcoin price: {e}")
-        return "Unavailable"
\ No newline at end of file
+        print(f"Error fetching rank: {e}")
+    return None
+
+_rank_source = None
+
+def set_rank_source(source):
+    """Fill the rank cache from source(app_id) instead of scraping (None to scrape again).
+
+    Follower processes read the ranks the leader stored rather than scraping themselves.
+    """
+    global _rank_source
+    _rank_source = source
+    rank_cache.invalidate()
+
+def _loader(app):
+    if _rank_source is not None:
+        return lambda: _rank_source(app.id)
+    return lambda: fetch_app_rank(app.url, app.category)
+
+async def current_rank(app_name):
+    """Return the current rank of a registered app (id or alias) from the shared snapshot cache."""
+    app = registry.get(app_name)
+    return await rank_cache.get(app.id, _loader(app))
+
+async def refresh_rank(app_name):
+    """Scrape a registered app now and update the shared snapshot cache."""
+    app = registry.get(app_name)
+    return await rank_cache.refresh(app.id, _loader(app))
+
+async def fetch_ranks(apps=None, force=False):
+    """Fetch the ranks of several apps in one concurrent wave, returned as {app_id: rank}.
+
+    Concurrency against the App Store is bounded by RANK_FETCH_CONCURRENCY.
+    """
+    apps = [registry.get(app) if isinstance(app, str) else app for app in (apps or registry)]
+    fetch = refresh_rank if force else current_rank
+    ranks = await asyncio.gather(*(fetch(app.id) for app in apps))
+    return {app.id: rank for app, rank in zip(apps, ranks)}
+
+async def get_bitcoin_price_usd():
+    """Current price of Bitcoin in USD from the price feed, fetched from CoinGecko at most once per BTC_PRICE_TTL."""
+    price = await price_feed.get()
+    return price if price is not None else "Unavailable"
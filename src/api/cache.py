@@ -0,0 +1,93 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import time
+import logging
+
+from services.metrics import metrics
+from config import RANK_CACHE_TTL, RANK_CACHE_NEGATIVE_TTL
+
+cache_requests = metrics.counter('cache_requests_total', 'Cache lookups by cache and result (hit or miss).', ('cache', 'result'))
+
+class RankCache:
+    """Process-wide snapshot of the latest App Store ranks.
+
+    Every consumer (slash commands, sentiment, alerts, bot status) reads
+    through this cache. A value is refreshed at most once per TTL, and
+    concurrent callers asking for the same key share a single in-flight fetch.
+    """
+
+    def __init__(self, ttl=RANK_CACHE_TTL, negative_ttl=RANK_CACHE_NEGATIVE_TTL, name='rank'):
+        self.name = name
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.version = 0
+        self._entries = {}
+        self._inflight = {}
+
+    def _is_fresh(self, entry):
+        value, fetched_at = entry
+        ttl = self.ttl if value is not None else self.negative_ttl
+        return time.monotonic() - fetched_at < ttl
+
+    def peek(self, key):
+        """Return the last known value for key without triggering a fetch."""
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def age(self, key):
+        """Seconds since key was last refreshed, or None if never fetched."""
+        entry = self._entries.get(key)
+        return time.monotonic() - entry[1] if entry else None
+
+    def set(self, key, value):
+        previous = self._entries.get(key)
+        if previous is None or previous[0] != value:
+            self.version += 1
+        self._entries[key] = (value, time.monotonic())
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def get(self, key, fetch):
+        """Return the cached value for key, calling fetch() once if it is stale."""
+        entry = self._entries.get(key)
+        if entry and self._is_fresh(entry):
+            cache_requests.inc(cache=self.name, result='hit')
+            return entry[0]
+        cache_requests.inc(cache=self.name, result='miss')
+        return await self.refresh(key, fetch)
+
+    async def refresh(self, key, fetch):
+        """Force a refresh of key, joining any fetch already in flight."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run_fetch(key, fetch))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _run_fetch(self, key, fetch):
+        try:
+            value = await fetch()
+        except Exception as e:
+            logging.error(f"Rank cache refresh failed for {key}: {e}")
+            value = None
+        finally:
+            self._inflight.pop(key, None)
+        if value is None and self.peek(key) is not None:
+            # Keep serving the last good rank; only retry after the negative TTL.
+            self._entries[key] = (self.peek(key), time.monotonic() - self.ttl + self.negative_ttl)
+            return self.peek(key)
+        self.set(key, value)
+        return value
+
+rank_cache = RankCache()
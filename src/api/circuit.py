@@ -0,0 +1,89 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import logging
+import time
+from urllib.parse import urlsplit
+
+from config import BREAKER_FAILURES, BREAKER_COOLDOWN
+
+class CircuitBreaker:
+    """Stops requests to a host after `failures` consecutive errors.
+
+    While open every request is refused for `cooldown` seconds; then a single
+    probe is let through (half-open). A success closes the breaker, a failure
+    opens it again for twice as long, up to 8x the cooldown. The caller must call
+    end_probe() once the probe is over, so a probe that is cancelled or fails in
+    an unexpected way counts as a failure instead of leaving the breaker stuck.
+    """
+
+    def __init__(self, host, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.host = host
+        self.failures = failures
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+        self._probing = False
+
+    @property
+    def state(self):
+        if self.open_until == 0.0:
+            return 'closed'
+        return 'open' if time.monotonic() < self.open_until else 'half-open'
+
+    def retry_in(self):
+        """Seconds until the breaker lets a request through again."""
+        return max(0.0, self.open_until - time.monotonic())
+
+    def allow(self):
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half-open' and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def end_probe(self):
+        """Close out a half-open probe: if it recorded neither a success nor a failure, count a failure."""
+        if self._probing:
+            self.failure()
+
+    def success(self):
+        if self.open_until:
+            logging.info(f"Circuit for {self.host} closed.")
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+        self._probing = False
+
+    def failure(self, retry_after=None):
+        self.consecutive_failures += 1
+        if self._probing or self.consecutive_failures >= self.failures or retry_after:
+            self.trips += 1
+            cooldown = max(retry_after or 0, self.cooldown * min(2 ** (self.trips - 1), 8))
+            self.open_until = time.monotonic() + cooldown
+            self._probing = False
+            logging.warning(f"Circuit for {self.host} opened for {cooldown:.0f}s after {self.consecutive_failures} failure(s).")
+
+class CircuitBreakers:
+    def __init__(self):
+        self._breakers = {}
+
+    def for_url(self, url):
+        host = urlsplit(url).hostname
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(host)
+        return self._breakers[host]
+
+    def stats(self):
+        return {host: {'state': breaker.state, 'failures': breaker.consecutive_failures, 'retry_in': round(breaker.retry_in(), 1)}
+                for host, breaker in self._breakers.items()}
+
+breakers = CircuitBreakers()
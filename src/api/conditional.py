@@ -0,0 +1,106 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import hashlib
+
+class PageState:
+    """What we know about the last response for a URL."""
+
+    def __init__(self):
+        self.etag = None
+        self.last_modified = None
+        self.region_hash = None
+        self.rank = None
+        self.size = 0
+
+class ScrapeStats:
+    def __init__(self):
+        self.requests = 0
+        self.not_modified = 0
+        self.parsed = 0
+        self.parse_skipped = 0
+        self.bytes_received = 0
+        self.bytes_saved = 0
+        self.parse_seconds = 0.0
+        self.parse_seconds_saved = 0.0
+
+    def average_parse(self):
+        return self.parse_seconds / self.parsed if self.parsed else 0.0
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'not_modified': self.not_modified,
+            'parsed': self.parsed,
+            'parse_skipped': self.parse_skipped,
+            'bytes_received': self.bytes_received,
+            'bytes_saved': self.bytes_saved,
+            'parse_ms': round(self.parse_seconds * 1000, 1),
+            'parse_ms_saved': round(self.parse_seconds_saved * 1000, 1),
+        }
+
+class ConditionalPages:
+    """Per-URL validators (ETag/Last-Modified) and the hash of the rank region of the last page.
+
+    A 304 answer, or a 200 whose rank region hashes the same as last time, reuses the
+    previously extracted rank, so neither the transfer nor the parse is repeated.
+    """
+
+    def __init__(self):
+        self._pages = {}
+        self.stats = ScrapeStats()
+
+    def get(self, url):
+        if url not in self._pages:
+            self._pages[url] = PageState()
+        return self._pages[url]
+
+    def headers(self, url):
+        state = self._pages.get(url)
+        headers = {}
+        if state is not None and state.rank is not None:
+            if state.etag:
+                headers['If-None-Match'] = state.etag
+            if state.last_modified:
+                headers['If-Modified-Since'] = state.last_modified
+        return headers
+
+    @staticmethod
+    def digest(region):
+        return hashlib.blake2b(region.encode('utf-8'), digest_size=16).digest() if region is not None else None
+
+    def not_modified(self, url):
+        state = self.get(url)
+        self.stats.not_modified += 1
+        self.stats.bytes_saved += state.size
+        self.stats.parse_seconds_saved += self.stats.average_parse()
+        return state.rank
+
+    def unchanged_region(self, url, digest):
+        """True if digest matches the last page's rank region (and a rank was extracted from it)."""
+        state = self.get(url)
+        if digest is None or digest != state.region_hash or state.rank is None:
+            return False
+        self.stats.parse_skipped += 1
+        self.stats.parse_seconds_saved += self.stats.average_parse()
+        return True
+
+    def record_parse(self, seconds):
+        self.stats.parsed += 1
+        self.stats.parse_seconds += seconds
+
+    def update(self, url, response, digest, rank):
+        state = self.get(url)
+        state.etag = response.etag
+        state.last_modified = response.last_modified
+        state.size = response.size
+        state.region_hash = digest
+        state.rank = rank
+        self.stats.bytes_received += response.size
+
+conditional_pages = ConditionalPages()
@@ -0,0 +1,148 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import html
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from services.metrics import metrics
+from config import RANK_EXTRACTOR, PARSE_WORKERS
+
+RANK_ANCHOR_CLASS = 'inline-list__item'
+
+def rank_from_text(text):
+    digits = ''.join(filter(str.isdigit, text))
+    return int(digits) if digits else None
+
+def rank_anchor_span(page, category='Finance'):
+    """(start of the <a> tag, start of its text, start of </a>) of the category rank link, or None.
+
+    Only an anchor with the rank class and an href whose text directly holds the
+    'in <category>' label counts, so the same words elsewhere (a meta description,
+    a review) are skipped.
+    """
+    needle = f'in {category}'
+    position = page.find(needle)
+    while position != -1:
+        tag_start = page.rfind('<a', 0, position)
+        tag_end = page.find('>', tag_start, position) if tag_start != -1 else -1
+        close = page.find('</a>', position)
+        if tag_end != -1 and close != -1:
+            tag = page[tag_start:tag_end]
+            if RANK_ANCHOR_CLASS in tag and 'href=' in tag and '<' not in page[tag_end + 1:position]:
+                return tag_start, tag_end + 1, close
+        position = page.find(needle, position + len(needle))
+    return None
+
+class RegexRankExtractor:
+    """Fast path: locate the 'in <category>' label in the raw HTML and read its enclosing anchor.
+
+    Only the few hundred bytes around the label are inspected, so no DOM is built.
+    """
+
+    name = 'regex'
+
+    def extract(self, page, category='Finance'):
+        span = rank_anchor_span(page, category)
+        if span is None:
+            return None
+        # Entities such as &#160; would otherwise leak digits into the rank.
+        return rank_from_text(html.unescape(page[span[1]:span[2]]))
+
+class SoupRankExtractor:
+    """Fallback: BeautifulSoup restricted to rank anchors, using lxml when it is installed."""
+
+    name = 'soup'
+
+    def __init__(self):
+        try:
+            import lxml  # noqa: F401
+            self.parser = 'lxml'
+        except ImportError:
+            self.parser = 'html.parser'
+        self.strainer = SoupStrainer('a', class_=RANK_ANCHOR_CLASS)
+
+    def extract(self, page, category='Finance'):
+        soup = BeautifulSoup(page, self.parser, parse_only=self.strainer)
+        rank_element = soup.find('a', class_=RANK_ANCHOR_CLASS, href=True, string=lambda t: t and f'in {category}' in t)
+        if rank_element:
+            return rank_from_text(rank_element.get_text(strip=True))
+        return None
+
+class SelectolaxRankExtractor:
+    """Fallback on selectolax's Lexbor parser, available only when selectolax is installed."""
+
+    name = 'selectolax'
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self.parser_class = LexborHTMLParser
+
+    def extract(self, page, category='Finance'):
+        tree = self.parser_class(page)
+        for node in tree.css(f'a.{RANK_ANCHOR_CLASS}[href]'):
+            text = node.text(strip=True)
+            if f'in {category}' in text:
+                return rank_from_text(text)
+        return None
+
+class ChainedRankExtractor:
+    """Try each extractor in order and return the first rank found."""
+
+    def __init__(self, extractors):
+        self.extractors = extractors
+        self.name = '+'.join(extractor.name for extractor in extractors)
+
+    def extract(self, page, category='Finance'):
+        for extractor in self.extractors:
+            rank = extractor.extract(page, category)
+            if rank is not None:
+                return rank
+        return None
+
+def build_extractor(name=RANK_EXTRACTOR):
+    """Build the extractor configured by RANK_EXTRACTOR ('auto', 'regex', 'soup' or 'selectolax')."""
+    if name == 'regex':
+        return RegexRankExtractor()
+    if name == 'soup':
+        return SoupRankExtractor()
+    if name == 'selectolax':
+        return SelectolaxRankExtractor()
+    try:
+        fallback = SelectolaxRankExtractor()
+    except ImportError:
+        fallback = SoupRankExtractor()
+    return ChainedRankExtractor([RegexRankExtractor(), fallback])
+
+rank_extractor = build_extractor()
+_parse_pool = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix='rank-parse')
+parse_seconds = metrics.histogram('parse_seconds', 'Time to extract a rank from a page, including the wait for a parser thread.', ('extractor',))
+
+def rank_region(page, category='Finance'):
+    """The category rank link of page (the anchor RegexRankExtractor reads), or None if it is not there.
+
+    Hashing this slice tells whether the rank part of a page changed without parsing it.
+    """
+    span = rank_anchor_span(page, category)
+    if span is None:
+        return None
+    return page[span[0]:span[2] + len('</a>')]
+
+async def extract_rank(page, category='Finance', extractor=None):
+    """Extract the category rank from a page on the parser thread pool, keeping the event loop free."""
+    extractor = extractor or rank_extractor
+    loop = asyncio.get_running_loop()
+    try:
+        with parse_seconds.time(extractor=extractor.name):
+            return await loop.run_in_executor(_parse_pool, extractor.extract, page, category)
+    except Exception as e:
+        logging.error(f"Rank extraction failed with {extractor.name}: {e}")
+        return None
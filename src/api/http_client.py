@@ -0,0 +1,98 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import aiohttp
+import logging
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from services.metrics import metrics
+from config import HTTP_POOL_LIMIT, HTTP_LIMIT_PER_HOST, HTTP_DNS_CACHE_TTL, HTTP_KEEPALIVE_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_TOTAL_TIMEOUT
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (compatible; CryptoAppIndex/1.0)',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+http_responses = metrics.counter('http_responses_total', 'HTTP responses by host and status code.', ('host', 'status'))
+
+HttpResult = namedtuple('HttpResult', ['status', 'text', 'retry_after', 'etag', 'last_modified', 'size'])
+
+class HttpClient:
+    """Long-lived aiohttp session shared by every scraper and API call.
+
+    Connections are kept alive and pooled per host, DNS answers are cached,
+    and the number of simultaneous connections to a single host is capped.
+    """
+
+    def __init__(self, limit=HTTP_POOL_LIMIT, limit_per_host=HTTP_LIMIT_PER_HOST, dns_cache_ttl=HTTP_DNS_CACHE_TTL,
+                 keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT, connect_timeout=HTTP_CONNECT_TIMEOUT, total_timeout=HTTP_TOTAL_TIMEOUT):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, sock_connect=connect_timeout)
+        self._session = None
+
+    @property
+    def closed(self):
+        return self._session is None or self._session.closed
+
+    async def start(self):
+        if not self.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, headers=DEFAULT_HEADERS)
+        logging.info(f"HTTP client started (limit={self.limit}, per host={self.limit_per_host}).")
+
+    async def close(self):
+        if not self.closed:
+            await self._session.close()
+            logging.info("HTTP client closed.")
+        self._session = None
+
+    async def session(self):
+        """Return the shared session, starting it lazily for scripts that run without the bot."""
+        if self.closed:
+            await self.start()
+        return self._session
+
+    async def fetch_text(self, url, **kwargs):
+        """GET url and return an HttpResult; text is None for non-200 responses."""
+        session = await self.session()
+        async with session.get(url, **kwargs) as response:
+            http_responses.inc(host=urlsplit(url).hostname, status=response.status)
+            retry_after = response.headers.get('Retry-After')
+            retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+            text, size = None, 0
+            if response.status == 200:
+                body = await response.read()
+                size = len(body)
+                text = body.decode(response.charset or 'utf-8', errors='replace')
+            return HttpResult(response.status, text, retry_after, response.headers.get('ETag'),
+                              response.headers.get('Last-Modified'), size)
+
+    async def get_text(self, url, **kwargs):
+        """GET url and return (status, body text); body is None for non-200 responses."""
+        result = await self.fetch_text(url, **kwargs)
+        return result.status, result.text
+
+    async def get_json(self, url, **kwargs):
+        session = await self.session()
+        async with session.get(url, **kwargs) as response:
+            http_responses.inc(host=urlsplit(url).hostname, status=response.status)
+            response.raise_for_status()
+            return await response.json()
+
+http_client = HttpClient()
@@ -0,0 +1,109 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import json
+from dataclasses import dataclass, field
+
+from config import APP_REGISTRY_PATH, APP_STORE_BASE_URL
+
+@dataclass(frozen=True)
+class AppInfo:
+    id: str
+    name: str
+    app_store_id: str
+    slug: str
+    title: str = None
+    category: str = "Finance"
+    weight: float = 0
+    color: int = 0x3498db
+    emoji: str = ""
+    emoji_name: str = None
+    icon: str = None
+    logo: str = None
+    rank_data_file: str = None
+    country: str = "us"
+    poll_interval: float = None
+    aliases: tuple = field(default_factory=tuple)
+
+    @property
+    def url(self):
+        return f"{APP_STORE_BASE_URL}/{self.country}/app/{self.slug}/id{self.app_store_id}"
+
+    @property
+    def history_file(self):
+        return f"data/{self.id}_rank_history.json"
+
+    @property
+    def display_title(self):
+        return self.title or self.name
+
+class AppRegistry:
+    """Tracked App Store apps, loaded once at startup from a JSON file."""
+
+    def __init__(self, apps):
+        self._apps = {}
+        self._aliases = {}
+        for app in apps:
+            if app.id in self._apps:
+                raise ValueError(f"Duplicate app id in registry: {app.id}")
+            self._apps[app.id] = app
+            for name in (app.id, app.name.lower(), *app.aliases):
+                self._aliases[name.lower()] = app.id
+
+    @classmethod
+    def load(cls, path=APP_REGISTRY_PATH):
+        with open(path, 'r') as file:
+            entries = json.load(file)
+        apps = []
+        for entry in entries:
+            entry = dict(entry)
+            if isinstance(entry.get('color'), str):
+                entry['color'] = int(entry['color'], 16)
+            entry['aliases'] = tuple(entry.get('aliases', ()))
+            apps.append(AppInfo(**entry))
+        return cls(apps)
+
+    def resolve(self, name):
+        """Return the AppInfo for an id or alias (e.g. 'cwallet'), or None."""
+        if name is None:
+            return None
+        app_id = self._aliases.get(str(name).lower())
+        return self._apps.get(app_id)
+
+    def canonical(self, name):
+        """Canonical app id for name, or the lower-cased name if it is not registered."""
+        app = self.resolve(name)
+        return app.id if app else str(name).lower()
+
+    def get(self, name):
+        app = self.resolve(name)
+        if app is None:
+            raise KeyError(f"Unknown app: {name}")
+        return app
+
+    @property
+    def ids(self):
+        return list(self._apps)
+
+    @property
+    def total_weight(self):
+        return sum(app.weight for app in self._apps.values())
+
+    def weighted(self):
+        return [app for app in self._apps.values() if app.weight > 0]
+
+    def __iter__(self):
+        return iter(self._apps.values())
+
+    def __len__(self):
+        return len(self._apps)
+
+    def __contains__(self, name):
+        return self.resolve(name) is not None
+
+registry = AppRegistry.load()
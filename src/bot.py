@@ -7,34 +7,64 @@
 #  of this license document, but changing it is not allowed.
 
 from discord.ext import commands
-from discord import Intents
+from discord import Intents, app_commands
 import discord
 import asyncio
 import os
+import time
 
-from config import BOT_TOKEN
+from config import BOT_TOKEN, BOT_SHARDING, SHARD_COUNT, SHARD_IDS
 from tracker import RankTracker
-from commands import setup_commands
+from api.http_client import http_client
+from api.registry import registry
+from commands import setup_commands, rank_trackers
 from data_management.guilds import add_guild, remove_guild
+from data_management.journal import close_journals
+from data_management.subscriptions import subscriptions
+from services.rate_limit import command_limiter
+from services.charts import chart_renderer
+from services.metrics import metrics, metrics_server
+from services.leadership import Coordinator
 
-class MyBot(commands.Bot):
+command_seconds = metrics.histogram('command_seconds', 'Slash command latency, from the interaction to the end of its handler.', ('command',))
+commands_total = metrics.counter('commands_total', 'Slash commands handled, by outcome (ok, rejected or error).', ('command', 'outcome'))
+
+def record_command(interaction, outcome):
+    name = interaction.command.qualified_name if interaction.command else 'unknown'
+    created = interaction.created_at.timestamp() if interaction.created_at else time.time()
+    command_seconds.observe(max(time.time() - created, 0.0), command=name)
+    commands_total.inc(command=name, outcome=outcome)
+
+class InstrumentedTree(app_commands.CommandTree):
+    async def on_error(self, interaction, error):
+        record_command(interaction, 'rejected' if isinstance(error, app_commands.CheckFailure) else 'error')
+        await super().on_error(interaction, error)
+
+def shard_options():
+    """AutoShardedBot arguments for BOT_SHARDING ('auto' lets Discord pick the shard count)."""
+    if BOT_SHARDING == 'auto':
+        return {'shard_count': SHARD_COUNT or None}
+    if BOT_SHARDING == 'process':
+        if not SHARD_IDS or not SHARD_COUNT:
+            raise ValueError("BOT_SHARDING=process needs SHARD_IDS and SHARD_COUNT.")
+        return {'shard_ids': SHARD_IDS, 'shard_count': SHARD_COUNT}
+    return {}
+
+class MyBot(commands.AutoShardedBot if BOT_SHARDING in ('auto', 'process') else commands.Bot):
     def __init__(self):
         intents = Intents.default()
         intents.messages = True
         intents.message_content = True
         intents.guilds = True
-        super().__init__(command_prefix='!', intents=intents, application_id=os.getenv('DISCORD_APPLICATION_ID'))
+        super().__init__(command_prefix='!', intents=intents, application_id=os.getenv('DISCORD_APPLICATION_ID'),
+                         tree_cls=InstrumentedTree, **shard_options())
+        self.coordinator = None
 
     async def on_guild_join(self, guild):
         """Événement déclenché lorsque le bot rejoint un serveur."""
         add_guild(guild.id)
 
-        emoji_paths = {
-            'coinbase': 'assets/coinbase_icon.png',
-            'wallet': 'assets/wallet_icon.png',
-            'binance': 'assets/binance_icon.png',
-            'cryptocom': 'assets/cryptocom_icon.png'
-        }
+        emoji_paths = {app.emoji_name or app.id: app.icon for app in registry if app.icon}
         for name, path in emoji_paths.items():
             with open(path, 'rb') as image_file:
                 image = image_file.read()
@@ -49,14 +79,40 @@ class MyBot(commands.Bot):
         remove_guild(guild.id)
 
     async def setup_hook(self):
-        self.tracker = RankTracker(self)
-        self.loop.create_task(self.tracker.run())
+        self.http_client = http_client
+        await self.http_client.start()
+        command_limiter.start()
+        chart_renderer.start()
+        await metrics_server.start()
+        self.loop.create_task(metrics.log_summary())
+        if BOT_SHARDING == 'process':
+            # Only the process holding the lease creates self.tracker and scrapes.
+            self.coordinator = Coordinator(self, documents=rank_trackers.values())
+            self.loop.create_task(self.coordinator.run())
+        else:
+            subscriptions.load()
+            self.tracker = RankTracker(self)
+            self.loop.create_task(self.tracker.run())
         await self.tree.sync()
 
+    async def on_app_command_completion(self, interaction, command):
+        record_command(interaction, 'ok')
+
     async def on_ready(self):
         print(f'Logged in as {self.user.name}')
         await self.tree.sync()
 
+    async def close(self):
+        await http_client.close()
+        if self.coordinator is not None:
+            await self.coordinator.stop()
+        subscriptions.close()
+        close_journals()
+        command_limiter.snapshot()
+        chart_renderer.close()
+        await metrics_server.stop()
+        await super().close()
+
     async def on_disconnect(self):
         print("Bot is disconnecting...")
 
@@ -6,10 +6,12 @@
 #  Everyone is permitted to copy and distribute verbatim copies
 #  of this license document, but changing it is not allowed.
 
+import asyncio
 import discord
-import json
+import math
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from discord import app_commands, Interaction, File, Embed, Colour, ButtonStyle
 from discord.ui import View, Button
 from discord.ext import commands
@@ -17,42 +19,47 @@ import logging
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
-from api.apps import current_rank_coinbase, current_rank_wallet, current_rank_binance, current_rank_cryptodotcom, get_bitcoin_price_usd
-from utilities import number_to_emoji, evaluate_sentiment, weighted_average_sentiment_calculation
+from api.apps import current_rank
+from api.registry import registry
+from utilities import number_to_emoji
+from services.sentiment import sentiment_service
+from services.rate_limit import command_limiter
+from services.charts import chart_renderer
+from services.prices import price_feed
+from services.deferred import deferred_responder, Reply, ReplyError, rank_with_staleness, within_deadline, staleness_badge
 from data_management.database import AppRankTracker
-from tracker import RankTracker
+from tracker import historical_ranks
 from data_management.guilds import load_guilds
-from config import discord_user_id
+from data_management.subscriptions import subscriptions
+from services.metrics import metrics
+from config import discord_user_id, NOTIF_DEFAULT_TIMEZONE
 
-coinbase_tracker = AppRankTracker('Coinbase', 'data/rank_data_coinbase.json')
-wallet_tracker = AppRankTracker('Wallet', 'data/rank_data_wallet.json')
-binance_tracker = AppRankTracker('Binance', 'data/rank_data_binance.json')
-cryptodotcom_tracker = AppRankTracker('Crypto.com', 'data/rank_data_cryptodotcom.json')
-app_rank_tracker = AppRankTracker(app_name="my_app", file_path="data/last_execution_time.json")
 
-ath_coinbase_tracker = AppRankTracker('coinbase', 'data/coinbase_rank_history.json')
-ath_wallet_tracker = AppRankTracker('wallet', 'data/wallet_rank_history.json')
-ath_binance_tracker = AppRankTracker('binance', 'data/binance_rank_history.json')
-ath_cryptodotcom_tracker = AppRankTracker('cryptocom', 'data/cryptocom_rank_history.json')
+rank_trackers = {app.id: AppRankTracker(app.name, app.rank_data_file or f"data/rank_data_{app.id}.json") for app in registry}
+ath_trackers = {app.id: AppRankTracker(app.id, app.history_file) for app in registry}
 
-async def limit_command(interaction: Interaction):
-    user_id = str(interaction.user.id)
-    last_execution_times = await app_rank_tracker.read_last_execution_times()
-    now = datetime.now()
-
-    if user_id in last_execution_times:
-        last_time = datetime.fromisoformat(last_execution_times[user_id])
-        if now - last_time < timedelta(seconds=10):
-            await interaction.response.send_message("❗ Avoid spamming commands, wait 10 seconds before trying again. ❗", ephemeral=True)
-            return False
+# Discord allows at most 25 choices per option.
+app_choices = [app_commands.Choice(name=app.name, value=app.id) for app in registry][:25]
 
-    last_execution_times[user_id] = now.isoformat()
-    await app_rank_tracker.write_last_execution_times(last_execution_times)
+rate_limited = metrics.counter('commands_rate_limited_total', 'Slash commands refused by the rate limiter.', ('command',))
 
+async def limit_command(interaction: Interaction):
+    command = interaction.command.name if interaction.command else None
+    retry_after = command_limiter.hit(interaction.user.id, interaction.guild_id, command)
+    if retry_after:
+        rate_limited.inc(command=command or 'unknown')
+        await interaction.response.send_message(f"❗ Avoid spamming commands, wait {math.ceil(retry_after)} seconds before trying again. ❗", ephemeral=True)
+        return False
     return True
 
 async def setup_commands(bot):
 
+    def evaluate_new_alert(app_name):
+        """Check a new alert against the app's last known rank, so it fires without waiting for a change."""
+        tracker = getattr(bot, 'tracker', None)
+        if tracker is not None:
+            bot.loop.create_task(tracker.alerts.evaluate(app_name))
+
     async def send_error_message_set_alert(interaction: discord.Interaction, additional_info=""):
         embed = discord.Embed(
             title="❌ Missing argument",
@@ -81,137 +88,64 @@ async def setup_commands(bot):
         embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=avatar_url if avatar_url else discord.Embed.Empty)
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    async def send_app_statistics(interaction: Interaction, app_id: str):
+        async def build():
+            app = registry.get(app_id)
+            now = datetime.now()
+            (rank_number, rank_age), sentiment = await asyncio.gather(rank_with_staleness(app.id), within_deadline(sentiment_service.current()))
+            average_sentiment_calculation = sentiment.value if sentiment else None
+            sentiment_text, sentiment_image_filename = (sentiment.label, sentiment.image) if sentiment else ("No data available for sentiment analysis.", None)
+            current_datetime_hour = now.strftime('%Y-%m-%d at %H:%M:%S')
+
+            change_symbol = await rank_trackers[app.id].compare_ranks(rank_number)
+            highest_rank, lowest_rank = await ath_trackers[app.id].get_extreme_ranks()
+
+            embed = Embed(title=f"{app.display_title} Statistics", description=f"Real-time tracking and analysis of the {app.display_title} app ranking.", color=app.color)
+            thumb_filename = f"{app.id}_logo.png"
+            files = [File(app.logo, filename=thumb_filename)]
+            embed.set_thumbnail(url=f"attachment://{thumb_filename}")
+            embed.add_field(name="🏆 Current Rank", value=f"#️⃣{number_to_emoji(rank_number)} ``in {app.category} on {current_datetime_hour}`` {staleness_badge(rank_age)}", inline=False)
+            embed.add_field(name="🔂 Recent Positional Change", value=change_symbol, inline=False)
+            if highest_rank:
+                embed.add_field(name="📈 Peak Rank Achieved (ATH)", value=f"#️⃣{number_to_emoji(highest_rank['rank'])} ``on {highest_rank['timestamp']}``", inline=True)
+            if lowest_rank:
+                embed.add_field(name="📉 Recent Lowest Rank (ATL)", value=f"#️⃣{number_to_emoji(lowest_rank['rank'])} ``on {lowest_rank['timestamp']}``", inline=True)
+            embed.add_field(name="🚥 Current Market Sentiment", value=f"Score: ``{average_sentiment_calculation}``\nFeeling: ``{sentiment_text}``", inline=False)
+            if sentiment_image_filename:
+                files.append(File(f"assets/{sentiment_image_filename}", filename=sentiment_image_filename))
+                embed.set_image(url=f"attachment://{sentiment_image_filename}")
+            avatar_url = interaction.user.avatar.url if interaction.user.avatar else None
+            embed.set_footer(text=f"Requested by {interaction.user.display_name}, {current_datetime_hour}.", icon_url=avatar_url if avatar_url else None)
+
+            if rank_age is None:
+                await rank_trackers[app.id].save_rank(rank_number)
+            return Reply(embed=embed, files=files)
+
+        await deferred_responder.respond(interaction, build)
+
     @bot.tree.command(name="coinbase", description="Get the current rank of the Coinbase app")
     async def coinbase_command(interaction: Interaction):
         if not await limit_command(interaction):
             return
-        
-        now = datetime.now()
-        average_sentiment_calculation = await weighted_average_sentiment_calculation()
-        rank_number_coinbase = await current_rank_coinbase()
-        current_datetime_hour = now.strftime('%Y-%m-%d at %H:%M:%S')
-
-        sentiment_text, sentiment_image_filename = await evaluate_sentiment()
-        change_symbol = await coinbase_tracker.compare_ranks(rank_number_coinbase)
-        highest_rank, lowest_rank = await ath_coinbase_tracker.get_extreme_ranks()
-
-        embed = Embed(title="Coinbase Statistics", description="Real-time tracking and analysis of the Coinbase app ranking.", color=0x0052ff)
-        file_thumb = File("assets/coinbase-coin-seeklogo.png", filename="coinbase_logo.png")
-        embed.set_thumbnail(url="attachment://coinbase_logo.png")
-        embed.add_field(name="🏆 Current Rank", value=f"#️⃣{number_to_emoji(rank_number_coinbase)} ``in Finance on {current_datetime_hour}``", inline=False)
-        embed.add_field(name="🔂 Recent Positional Change", value=change_symbol, inline=False)
-        if highest_rank:
-            embed.add_field(name="📈 Peak Rank Achieved (ATH)", value=f"#️⃣{number_to_emoji(highest_rank['rank'])} ``on {highest_rank['timestamp']}``", inline=True)
-        if lowest_rank:
-            embed.add_field(name="📉 Recent Lowest Rank (ATL)", value=f"#️⃣{number_to_emoji(lowest_rank['rank'])} ``on {lowest_rank['timestamp']}``", inline=True)
-        embed.add_field(name="🚥 Current Market Sentiment", value=f"Score: ``{average_sentiment_calculation}``\nFeeling: ``{sentiment_text}``", inline=False)
-        file_sentiment = File(f"assets/{sentiment_image_filename}", filename=sentiment_image_filename)
-        embed.set_image(url=f"attachment://{sentiment_image_filename}")
-        avatar_url = interaction.user.avatar.url if interaction.user.avatar else None
-        embed.set_footer(text=f"Requested by {interaction.user.display_name}, {current_datetime_hour}.", icon_url=avatar_url if avatar_url else None)
-
-        await coinbase_tracker.save_rank(rank_number_coinbase)
-        await interaction.response.send_message(files=[file_thumb, file_sentiment], embed=embed)
+        await send_app_statistics(interaction, "coinbase")
 
     @bot.tree.command(name="cwallet", description="Get the current rank of the Coinbase Wallet app")
     async def cwallet_command(interaction: Interaction):
         if not await limit_command(interaction):
             return
-        
-        now = datetime.now()
-
-        average_sentiment_calculation = await weighted_average_sentiment_calculation()
-        rank_number_wallet = await current_rank_wallet()
-        current_datetime_hour = now.strftime('%Y-%m-%d at %H:%M:%S')
-
-        sentiment_text, sentiment_image_filename = await evaluate_sentiment()
-        change_symbol = await wallet_tracker.compare_ranks(rank_number_wallet)
-        highest_rank, lowest_rank = await ath_wallet_tracker.get_extreme_ranks()
-
-        embed = Embed(title="Coinbase's Wallet Statistics", description="Real-time tracking and analysis of the Coinbase's Wallet app ranking.", color=0x0052ff)
-        file_thumb = File("assets/coinbase-wallet-seeklogo.png", filename="coinbase_wallet_logo.png")
-        embed.set_thumbnail(url="attachment://coinbase_wallet_logo.png")
-
-        embed.add_field(name="🏆 Current Rank", value=f"#️⃣{number_to_emoji(rank_number_wallet)} ``in Finance on {current_datetime_hour}``", inline=False)
-        embed.add_field(name="🔂 Recent Positional Change", value=change_symbol, inline=False)
-        if highest_rank:
-            embed.add_field(name="📈 Peak Rank Achieved (ATH)", value=f"#️⃣{number_to_emoji(highest_rank['rank'])} ``on {highest_rank['timestamp']}``", inline=True)
-        if lowest_rank:
-            embed.add_field(name="📉 Recent Lowest Rank (ATL)", value=f"#️⃣{number_to_emoji(lowest_rank['rank'])} ``on {lowest_rank['timestamp']}``", inline=True)
-
-        embed.add_field(name="🚥 Current Market Sentiment", value=f"Score: ``{average_sentiment_calculation}``\nFeeling: ``{sentiment_text}``", inline=False)
-        file_sentiment = File(f"assets/{sentiment_image_filename}", filename=sentiment_image_filename)
-        embed.set_image(url=f"attachment://{sentiment_image_filename}")
-
-        avatar_url = interaction.user.avatar.url if interaction.user.avatar else None
-        embed.set_footer(text=f"Requested by {interaction.user.display_name}, {current_datetime_hour}.", icon_url=avatar_url if avatar_url else None)
-
-        await wallet_tracker.save_rank(rank_number_wallet)
-        await interaction.response.send_message(files=[file_thumb, file_sentiment], embed=embed)
+        await send_app_statistics(interaction, "wallet")
 
     @bot.tree.command(name="binance", description="Get the current rank of the Binance app")
     async def binance_command(interaction: Interaction):
         if not await limit_command(interaction):
             return
-        
-        now = datetime.now()
-        average_sentiment_calculation = await weighted_average_sentiment_calculation()
-        rank_number_binance = await current_rank_binance()
-        current_datetime_hour = now.strftime('%Y-%m-%d at %H:%M:%S')
-
-        sentiment_text, sentiment_image_filename = await evaluate_sentiment()
-        change_symbol = await binance_tracker.compare_ranks(rank_number_binance)
-        highest_rank, lowest_rank = await ath_cryptodotcom_tracker.get_extreme_ranks()
-
-        embed = Embed(title="Binance Statistics", description="Real-time tracking and analysis of the Binance app ranking.", color=0xf3ba2f)
-        file_thumb = File("assets/binance-smart-chain-bsc-seeklogo.png", filename="binance_logo.png")
-        embed.set_thumbnail(url="attachment://binance_logo.png")
-        embed.add_field(name="🏆 Current Rank", value=f"#️⃣{number_to_emoji(rank_number_binance)} ``in Finance on {current_datetime_hour}``", inline=False)
-        embed.add_field(name="🔂 Recent Positional Change", value=change_symbol, inline=False)
-        if highest_rank:
-            embed.add_field(name="📈 Peak Rank Achieved (ATH)", value=f"#️⃣{number_to_emoji(highest_rank['rank'])} ``on {highest_rank['timestamp']}``", inline=True)
-        if lowest_rank:
-            embed.add_field(name="📉 Recent Lowest Rank (ATL)", value=f"#️⃣{number_to_emoji(lowest_rank['rank'])} ``on {lowest_rank['timestamp']}``", inline=True)
-        embed.add_field(name="🚥 Current Market Sentiment", value=f"Score: ``{average_sentiment_calculation}``\nFeeling: ``{sentiment_text}``", inline=False)
-        file_sentiment = File(f"assets/{sentiment_image_filename}", filename=sentiment_image_filename)
-        embed.set_image(url=f"attachment://{sentiment_image_filename}")
-        avatar_url = interaction.user.avatar.url if interaction.user.avatar else None
-        embed.set_footer(text=f"Requested by {interaction.user.display_name}, {current_datetime_hour}.", icon_url=avatar_url if avatar_url else None)
-
-        await binance_tracker.save_rank(rank_number_binance)
-        await interaction.response.send_message(files=[file_thumb, file_sentiment], embed=embed)
+        await send_app_statistics(interaction, "binance")
 
     @bot.tree.command(name="cryptocom", description="Get the current rank of the Crypto.com app")
     async def cryptocom_command(interaction: Interaction):
         if not await limit_command(interaction):
             return
-        
-        now = datetime.now()
-        average_sentiment_calculation = await weighted_average_sentiment_calculation()
-        rank_number_cryptodotcom = await current_rank_cryptodotcom()
-        current_datetime_hour = now.strftime('%Y-%m-%d at %H:%M:%S')
-
-        sentiment_text, sentiment_image_filename = await evaluate_sentiment()
-        change_symbol = await cryptodotcom_tracker.compare_ranks(rank_number_cryptodotcom)
-        highest_rank, lowest_rank = await ath_cryptodotcom_tracker.get_extreme_ranks()
-
-        embed = Embed(title="Crypto.com Statistics", description="Real-time tracking and analysis of the Crypto.com app ranking.", color=0x1c64b0)
-        file_thumb = File("assets/crypto-com-seeklogo.png", filename="cryptodotcom_logo.png")
-        embed.set_thumbnail(url="attachment://cryptodotcom_logo.png")
-        embed.add_field(name="🏆 Current Rank", value=f"#️⃣{number_to_emoji(rank_number_cryptodotcom)} ``in Finance on {current_datetime_hour}``", inline=False)
-        embed.add_field(name="🔂 Recent Positional Change", value=change_symbol, inline=False)
-        if highest_rank:
-            embed.add_field(name="📈 Peak Rank Achieved (ATH)", value=f"#️⃣{number_to_emoji(highest_rank['rank'])} ``on {highest_rank['timestamp']}``", inline=True)
-        if lowest_rank:
-            embed.add_field(name="📉 Recent Lowest Rank (ATL)", value=f"#️⃣{number_to_emoji(lowest_rank['rank'])} ``on {lowest_rank['timestamp']}``", inline=True)
-        embed.add_field(name="🚥 Current Market Sentiment", value=f"Score: ``{average_sentiment_calculation}``\nFeeling: ``{sentiment_text}``", inline=False)
-        file_sentiment = File(f"assets/{sentiment_image_filename}", filename=sentiment_image_filename)
-        embed.set_image(url=f"attachment://{sentiment_image_filename}")
-        avatar_url = interaction.user.avatar.url if interaction.user.avatar else None
-        embed.set_footer(text=f"Requested by {interaction.user.display_name}, {current_datetime_hour}.", icon_url=avatar_url if avatar_url else None)
-
-        await cryptodotcom_tracker.save_rank(rank_number_cryptodotcom)
-        await interaction.response.send_message(files=[file_thumb, file_sentiment], embed=embed)
+        await send_app_statistics(interaction, "cryptocom")
 
     @bot.tree.command(name="set-alert", description="Set an alert to be notified when a specific crypto app reaches a designated rank.")
     @app_commands.describe(
@@ -219,12 +153,7 @@ async def setup_commands(bot):
         rank="The rank threshold for the alert"
     )
     @app_commands.choices(
-        app_name=[
-            app_commands.Choice(name="Coinbase", value="coinbase"),
-            app_commands.Choice(name="Coinbase wallet", value="cwallet"),
-            app_commands.Choice(name="Crypto.com", value="cryptocom"),
-            app_commands.Choice(name="Binance", value="binance")
-        ],
+        app_name=app_choices,
         operator=[
             app_commands.Choice(name="greater than", value=">"),
             app_commands.Choice(name="less than", value="<"),
@@ -240,25 +169,16 @@ async def setup_commands(bot):
             'rank': rank
         }
 
-        os.makedirs('data', exist_ok=True)
-
         try:
-            alerts = []
-            if os.path.exists('data/alerts.json'):
-                with open('data/alerts.json', 'r') as f:
-                    alerts = json.load(f)
-            
-            for existing_alert in alerts:
-                if existing_alert['user_id'] == interaction.user.id:
-                    embed = Embed(description=f"❌ You have reached your maximum number of alerts. See your current alerts with the ``/myalerts`` command.", color=0xff0000)
-                    avatar_url = interaction.user.avatar.url if interaction.user.avatar else None
-                    embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=avatar_url if avatar_url else None)
-                    await interaction.response.send_message(embed=embed, ephemeral=True)
-                    return
-            
-            alerts.append(alert_data)
-            with open('data/alerts.json', 'w') as f:
-                json.dump(alerts, f, indent=4)
+            if await subscriptions.user_alerts_async(interaction.user.id):
+                embed = Embed(description=f"❌ You have reached your maximum number of alerts. See your current alerts with the ``/myalerts`` command.", color=0xff0000)
+                avatar_url = interaction.user.avatar.url if interaction.user.avatar else None
+                embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=avatar_url if avatar_url else None)
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+                return
+
+            await subscriptions.add_alert_async(alert_data)
+            evaluate_new_alert(alert_data['app_name'])
 
             embed = Embed(description=f"✅🔔 Alert set for ``{app_name}`` when rank ``{operator} {rank}``.", color=0x00ff00)
             avatar_url = interaction.user.avatar.url if interaction.user.avatar else None
@@ -272,15 +192,11 @@ async def setup_commands(bot):
     @bot.tree.command(name="set-notification", description="Receive daily or weekly updates on the position of a specific crypto app on the App Store.")
     @app_commands.describe(
     interval = "The interval to send notifications for your specific crypto app (daily, weekly)",
-    hour = "The hour of the day to receive the notification (6 AM, 12 PM, 6 PM, 10 PM)"
+    hour = "The hour of the day to receive the notification (6 AM, 12 PM, 6 PM, 10 PM)",
+    timezone = f"Your time zone, e.g. America/New_York (default: {NOTIF_DEFAULT_TIMEZONE})"
     )
     @app_commands.choices(
-        app_name=[
-            app_commands.Choice(name="Coinbase", value="coinbase"),
-            app_commands.Choice(name="Coinbase wallet", value="cwallet"),
-            app_commands.Choice(name="Crypto.com", value="cryptocom"),
-            app_commands.Choice(name="Binance", value="binance")
-        ],
+        app_name=app_choices,
         interval=[
             app_commands.Choice(name="daily", value="daily"),
             app_commands.Choice(name="weekly", value="weekly"),
@@ -292,7 +208,15 @@ async def setup_commands(bot):
             app_commands.Choice(name="10 PM", value="22:00")
         ]
     )
-    async def set_notif_command(interaction: Interaction, app_name: str, interval: str, hour: str):
+    async def set_notif_command(interaction: Interaction, app_name: str, interval: str, hour: str, timezone: str = None):
+        if timezone:
+            try:
+                ZoneInfo(timezone)
+            except (ZoneInfoNotFoundError, ValueError):
+                embed = Embed(description=f"❌ Unknown time zone ``{timezone}``. Use a name like ``Europe/Paris`` or ``America/New_York``.", color=0xff0000)
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+                return
+
         now = datetime.now()
         current_week = now.strftime('%U')
         notif_data = {
@@ -300,33 +224,23 @@ async def setup_commands(bot):
             'app_name': app_name.lower(),
             'interval': interval,
             'hour': hour,
+            'timezone': timezone or NOTIF_DEFAULT_TIMEZONE,
             'week': current_week,
             'last_sent_week': None,
             'last_sent_day': None
         }
 
-        os.makedirs('data', exist_ok=True)
-
         try:
-            notifs = []
-            if os.path.exists('data/notifs.json'):
-                with open('data/notifs.json', 'r') as f:
-                    notifs = json.load(f)
-            
-            for existing_notif in notifs:
-                if existing_notif['user_id'] == interaction.user.id:
-
-                    embed = Embed(description=f"❌ You have reached your maximum number of notifications. See your current notifications with the ``/myalerts`` command.", color=0xff0000)
-                    avatar_url = interaction.user.avatar.url if interaction.user.avatar else None
-                    embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=avatar_url if avatar_url else None)
-                    await interaction.response.send_message(embed=embed, ephemeral=True)
-                    return
-            
-            notifs.append(notif_data)
-            with open('data/notifs.json', 'w') as f:
-                json.dump(notifs, f, indent=4)
+            if await subscriptions.user_notifs_async(interaction.user.id):
+                embed = Embed(description=f"❌ You have reached your maximum number of notifications. See your current notifications with the ``/myalerts`` command.", color=0xff0000)
+                avatar_url = interaction.user.avatar.url if interaction.user.avatar else None
+                embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=avatar_url if avatar_url else None)
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+                return
 
-            embed = Embed(description=f"✅📆🔔``{interval.capitalize()}`` notification set for ``{app_name}`` rank on the App Store at ``{hour}``.", color=0x00ff00)
+            await subscriptions.add_notif_async(notif_data)
+
+            embed = Embed(description=f"✅📆🔔``{interval.capitalize()}`` notification set for ``{app_name}`` rank on the App Store at ``{hour}`` ({notif_data['timezone']}).", color=0x00ff00)
             avatar_url = interaction.user.avatar.url if interaction.user.avatar else None
             embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=avatar_url if avatar_url else None)
             await interaction.response.send_message(embed=embed, ephemeral=False)
@@ -343,30 +257,16 @@ async def setup_commands(bot):
             return
 
         user_id = interaction.user.id
-        alert_file_path = 'data/alerts.json'
 
         try:
-            with open(alert_file_path, 'r+') as file:
-                alerts = json.load(file)
-                new_alerts = [alert for alert in alerts if not (alert['user_id'] == user_id and alert['app_name'].lower() == app_name.lower())]
-
-                if len(alerts) == len(new_alerts):
-                    embed = Embed(description=f"🙅‍♂️ No alert found for `{app_name.capitalize()}` that belongs to you.", color=Colour.red())
-                else:
-                    file.seek(0)
-                    json.dump(new_alerts, file, indent=4)
-                    file.truncate()
-                    embed = Embed(description=f"🚮 Alert for `{app_name.capitalize()}` has been successfully removed.", color=Colour.green())
-
-                embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
-                await interaction.response.send_message(embed=embed, ephemeral=True)
+            if not await subscriptions.remove_user_alerts_async(user_id, app_name):
+                embed = Embed(description=f"🙅‍♂️ No alert found for `{app_name.capitalize()}` that belongs to you.", color=Colour.red())
+            else:
+                embed = Embed(description=f"🚮 Alert for `{app_name.capitalize()}` has been successfully removed.", color=Colour.green())
 
-        except FileNotFoundError:
-            embed = Embed(description="🚨 Alert data file not found.", color=Colour.red())
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-        except json.JSONDecodeError:
-            embed = Embed(description="🚨 Error reading the alert data.", color=Colour.red())
+            embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
             await interaction.response.send_message(embed=embed, ephemeral=True)
+
         except Exception as e:
             embed = Embed(description=f"🚨 Failed to remove the alert due to an error: {e}", color=Colour.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -374,16 +274,10 @@ async def setup_commands(bot):
     @bot.tree.command(name="myalerts", description="Display your active alerts and notifications")
     async def myalerts_command(interaction: Interaction):
         user_id = interaction.user.id
-        alert_file_path = 'data/alerts.json'
-        notif_file_path = 'data/notifs.json'
 
         try:
-            with open(alert_file_path, 'r') as file_alerts:
-                alerts = json.load(file_alerts)
-                user_alerts = [alert for alert in alerts if int(alert['user_id']) == user_id]
-            with open(notif_file_path, 'r') as file_notifs:
-                notifs = json.load(file_notifs)
-                user_notifs = [notif for notif in notifs if int(notif['user_id']) == user_id]
+            user_alerts, user_notifs = await asyncio.gather(subscriptions.user_alerts_async(user_id),
+                                                            subscriptions.user_notifs_async(user_id))
 
             if not user_alerts and not user_notifs:
                 embed = Embed(description="🤷‍♂️ You have no active alerts nor notifications.", color=Colour.blue())
@@ -395,20 +289,12 @@ async def setup_commands(bot):
                                     inline=False)
                 for notif in user_notifs: 
                     embed.add_field(name=f"✅📆 {notif['app_name'].title()} notification(s)",
-                                    value=f"``Frequency: {notif['interval']} at {notif['hour']}.``",
+                                    value=f"``Frequency: {notif['interval']} at {notif['hour']} ({notif.get('timezone', NOTIF_DEFAULT_TIMEZONE)}).``",
                                     inline=False)
 
             embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
-        except FileNotFoundError:
-            embed = Embed(description="🚨 Alert data file not found.", color=Colour.red())
-            embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-        except json.JSONDecodeError:
-            embed = Embed(description="🚨 Error reading the alert data.", color=Colour.red())
-            embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
-            await interaction.response.send_message(embed=embed, ephemeral=True)
         except Exception as e:
             embed = Embed(description=f"🚨 An error occurred while retrieving your alerts: {e}", color=Colour.red())
             embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
@@ -418,35 +304,16 @@ async def setup_commands(bot):
     async def remove_all_alerts_command(interaction: Interaction):
         user_id = interaction.user.id
         try:
-            if os.path.exists('data/alerts.json'):
-                with open('data/alerts.json', 'r') as file:
-                    alerts = json.load(file)
-                
-                user_alerts = [alert for alert in alerts if alert['user_id'] == user_id]
-
-                if not user_alerts:
-                    embed = Embed(description="🤷‍♂️ You have no alerts to remove.", color=Colour.blue())
-                    embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
-                    await interaction.response.send_message(embed=embed, ephemeral=True)
-                    return
-
-                alerts = [alert for alert in alerts if alert['user_id'] != user_id]
-
-                with open('data/alerts.json', 'w') as file:
-                    json.dump(alerts, file, indent=4)
-                
-                embed = Embed(title="🚮✅ Alerts Removed", description="All your alerts have been successfully removed.", color=0x00ff00)
-                embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-            else:
-                embed = Embed(description="🤷‍♂️ No alert file found or no alerts set.", color=Colour.blue())
+            if not await subscriptions.remove_user_alerts_async(user_id):
+                embed = Embed(description="🤷‍♂️ You have no alerts to remove.", color=Colour.blue())
                 embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
                 await interaction.response.send_message(embed=embed, ephemeral=True)
+                return
 
-        except json.JSONDecodeError as e:
-            embed = Embed(description=f"🚨 Error reading the alert data: {str(e)}", color=0xff0000)
+            embed = Embed(title="🚮✅ Alerts Removed", description="All your alerts have been successfully removed.", color=0x00ff00)
             embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
             await interaction.response.send_message(embed=embed, ephemeral=True)
+
         except Exception as e:
             embed = Embed(description=f"🚨 Failed to remove alerts due to an error: {str(e)}", color=0xff0000)
             embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
@@ -456,35 +323,16 @@ async def setup_commands(bot):
     async def remove_all_notifications_command(interaction: Interaction):
         user_id = interaction.user.id
         try:
-            if os.path.exists('data/notifs.json'):
-                with open('data/notifs.json', 'r') as file:
-                    notifs = json.load(file)
-                
-                user_notifs = [notif for notif in notifs if notif['user_id'] == user_id]
-
-                if not user_notifs:
-                    embed = Embed(description="🤷‍♂️ You have no notifications to remove.", color=Colour.blue())
-                    embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
-                    await interaction.response.send_message(embed=embed, ephemeral=True)
-                    return
-
-                notifs = [notif for notif in notifs if notif['user_id'] != user_id]
-
-                with open('data/notifs.json', 'w') as file:
-                    json.dump(notifs, file, indent=4)
-                
-                embed = Embed(title="🚮✅ Notifications Removed", description="All your notifications have been successfully removed.", color=0x00ff00)
-                embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-            else:
-                embed = Embed(description="🤷‍♂️ No notification file found or no notif(s) set.", color=Colour.blue())
+            if not await subscriptions.remove_user_notifs_async(user_id):
+                embed = Embed(description="🤷‍♂️ You have no notifications to remove.", color=Colour.blue())
                 embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
                 await interaction.response.send_message(embed=embed, ephemeral=True)
+                return
 
-        except json.JSONDecodeError as e:
-            embed = Embed(description=f"🚨 Error reading the notif data: {str(e)}", color=0xff0000)
+            embed = Embed(title="🚮✅ Notifications Removed", description="All your notifications have been successfully removed.", color=0x00ff00)
             embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
             await interaction.response.send_message(embed=embed, ephemeral=True)
+
         except Exception as e:
             embed = Embed(description=f"🚨 Failed to remove notifs due to an error: {str(e)}", color=0xff0000)
             embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
@@ -495,9 +343,10 @@ async def setup_commands(bot):
         if not await limit_command(interaction):
             return
         
-        rank_tracker = RankTracker(bot)
+        await deferred_responder.respond(interaction, build_all_ranks)
 
-        bitcoin_price = await get_bitcoin_price_usd()  
+    async def build_all_ranks():
+        bitcoin_price = price_feed.latest() or "Unavailable"
         bitcoin_emoji_id = "1234500592559194164"
         bitcoin_emoji = f"<:bitcoin:{bitcoin_emoji_id}>"
         bitcoin_price_text = f"``Current Bitcoin Price: 💲{bitcoin_price:,.2f} USD``" if bitcoin_price != "Unavailable" else f"{bitcoin_emoji} Bitcoin Price: Unavailable"
@@ -507,24 +356,14 @@ async def setup_commands(bot):
         embed.set_thumbnail(url="attachment://app_store_logo.png")
         embed.add_field(name=f"{bitcoin_emoji} Bitcoin Price", value=bitcoin_price_text, inline=False)
 
-        apps = ["coinbase", "wallet", "binance", "cryptocom"]
-        emoji_ids = {
-            "coinbase": "<:coinbase_icon:1234492789967032330>",
-            "wallet": "<:wallet_icon:1234492792320036925>",
-            "binance": "<:binance_icon:1234492788616331295>",
-            "cryptocom": "<:cryptocom_icon:1234492791355080874>"
-        }
-
-        logging.debug(f"Awaiting fetch_all_ranks")
-        current_ranks = await rank_tracker.fetch_all_ranks()
-
-        for idx, app in enumerate(apps):
-            logging.debug(f"Awaiting get_historical_rank for {app} yesterday")
-            yesterday_rank = await rank_tracker.get_historical_rank(app, days_back=1)
-            last_week_rank = await rank_tracker.get_historical_rank(app, days_back=7)
-            last_month_rank = await rank_tracker.get_historical_rank(app, months_back=1)
+        # Current ranks and every app's lookbacks are gathered at once; each app's history is read once.
+        current_ranks, lookbacks = await asyncio.gather(
+            asyncio.gather(*(rank_with_staleness(app.id) for app in registry)),
+            asyncio.gather(*(historical_ranks(app.id, [1, 7, 30]) for app in registry))
+        )
 
-            current_rank = current_ranks[idx] if current_ranks[idx] is not None else "Unavailable"
+        for app, (current_rank, rank_age), (yesterday_rank, last_week_rank, last_month_rank) in zip(registry, current_ranks, lookbacks):
+            current_rank = current_rank if current_rank is not None else "Unavailable"
 
             change_text = "No data"
             if isinstance(current_rank, int) and isinstance(yesterday_rank, int):
@@ -542,12 +381,12 @@ async def setup_commands(bot):
                 change_text = "Data unavailable"
 
             embed.add_field(
-                name=f"{emoji_ids[app]} {app.capitalize()} Rank",
-                value=f"|``Current``: #️⃣{number_to_emoji(current_rank)} ({change_text} ) \n-| ``Yesterday``: #️⃣{number_to_emoji(yesterday_rank)} \n--| ``Last Week``: #️⃣{number_to_emoji(last_week_rank)} \n---| ``Last Month``: #️⃣{number_to_emoji(last_month_rank)}",
+                name=f"{app.emoji} {app.name} Rank",
+                value=f"|``Current``: #️⃣{number_to_emoji(current_rank)} ({change_text} ) {staleness_badge(rank_age)}\n-| ``Yesterday``: #️⃣{number_to_emoji(yesterday_rank)} \n--| ``Last Week``: #️⃣{number_to_emoji(last_week_rank)} \n---| ``Last Month``: #️⃣{number_to_emoji(last_month_rank)}",
                 inline=False
             )
 
-        await interaction.response.send_message(files=[file_thumb], embed=embed)
+        return Reply(embed=embed, files=[file_thumb])
 
     @bot.tree.command(name="chart", description="Get a chart for a specific app over a specified time range.")
     @app_commands.choices(
@@ -569,39 +408,29 @@ async def setup_commands(bot):
         if not await limit_command(interaction):
             return
 
-        # Mapping app names to their logo paths
-        app_logos = {
-            "binance": "assets/binance-smart-chain-bsc-seeklogo.png",
-            "coinbase": "assets/coinbase-coin-seeklogo.png",
-            "crypto.com": "assets/crypto-com-seeklogo.png",
-            "wallet": "assets/coinbase-wallet-seeklogo.png"
-        }
-
-        # Construct the file path for the chart image
-        file_path = os.path.join('data', f'{app_name.lower()}_btc_data_{duration}.png')
+        async def build():
+            app = registry.resolve(app_name)
+            file_path = await chart_renderer.chart(app.id, duration) if app else None
+            if not file_path:
+                raise ReplyError(f"Sorry, I couldn't find the chart for {app_name.capitalize()} over the past {duration.replace('_', ' ')}.")
 
-        # Check if the file exists
-        if os.path.exists(file_path):
-            # Create an embed
             embed = Embed(
                 title=f'{app_name.capitalize()} Chart for {duration.replace("_", " ")}',
                 description=f'Here is the chart for ``{app_name.capitalize()}`` correlated to BTC over the past ``{duration.replace("_", " ")}``.',
                 color=0x3498db
             )
-            # Attach the file for the chart
-            file = File(file_path, filename=os.path.basename(file_path))
-            embed.set_image(url=f"attachment://{os.path.basename(file_path)}")
+            chart_filename = f"{app.id}_btc_data_{duration}.png"
+            files = [File(file_path, filename=chart_filename)]
+            embed.set_image(url=f"attachment://{chart_filename}")
 
             # Attach the thumbnail for the app logo
-            if app_name in app_logos:
-                app_logo_path = app_logos[app_name]
-                app_logo_file = File(app_logo_path, filename=os.path.basename(app_logo_path))
+            if app.logo:
+                app_logo_path = app.logo
+                files.append(File(app_logo_path, filename=os.path.basename(app_logo_path)))
                 embed.set_thumbnail(url=f"attachment://{os.path.basename(app_logo_path)}")
-                await interaction.response.send_message(files=[file, app_logo_file], embed=embed)
-            else:
-                await interaction.response.send_message(files=[file], embed=embed)
-        else:
-            await interaction.response.send_message(f"Sorry, I couldn't find the chart for {app_name.capitalize()} over the past {duration.replace('_', ' ')}.", ephemeral=True)
+            return Reply(embed=embed, files=files)
+
+        await deferred_responder.respond(interaction, build)
 
     @bot.tree.command(name="maintenance", description="Toggle maintenance mode for the bot.")
     @app_commands.describe(mode="Enter 'on' to start maintenance or 'off' to end it.", reason="Reason for maintenance")
@@ -12,4 +12,78 @@ from dotenv import load_dotenv
 load_dotenv()
 
 BOT_TOKEN = os.getenv('BOT_TOKEN_TEST')
-discord_user_id = os.getenv("DISCORD_USER_ID")
\ No newline at end of file
+discord_user_id = os.getenv("DISCORD_USER_ID")
+
+RANK_CACHE_TTL = float(os.getenv('RANK_CACHE_TTL', 60))
+RANK_CACHE_NEGATIVE_TTL = float(os.getenv('RANK_CACHE_NEGATIVE_TTL', 10))
+
+HTTP_POOL_LIMIT = int(os.getenv('HTTP_POOL_LIMIT', 100))
+HTTP_LIMIT_PER_HOST = int(os.getenv('HTTP_LIMIT_PER_HOST', 8))
+HTTP_DNS_CACHE_TTL = int(os.getenv('HTTP_DNS_CACHE_TTL', 300))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', 60))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_TOTAL_TIMEOUT = float(os.getenv('HTTP_TOTAL_TIMEOUT', 15))
+
+APP_REGISTRY_PATH = os.getenv('APP_REGISTRY_PATH', os.path.join(os.path.dirname(__file__), 'api', 'apps.json'))
+APP_STORE_BASE_URL = os.getenv('APP_STORE_BASE_URL', 'https://apps.apple.com')
+RANK_FETCH_CONCURRENCY = int(os.getenv('RANK_FETCH_CONCURRENCY', 8))
+
+RANK_EXTRACTOR = os.getenv('RANK_EXTRACTOR', 'auto')
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', 2))
+
+HISTORY_DB_PATH = os.getenv('HISTORY_DB_PATH', 'data/rank_history.db')
+
+JOURNAL_FSYNC_BATCH = int(os.getenv('JOURNAL_FSYNC_BATCH', 64))
+JOURNAL_FSYNC_INTERVAL = float(os.getenv('JOURNAL_FSYNC_INTERVAL', 1.0))
+JOURNAL_COMPACT_EVERY = int(os.getenv('JOURNAL_COMPACT_EVERY', 1000))
+
+RANK_POLL_INTERVAL = float(os.getenv('RANK_POLL_INTERVAL', 60))
+STATUS_MIN_INTERVAL = float(os.getenv('STATUS_MIN_INTERVAL', 15))
+
+NOTIF_DEFAULT_TIMEZONE = os.getenv('NOTIF_DEFAULT_TIMEZONE', 'Europe/Paris')
+
+DM_WORKERS = int(os.getenv('DM_WORKERS', 4))
+DM_MAX_RETRIES = int(os.getenv('DM_MAX_RETRIES', 3))
+DM_CONTEXT_TTL = float(os.getenv('DM_CONTEXT_TTL', 30))
+DM_USER_CACHE_SIZE = int(os.getenv('DM_USER_CACHE_SIZE', 10000))
+
+RATE_LIMIT_USER = os.getenv('RATE_LIMIT_USER', '1/10')
+RATE_LIMIT_GUILD = os.getenv('RATE_LIMIT_GUILD', '')
+RATE_LIMIT_COMMANDS = os.getenv('RATE_LIMIT_COMMANDS', '')
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000))
+RATE_LIMIT_SNAPSHOT_PATH = os.getenv('RATE_LIMIT_SNAPSHOT_PATH', '')
+RATE_LIMIT_SNAPSHOT_INTERVAL = float(os.getenv('RATE_LIMIT_SNAPSHOT_INTERVAL', 60))
+
+CHART_CACHE_DIR = os.getenv('CHART_CACHE_DIR', 'data/charts')
+CHART_MAX_POINTS = int(os.getenv('CHART_MAX_POINTS', 600))
+CHART_WORKERS = int(os.getenv('CHART_WORKERS', 1))
+
+BTC_PRICE_URL = os.getenv('BTC_PRICE_URL', 'https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=USD')
+BTC_PRICE_TTL = float(os.getenv('BTC_PRICE_TTL', 300))
+BTC_POLL_INTERVAL = float(os.getenv('BTC_POLL_INTERVAL', 300))
+
+HISTORY_CACHE_DAYS = int(os.getenv('HISTORY_CACHE_DAYS', 35))
+
+FRESH_FETCH_DEADLINE = float(os.getenv('FRESH_FETCH_DEADLINE', 1.5))
+
+RANK_POLL_MIN_INTERVAL = float(os.getenv('RANK_POLL_MIN_INTERVAL', 30))
+RANK_POLL_MAX_INTERVAL = float(os.getenv('RANK_POLL_MAX_INTERVAL', 600))
+RANK_POLL_JITTER = float(os.getenv('RANK_POLL_JITTER', 0.1))
+RANK_BACKOFF_MAX = float(os.getenv('RANK_BACKOFF_MAX', 900))
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', 5))
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', 120))
+
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9108))
+METRICS_LOG_INTERVAL = float(os.getenv('METRICS_LOG_INTERVAL', 300))
+
+SUBSCRIPTION_FLUSH_MS = int(os.getenv('SUBSCRIPTION_FLUSH_MS', 500))
+
+# none: one gateway connection; auto: AutoShardedBot, every shard in this process;
+# process: this process runs SHARD_IDS of SHARD_COUNT, and one elected process scrapes.
+# Run every process from the same directory, each with its own METRICS_PORT.
+BOT_SHARDING = os.getenv('BOT_SHARDING', 'none')
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', 0))
+SHARD_IDS = [int(shard) for shard in os.getenv('SHARD_IDS', '').split(',') if shard.strip()]
+LEADER_LEASE_TTL = float(os.getenv('LEADER_LEASE_TTL', 30))
+LEADER_SYNC_INTERVAL = float(os.getenv('LEADER_SYNC_INTERVAL', 1.0))
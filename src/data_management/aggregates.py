@@ -0,0 +1,199 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+
+from data_management.history_store import history_store, to_epoch
+
+WINDOWS = {'24h': 24 * 3600, '7d': 7 * 24 * 3600, '30d': 30 * 24 * 3600}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rank_extremes (
+    app TEXT PRIMARY KEY,
+    ath_rank INTEGER NOT NULL,
+    ath_ts INTEGER NOT NULL,
+    atl_rank INTEGER NOT NULL,
+    atl_ts INTEGER NOT NULL,
+    last_ts INTEGER NOT NULL
+);
+"""
+
+class RollingWindow:
+    """Min, max, mean and volatility of the samples seen in the last `span` seconds.
+
+    Monotonic deques keep min/max amortised O(1) per sample, and running sums keep
+    mean and standard deviation O(1) to read.
+    """
+
+    def __init__(self, span):
+        self.span = span
+        self.samples = deque()
+        self.minimums = deque()
+        self.maximums = deque()
+        self.total = 0
+        self.total_squares = 0
+
+    def add(self, ts, rank):
+        self.samples.append((ts, rank))
+        self.total += rank
+        self.total_squares += rank * rank
+        while self.minimums and self.minimums[-1][1] >= rank:
+            self.minimums.pop()
+        self.minimums.append((ts, rank))
+        while self.maximums and self.maximums[-1][1] <= rank:
+            self.maximums.pop()
+        self.maximums.append((ts, rank))
+        self.expire(ts)
+
+    def expire(self, now):
+        horizon = now - self.span
+        while self.samples and self.samples[0][0] <= horizon:
+            _, rank = self.samples.popleft()
+            self.total -= rank
+            self.total_squares -= rank * rank
+        while self.minimums and self.minimums[0][0] <= horizon:
+            self.minimums.popleft()
+        while self.maximums and self.maximums[0][0] <= horizon:
+            self.maximums.popleft()
+
+    def stats(self):
+        count = len(self.samples)
+        if not count:
+            return None
+        mean = self.total / count
+        variance = max(0.0, self.total_squares / count - mean * mean)
+        return {
+            'min': self.minimums[0][1],
+            'max': self.maximums[0][1],
+            'mean': round(mean, 2),
+            'volatility': round(math.sqrt(variance), 2),
+            'samples': count,
+        }
+
+class AppAggregates:
+    def __init__(self, app):
+        self.app = app
+        self.ath = None
+        self.atl = None
+        self.last_ts = 0
+        self.windows = {name: RollingWindow(span) for name, span in WINDOWS.items()}
+
+    def add(self, ts, rank):
+        if self.ath is None or rank < self.ath[0]:
+            self.ath = (rank, ts)
+        if self.atl is None or rank > self.atl[0]:
+            self.atl = (rank, ts)
+        for window in self.windows.values():
+            window.add(ts, rank)
+        self.last_ts = max(self.last_ts, ts)
+
+class RankAggregates:
+    """Materialised all-time and rolling rank aggregates, updated on each new sample.
+
+    ATH/ATL are persisted in the history database next to the samples so a restart
+    does not rescan history; rolling windows are reloaded from the last 30 days.
+    Everything can be rebuilt from the history with rebuild().
+    """
+
+    def __init__(self, store=history_store):
+        self.store = store
+        self.apps = {}
+        self._schema_ready = False
+
+    def _ensure_schema(self):
+        if not self._schema_ready:
+            self.store.executescript(SCHEMA)
+            self._schema_ready = True
+
+    def _get(self, app):
+        if app not in self.apps:
+            self.apps[app] = AppAggregates(app)
+        return self.apps[app]
+
+    def load(self, apps):
+        """Restore persisted ATH/ATL and warm the rolling windows from recent history."""
+        self._ensure_schema()
+        horizon = int(time.time()) - max(WINDOWS.values())
+        for app in apps:
+            aggregates = self._get(app)
+            rows = self.store.execute("SELECT ath_rank, ath_ts, atl_rank, atl_ts, last_ts FROM rank_extremes WHERE app = ?", (app,))
+            if rows:
+                ath_rank, ath_ts, atl_rank, atl_ts, _ = rows[0]
+            else:
+                best, worst = self.store.extremes(app)
+                if best is None:
+                    continue
+                (ath_rank, ath_ts), (atl_rank, atl_ts) = best, worst
+            for ts, rank in self.store.range(app, horizon):
+                aggregates.add(ts, rank)
+            aggregates.ath = (ath_rank, ath_ts)
+            aggregates.atl = (atl_rank, atl_ts)
+            latest = self.store.latest(app)
+            aggregates.last_ts = latest[0] if latest else 0
+            self._persist(aggregates)
+
+    def rebuild(self, app):
+        """Recompute every aggregate of app from its full history."""
+        self._ensure_schema()
+        self.store.execute("DELETE FROM rank_extremes WHERE app = ?", (app,))
+        self.apps[app] = AppAggregates(app)
+        self.load([app])
+
+    def _persist(self, aggregates):
+        if aggregates.ath is None:
+            return
+        self.store.execute(
+            "INSERT OR REPLACE INTO rank_extremes (app, ath_rank, ath_ts, atl_rank, atl_ts, last_ts) VALUES (?, ?, ?, ?, ?, ?)",
+            (aggregates.app, *aggregates.ath, *aggregates.atl, aggregates.last_ts)
+        )
+
+    def record(self, app, rank, ts=None):
+        """Store a sample in the history and fold it into the aggregates."""
+        self._ensure_schema()
+        ts = self.store.add_sample(app, rank, ts)
+        aggregates = self._get(app)
+        previous = (aggregates.ath, aggregates.atl)
+        aggregates.add(ts, int(rank))
+        if (aggregates.ath, aggregates.atl) != previous:
+            self._persist(aggregates)
+        return ts
+
+    async def record_async(self, app, rank, ts=None):
+        return await asyncio.to_thread(self.record, app, rank, ts)
+
+    async def load_async(self, apps, rebuild=False):
+        try:
+            if rebuild:
+                for app in apps:
+                    await asyncio.to_thread(self.rebuild, app)
+            else:
+                await asyncio.to_thread(self.load, apps)
+        except Exception as e:
+            logging.error(f"Failed to load rank aggregates: {e}")
+
+    def extremes(self, app):
+        """((ath_rank, ts), (atl_rank, ts)) for app, or (None, None), in O(1)."""
+        aggregates = self.apps.get(app)
+        if aggregates is None or aggregates.ath is None:
+            return None, None
+        return aggregates.ath, aggregates.atl
+
+    def window(self, app, name, now=None):
+        """Rolling stats of app over window name ('24h', '7d' or '30d'), or None."""
+        aggregates = self.apps.get(app)
+        if aggregates is None:
+            return None
+        window = aggregates.windows[name]
+        window.expire(to_epoch(now) if now is not None else int(time.time()))
+        return window.stats()
+
+rank_aggregates = RankAggregates()
@@ -0,0 +1,174 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import time
+from itertools import chain
+
+import numpy as np
+
+from data_management.history_store import history_store, to_epoch
+from data_management.aggregates import rank_aggregates
+from api.cache import cache_requests
+
+class RankSeries:
+    """A rank history held in two contiguous arrays: int64 epoch seconds and int16 ranks.
+
+    Timestamps are sorted, so point-in-time lookups are binary searches
+    (np.searchsorted) and every statistic is computed in vectorised form.
+    Rank 1 is the best, so a rank "drawdown" is a rise in the rank number.
+    """
+
+    def __init__(self, ts, ranks):
+        self.ts = np.ascontiguousarray(ts, dtype=np.int64)
+        self.ranks = np.ascontiguousarray(ranks, dtype=np.int16)
+
+    @classmethod
+    def from_samples(cls, samples):
+        """Build from (ts, rank) pairs sorted by ts, as returned by RankHistoryStore.range()."""
+        if not len(samples):
+            return cls(np.empty(0, np.int64), np.empty(0, np.int16))
+        # fromiter over the flattened pairs avoids building a temporary object array.
+        data = np.fromiter(chain.from_iterable(samples), dtype=np.int64, count=2 * len(samples)).reshape(-1, 2)
+        return cls(data[:, 0], data[:, 1])
+
+    @classmethod
+    def load(cls, app, start=0, end=None, store=history_store):
+        return cls.from_samples(store.range(app, start, end))
+
+    @classmethod
+    async def load_async(cls, app, start=0, end=None, store=history_store):
+        return await asyncio.to_thread(cls.load, app, start, end, store)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def between(self, start, end=None):
+        """The samples with start <= ts <= end, as a view on the same arrays."""
+        lo = np.searchsorted(self.ts, to_epoch(start), side='left')
+        hi = np.searchsorted(self.ts, to_epoch(end), side='right') if end is not None else len(self.ts)
+        return RankSeries(self.ts[lo:hi], self.ranks[lo:hi])
+
+    def at(self, ts, not_before=None):
+        """Rank of the latest sample at or before ts (and not before not_before), or None."""
+        index = np.searchsorted(self.ts, to_epoch(ts), side='right') - 1
+        if index < 0 or (not_before is not None and self.ts[index] < to_epoch(not_before)):
+            return None
+        return int(self.ranks[index])
+
+    def lookback(self, targets, max_age=None):
+        """Ranks as of every timestamp in targets at once; -1 where there is no sample
+        (or the latest one is older than max_age seconds)."""
+        targets = np.asarray(targets, dtype=np.int64)
+        indices = np.searchsorted(self.ts, targets, side='right') - 1
+        found = indices >= 0
+        if max_age is not None:
+            found &= targets - self.ts[np.clip(indices, 0, None)] <= max_age
+        result = np.full(len(targets), -1, dtype=np.int16)
+        result[found] = self.ranks[indices[found]]
+        return result
+
+    def rolling(self, window):
+        """Time-based trailing mean and standard deviation over `window` seconds at every sample.
+
+        Prefix sums turn each window into two subtractions; the window start of every
+        sample is found with one searchsorted call.
+        """
+        ranks = self.ranks.astype(np.float64)
+        sums = np.concatenate(([0.0], np.cumsum(ranks)))
+        squares = np.concatenate(([0.0], np.cumsum(ranks * ranks)))
+        starts = np.searchsorted(self.ts, self.ts - window, side='right')
+        ends = np.arange(1, len(ranks) + 1)
+        counts = ends - starts
+        mean = (sums[ends] - sums[starts]) / counts
+        variance = np.maximum((squares[ends] - squares[starts]) / counts - mean * mean, 0.0)
+        return mean, np.sqrt(variance)
+
+    def percentiles(self, q=(5, 25, 50, 75, 95)):
+        if not len(self):
+            return {}
+        return dict(zip(q, np.percentile(self.ranks, q).round(2).tolist()))
+
+    def correlation(self, price_ts, prices):
+        """Pearson correlation between rank and the BTC price as of each rank sample.
+
+        A negative value means the app climbs the chart (rank number falls) when BTC rises.
+        """
+        price_ts = np.asarray(price_ts, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        indices = np.searchsorted(price_ts, self.ts, side='right') - 1
+        mask = indices >= 0
+        if mask.sum() < 2:
+            return None
+        ranks = self.ranks[mask].astype(np.float64)
+        aligned = prices[indices[mask]]
+        if ranks.std() == 0 or aligned.std() == 0:
+            return None
+        return float(np.corrcoef(ranks, aligned)[0, 1])
+
+    def drawdowns(self):
+        """Distance of every sample from the best rank seen so far (0 at a new best)."""
+        best = np.minimum.accumulate(self.ranks)
+        return self.ranks - best
+
+    def max_drawdown(self):
+        """(places lost, ts of the best rank before it, ts of the worst point) of the deepest drawdown, or None."""
+        if not len(self):
+            return None
+        drawdowns = self.drawdowns()
+        trough = int(np.argmax(drawdowns))
+        if drawdowns[trough] == 0:
+            return 0, int(self.ts[trough]), int(self.ts[trough])
+        peak = int(np.argmin(self.ranks[:trough + 1]))
+        return int(drawdowns[trough]), int(self.ts[peak]), int(self.ts[trough])
+
+class SeriesCache:
+    """Recent RankSeries per app, shared by every command.
+
+    The first request loads `horizon` seconds of history; later requests only
+    append the samples stored since (when the aggregates, or the history store in
+    processes that do not load them, report a newer sample), so a command never
+    rereads the whole history. Concurrent loads of the same app share one query.
+    """
+
+    def __init__(self, horizon, store=history_store):
+        self.horizon = horizon
+        self.store = store
+        self._series = {}
+        self._locks = {}
+
+    async def _latest_ts(self, app):
+        aggregates = rank_aggregates.apps.get(app)
+        if aggregates is not None and aggregates.last_ts:
+            return aggregates.last_ts
+        # Followers never load the aggregates: ask the history the leader writes.
+        latest = await self.store.latest_async(app)
+        return latest[0] if latest else None
+
+    async def get(self, app):
+        series = self._series.get(app)
+        latest = await self._latest_ts(app)
+        if series is not None and latest is not None and len(series) and series.ts[-1] >= latest:
+            cache_requests.inc(cache='series', result='hit')
+            return series
+        cache_requests.inc(cache='series', result='miss')
+
+        lock = self._locks.setdefault(app, asyncio.Lock())
+        async with lock:
+            series = self._series.get(app)
+            start = int(time.time()) - self.horizon
+            if series is None or not len(series):
+                series = await RankSeries.load_async(app, start, store=self.store)
+            else:
+                newer = await asyncio.to_thread(self.store.range, app, int(series.ts[-1]) + 1)
+                if newer:
+                    addition = RankSeries.from_samples(newer)
+                    series = RankSeries(np.concatenate((series.ts, addition.ts)), np.concatenate((series.ranks, addition.ranks)))
+                series = series.between(start)
+            self._series[app] = series
+            return series
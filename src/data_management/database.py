@@ -6,13 +6,15 @@
 #  Everyone is permitted to copy and distribute verbatim copies
 #  of this license document, but changing it is not allowed.
 
-import json
-from datetime import datetime
-import aiofiles
+from datetime import datetime, timezone
 import os 
+import sqlite3
+
+from data_management.history_store import history_store
+from data_management.aggregates import rank_aggregates
+from data_management.journal import JournaledDocument, JournalView
 
 DATA_DIR = 'data'
-LAST_EXECUTION_FILE = os.path.join(DATA_DIR, 'last_execution_time.json')
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
@@ -20,103 +22,77 @@ class AppRankTracker:
     def __init__(self, app_name, file_path):
         self.app_name = app_name
         self.file_path = file_path
+        # En lecture seule (processus suiveur), le document est écrit par le leader et seulement relu ici.
+        self.read_only = False
+        self._document = None
+        self._view = None
+
+    @property
+    def document(self):
+        """Document journalisé (snapshot + log append-only), ouvert à la première utilisation."""
+        if self.read_only:
+            if self._view is None:
+                self._view = JournalView(self.file_path)
+            return self._view
+        if self._document is None:
+            self._document = JournaledDocument(self.file_path)
+        return self._document
 
     async def save_rank(self, rank_number):
+        if self.read_only:
+            return
         now = datetime.now()
         current_datetime = now.strftime('%Y-%m-%d %H:%M:%S')
 
-        try:
-            async with aiofiles.open(self.file_path, 'r') as f:
-                data = await f.read()
-                data = json.loads(data)
-            last_saved_rank = data.get('last_rank')
-        except (FileNotFoundError, json.JSONDecodeError):
-            data = {
-                'last_rank': None, 
-                'date': '',
-                'highest_rank': {'rank': None, 'timestamp': ''},
-                'lowest_rank': {'rank': None, 'timestamp': ''}
-            }
-            last_saved_rank = None
-
-        if last_saved_rank != rank_number:
+        data = self.document
+        last_saved_rank = data.get('last_rank')
+
+        if rank_number is not None and last_saved_rank != rank_number:
             rank_number = int(rank_number)
-            data['last_rank'] = rank_number
-            data['date'] = current_datetime
+            changes = {'last_rank': rank_number, 'date': current_datetime}
 
-            if data['highest_rank']['rank'] is None or rank_number < data['highest_rank']['rank']:
-                data['highest_rank'] = {'rank': rank_number, 'timestamp': current_datetime}
-            if data['lowest_rank']['rank'] is None or rank_number > data['lowest_rank']['rank']:
-                data['lowest_rank'] = {'rank': rank_number, 'timestamp': current_datetime}
+            highest_rank = data.get('highest_rank') or {'rank': None, 'timestamp': ''}
+            lowest_rank = data.get('lowest_rank') or {'rank': None, 'timestamp': ''}
+            if highest_rank['rank'] is None or rank_number < highest_rank['rank']:
+                changes['highest_rank'] = {'rank': rank_number, 'timestamp': current_datetime}
+            if lowest_rank['rank'] is None or rank_number > lowest_rank['rank']:
+                changes['lowest_rank'] = {'rank': rank_number, 'timestamp': current_datetime}
 
-            async with aiofiles.open(self.file_path, 'w') as f:
-                await f.write(json.dumps(data, indent=4))
+            data.update(changes)
             print("Rank data updated.")
         else:
             print("No need to update rank data; rank unchanged.")
 
     async def get_extreme_ranks(self):
-        """Parcourt l'historique des rangs pour trouver les extrêmes."""
+        """Renvoie les rangs extrêmes (agrégats en mémoire, sinon recherche indexée SQLite)."""
         try:
-            async with aiofiles.open(self.file_path, 'r') as file:
-                data = await file.read()
-                history = json.loads(data)
-
-            highest_rank = {'rank': float('inf'), 'timestamp': None}
-            lowest_rank = {'rank': float('-inf'), 'timestamp': None}
-
-            if not isinstance(history, dict):
-                raise ValueError("History data is not a dictionary.")
-
-            for year, months in history.items():
-                if not isinstance(months, dict):
-                    continue
-
-                for month, days in months.items():
-                    if not isinstance(days, dict):
-                        continue
-
-                    for day, ranks in days.items():
-                        for entry in ranks:
-                            rank = entry['rank']
-                            timestamp = entry['timestamp']
-                            if rank < highest_rank['rank']:
-                                highest_rank = {'rank': rank, 'timestamp': self.format_timestamp(timestamp)}
-                            if rank > lowest_rank['rank']:
-                                lowest_rank = {'rank': rank, 'timestamp': self.format_timestamp(timestamp)}
-
-            return highest_rank, lowest_rank
+            best, worst = rank_aggregates.extremes(self.app_name)
+            if best is None:
+                best, worst = await history_store.extremes_async(self.app_name)
+        except sqlite3.Error as e:
+            print(f"Failed to query the rank history: {e}")
+            return None, None
 
-        except (FileNotFoundError, json.JSONDecodeError, ValueError) as e:
-            print(f"Failed to read or parse the rank history file: {e}")
+        if best is None:
             return None, None
 
+        highest_rank = {'rank': best[0], 'timestamp': self.format_timestamp(best[1])}
+        lowest_rank = {'rank': worst[0], 'timestamp': self.format_timestamp(worst[1])}
+        return highest_rank, lowest_rank
+
     def format_timestamp(self, timestamp):
-        """Convertit un timestamp ISO en une date plus lisible."""
-        datetime_obj = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        """Convertit un timestamp ISO ou epoch en une date plus lisible."""
+        if isinstance(timestamp, (int, float)):
+            datetime_obj = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+        else:
+            datetime_obj = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
         return datetime_obj.strftime('%Y-%m-%d')
 
     async def get_date_from_json(self):
-        try:
-            async with aiofiles.open(self.file_path, 'r') as f:
-                data = await f.read()
-                data = json.loads(data)
-            date_value = data.get('date', 'No date found')
-            return date_value
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Error reading the JSON file: {e}")
-            return 'No date found'
+        return self.document.get('date', 'No date found')
 
     async def get_previous_rank(self):
-        try:
-            async with aiofiles.open(self.file_path, 'r') as f:
-                data = await f.read()
-                data = json.loads(data)
-            last_rank = data.get('last_rank', None)
-            last_date = data.get('date', None)
-            return last_rank, last_date
-        except (FileNotFoundError, json.JSONDecodeError):
-            return None, None
+        return self.document.get('last_rank'), self.document.get('date')
 
     async def compare_ranks(self, current_rank):
         previous_rank, last_date = await self.get_previous_rank()
@@ -136,17 +112,3 @@ class AppRankTracker:
             return f"``🔼 Increased by +{previous_rank - current_rank} position(s) since {last_date}``"
         else:
             return f"``🔻 Decreased by -{current_rank - previous_rank} position(s) since {last_date}``"
-
-    async def read_last_execution_times(self):
-        try:
-            async with aiofiles.open(self.file_path, 'r') as file:
-                content = await file.read()
-                return json.loads(content)
-        except FileNotFoundError:
-            return {}
-        except json.JSONDecodeError:
-            return {}
-
-    async def write_last_execution_times(self, times):
-        async with aiofiles.open(self.file_path, 'w') as file:
-            await file.write(json.dumps(times))
\ No newline at end of file
@@ -0,0 +1,239 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from config import HISTORY_DB_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rank_history (
+    app TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    PRIMARY KEY (app, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rank_history_app_rank ON rank_history (app, rank, ts);
+CREATE TABLE IF NOT EXISTS migrations (
+    source TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    rows INTEGER NOT NULL
+);
+"""
+
+def to_epoch(timestamp):
+    """Convert an ISO timestamp (naive values are taken as UTC) or a datetime to epoch seconds."""
+    if isinstance(timestamp, (int, float)):
+        return int(timestamp)
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp())
+
+class RankHistoryStore:
+    """Rank samples per app in an SQLite database (WAL mode).
+
+    Rows are clustered on (app, ts), and a secondary (app, rank, ts) index keeps
+    min/max lookups logarithmic. Every public query has an async variant that
+    runs on a worker thread so the event loop never waits on disk.
+    """
+
+    def __init__(self, path=HISTORY_DB_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def execute(self, sql, params=()):
+        with self._lock:
+            return self.connect().execute(sql, params).fetchall()
+
+    def executescript(self, script):
+        with self._lock:
+            self.connect().executescript(script)
+
+    def executemany(self, sql, rows):
+        with self._lock:
+            conn = self.connect()
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(sql, rows)
+
+    def write_batch(self, operations):
+        """Run several (sql, rows) executemany calls in one transaction."""
+        with self._lock:
+            conn = self.connect()
+            with conn:
+                conn.execute("BEGIN")
+                for sql, rows in operations:
+                    conn.executemany(sql, rows)
+
+    async def run(self, method, *args):
+        return await asyncio.to_thread(method, *args)
+
+    def add_sample(self, app, rank, ts=None):
+        ts = to_epoch(ts if ts is not None else datetime.now(timezone.utc))
+        self.execute("INSERT OR REPLACE INTO rank_history (app, ts, rank) VALUES (?, ?, ?)", (app, ts, int(rank)))
+        return ts
+
+    def add_samples(self, app, samples):
+        """Bulk insert (timestamp, rank) pairs, ignoring timestamps that are already stored."""
+        rows = [(app, to_epoch(ts), int(rank)) for ts, rank in samples]
+        self.executemany("INSERT OR IGNORE INTO rank_history (app, ts, rank) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def rank_at(self, app, ts, not_before=None):
+        """Latest (ts, rank) sample at or before ts, optionally no older than not_before."""
+        rows = self.execute(
+            "SELECT ts, rank FROM rank_history WHERE app = ? AND ts <= ? AND ts >= ? ORDER BY ts DESC LIMIT 1",
+            (app, to_epoch(ts), to_epoch(not_before) if not_before is not None else 0)
+        )
+        return rows[0] if rows else None
+
+    def latest(self, app):
+        rows = self.execute("SELECT ts, rank FROM rank_history WHERE app = ? ORDER BY ts DESC LIMIT 1", (app,))
+        return rows[0] if rows else None
+
+    def range(self, app, start, end=None):
+        """All (ts, rank) samples of app between start and end (inclusive), oldest first."""
+        end = to_epoch(end) if end is not None else 2 ** 62
+        return self.execute(
+            "SELECT ts, rank FROM rank_history WHERE app = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+            (app, to_epoch(start), end)
+        )
+
+    def bucketed_range(self, app, start, bucket):
+        """Min and max rank of app per `bucket` seconds since start, as (ts, rank) points, oldest first.
+
+        The aggregation runs inside SQLite, so long ranges come back as two points
+        per bucket instead of one row per sample.
+        """
+        rows = self.execute(
+            "SELECT ts / ? AS b, MIN(rank), MAX(rank) FROM rank_history WHERE app = ? AND ts >= ? GROUP BY b ORDER BY b",
+            (bucket, app, to_epoch(start))
+        )
+        points = []
+        for index, low, high in rows:
+            points.append((index * bucket, low))
+            if high != low:
+                points.append((index * bucket + bucket // 2, high))
+        return points
+
+    def extremes(self, app, start=None, end=None):
+        """Best (lowest number) and worst rank of app as ((rank, ts), (rank, ts)), earliest occurrence first.
+
+        Without bounds both lookups walk the (app, rank, ts) index, so the cost stays
+        logarithmic in the history length.
+        """
+        if start is None and end is None:
+            best = self.execute("SELECT rank FROM rank_history WHERE app = ? ORDER BY rank ASC LIMIT 1", (app,))
+            worst = self.execute("SELECT rank FROM rank_history WHERE app = ? ORDER BY rank DESC LIMIT 1", (app,))
+            bounds = (0, 2 ** 62)
+        else:
+            bounds = (to_epoch(start) if start is not None else 0, to_epoch(end) if end is not None else 2 ** 62)
+            rows = self.execute("SELECT MIN(rank), MAX(rank) FROM rank_history WHERE app = ? AND ts BETWEEN ? AND ?", (app, *bounds))
+            best, worst = ([(rows[0][0],)], [(rows[0][1],)]) if rows and rows[0][0] is not None else ([], [])
+        if not best:
+            return None, None
+        first_seen = "SELECT MIN(ts) FROM rank_history WHERE app = ? AND rank = ? AND ts BETWEEN ? AND ?"
+        best_rank, worst_rank = best[0][0], worst[0][0]
+        best_ts = self.execute(first_seen, (app, best_rank, *bounds))[0][0]
+        worst_ts = self.execute(first_seen, (app, worst_rank, *bounds))[0][0]
+        return (best_rank, best_ts), (worst_rank, worst_ts)
+
+    def count(self, app):
+        return self.execute("SELECT COUNT(*) FROM rank_history WHERE app = ?", (app,))[0][0]
+
+    async def add_sample_async(self, app, rank, ts=None):
+        return await self.run(self.add_sample, app, rank, ts)
+
+    async def rank_at_async(self, app, ts, not_before=None):
+        return await self.run(self.rank_at, app, ts, not_before)
+
+    async def latest_async(self, app):
+        return await self.run(self.latest, app)
+
+    async def range_async(self, app, start, end=None):
+        return await self.run(self.range, app, start, end)
+
+    async def bucketed_range_async(self, app, start, bucket):
+        return await self.run(self.bucketed_range, app, start, bucket)
+
+    async def extremes_async(self, app, start=None, end=None):
+        return await self.run(self.extremes, app, start, end)
+
+    def migrate_json_history(self, app, path):
+        """Import a nested year/month/day JSON history file once; re-imports only if the file changed."""
+        if not os.path.exists(path):
+            return 0
+        mtime = os.path.getmtime(path)
+        done = self.execute("SELECT mtime FROM migrations WHERE source = ?", (path,))
+        if done and done[0][0] >= mtime:
+            return 0
+
+        with open(path, 'r') as file:
+            history = json.load(file)
+
+        samples = []
+        for months in history.values() if isinstance(history, dict) else []:
+            if not isinstance(months, dict):
+                continue
+            for days in months.values():
+                if not isinstance(days, dict):
+                    continue
+                for entries in days.values():
+                    for entry in entries:
+                        try:
+                            samples.append((to_epoch(entry['timestamp']), int(entry['rank'])))
+                        except (KeyError, TypeError, ValueError):
+                            continue
+
+        inserted = self.add_samples(app, samples)
+        self.execute("INSERT OR REPLACE INTO migrations (source, mtime, rows) VALUES (?, ?, ?)", (path, mtime, inserted))
+        logging.info(f"Migrated {inserted} samples for {app} from {path}.")
+        return inserted
+
+    async def migrate_all_async(self, apps):
+        total = 0
+        for app in apps:
+            try:
+                total += await self.run(self.migrate_json_history, app.id, app.history_file)
+            except (OSError, json.JSONDecodeError, ValueError) as e:
+                logging.error(f"Failed to migrate history of {app.id}: {e}")
+        return total
+
+history_store = RankHistoryStore()
+
+if __name__ == "__main__":
+    from api.registry import registry
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    total = asyncio.run(history_store.migrate_all_async(registry))
+    print(f"Migrated {total} samples into {history_store.path}.")
@@ -0,0 +1,331 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from services.metrics import metrics
+from config import JOURNAL_FSYNC_BATCH, JOURNAL_FSYNC_INTERVAL, JOURNAL_COMPACT_EVERY
+
+_open_documents = []
+file_io_seconds = metrics.histogram('file_io_seconds', 'Time spent writing and fsyncing JSON files.', ('operation',))
+
+def atomic_write_json(path, data, indent=4):
+    """Write data to path through a temporary file and rename, so readers never see a partial file."""
+    with file_io_seconds.time(operation='atomic_write'):
+        _atomic_write_json(path, data, indent)
+
+def _atomic_write_json(path, data, indent):
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as file:
+            # json.dumps takes the C encoder fast path; json.dump streams through the Python one.
+            file.write(json.dumps(data, indent=indent))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+def _replay(log_path, state):
+    """Apply the complete records of log_path to state; (records, end of the last complete one)."""
+    records = valid_end = 0
+    try:
+        with open(log_path, 'rb') as file:
+            for line in file:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("unterminated record")
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if record.get('d'):
+                    state.pop(record['k'], None)
+                else:
+                    state[record['k']] = record['v']
+                records += 1
+                valid_end += len(line)
+    except FileNotFoundError:
+        pass
+    return records, valid_end
+
+def compacting_path(log_path):
+    """Where the log is moved while a background compaction writes the snapshot."""
+    return f"{log_path}.compacting"
+
+def _fsync_and_close(fd):
+    try:
+        with file_io_seconds.time(operation='journal_fsync'):
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def read_journal(snapshot_path, log_path):
+    """(state, log records, end of the last complete record) of a journal, without modifying it.
+
+    A log left by an interrupted background compaction is replayed before the current
+    one; its records may already be in the snapshot, which replaying again leaves as is.
+    """
+    try:
+        with open(snapshot_path, 'r') as file:
+            content = file.read()
+            state = json.loads(content) if content else {}
+    except FileNotFoundError:
+        state = {}
+    except json.JSONDecodeError as e:
+        logging.error(f"Corrupted snapshot {snapshot_path}, starting from the log only: {e}")
+        state = {}
+
+    rotated = compacting_path(log_path)
+    if os.path.exists(rotated):
+        _replay(rotated, state)
+    records, valid_end = _replay(log_path, state)
+    return state, records, valid_end
+
+class JournaledDocument:
+    """A JSON object persisted as an atomic snapshot plus an append-only NDJSON log.
+
+    Each change appends one line to the log (O(1) per write). Appends are fsynced in
+    batches, and the log is compacted into a new snapshot written with atomic_write_json
+    once it holds compact_every records, or as many records as the state if that is
+    more, so large documents are not rewritten every few changes. On load the snapshot
+    is read and the log replayed on top; a torn last line left by a crash is ignored.
+
+    Inside an event loop, the timed fsyncs and the compactions run on worker threads:
+    a compaction moves the log aside, starts a new one for the following appends, and
+    writes a copy of the state as the snapshot in the background.
+    """
+
+    def __init__(self, snapshot_path, log_path=None, fsync_batch=JOURNAL_FSYNC_BATCH,
+                 fsync_interval=JOURNAL_FSYNC_INTERVAL, compact_every=JOURNAL_COMPACT_EVERY, indent=4):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path or f"{os.path.splitext(snapshot_path)[0]}.log"
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.indent = indent
+        self.state = {}
+        self._log = None
+        self._pending = 0
+        self._log_records = 0
+        self._flush_handle = None
+        self._compaction = None
+        # Background compactions of an older generation must not overwrite a newer snapshot.
+        self._generation = 0
+        self._snapshot_lock = threading.Lock()
+        self._load()
+        _open_documents.append(self)
+
+    def _load(self):
+        self.state, self._log_records, valid_end = read_journal(self.snapshot_path, self.log_path)
+        if os.path.exists(self.log_path) and valid_end != os.path.getsize(self.log_path):
+            logging.warning(f"Ignoring torn record at the end of {self.log_path}.")
+            os.truncate(self.log_path, valid_end)
+
+        os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+        self._log = open(self.log_path, 'a')
+        if self._needs_compaction() or os.path.exists(compacting_path(self.log_path)):
+            self.compact()
+
+    def _needs_compaction(self):
+        return self._log_records >= max(self.compact_every, len(self.state))
+
+    @property
+    def closed(self):
+        return self._log is None
+
+    def get(self, key, default=None):
+        return self.state.get(key, default)
+
+    def __contains__(self, key):
+        return key in self.state
+
+    def items(self):
+        return self.state.items()
+
+    def set(self, key, value):
+        self.state[key] = value
+        self._append({'k': key, 'v': value})
+
+    def update(self, values):
+        for key, value in values.items():
+            self.set(key, value)
+
+    def replace(self, values):
+        """Replace the whole state at once, written as a new snapshot."""
+        self.state = dict(values)
+        self.compact()
+
+    def delete(self, key):
+        if key in self.state:
+            del self.state[key]
+            self._append({'k': key, 'd': 1})
+
+    def _append(self, record):
+        self._log.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._pending += 1
+        self._log_records += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if self._needs_compaction():
+            if loop is None:
+                self.compact()
+            else:
+                self._compact_in_background(loop)
+        elif self._pending >= self.fsync_batch:
+            if loop is None:
+                self.flush()
+            else:
+                self._flush_in_background()
+        elif loop is None:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.fsync_interval, self._flush_in_background)
+
+    def flush(self):
+        """Flush buffered appends and fsync the log."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._log is None or not self._pending:
+            return
+        with file_io_seconds.time(operation='journal_fsync'):
+            self._log.flush()
+            os.fsync(self._log.fileno())
+        self._pending = 0
+
+    def _flush_in_background(self):
+        """Write buffered appends to the OS here and fsync them on a worker thread."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._log is None or not self._pending:
+            return
+        self._log.flush()
+        self._pending = 0
+        # A duplicate descriptor stays valid even if the log is rotated or closed meanwhile.
+        asyncio.get_running_loop().run_in_executor(None, _fsync_and_close, os.dup(self._log.fileno()))
+
+    def _compact_in_background(self, loop):
+        if self._compaction is not None and not self._compaction.done():
+            return
+        rotated = compacting_path(self.log_path)
+        if os.path.exists(rotated):
+            # The previous background compaction failed; fold everything in now.
+            self.compact()
+            return
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        # No fsync needed: the snapshot written next holds these records.
+        self._log.close()
+        self._pending = 0
+        os.replace(self.log_path, rotated)
+        self._log = open(self.log_path, 'w')
+        self._log_records = 0
+        self._generation += 1
+        self._compaction = loop.run_in_executor(None, self._write_snapshot, dict(self.state), self._generation, rotated)
+
+    def _write_snapshot(self, state, generation, rotated):
+        with self._snapshot_lock:
+            if generation != self._generation:
+                return
+            try:
+                atomic_write_json(self.snapshot_path, state, self.indent)
+                os.remove(rotated)
+            except OSError as e:
+                logging.error(f"Background compaction of {self.snapshot_path} failed: {e}")
+
+    def compact(self):
+        """Write the current state as a new snapshot and truncate the log."""
+        self.flush()
+        self._generation += 1
+        with self._snapshot_lock:
+            atomic_write_json(self.snapshot_path, self.state, self.indent)
+            rotated = compacting_path(self.log_path)
+            if os.path.exists(rotated):
+                os.remove(rotated)
+        self._log.close()
+        self._log = open(self.log_path, 'w')
+        self._log_records = 0
+
+    def close(self):
+        if self._log is None:
+            return
+        self.compact()
+        self._log.close()
+        self._log = None
+        if self in _open_documents:
+            _open_documents.remove(self)
+
+class JournalView:
+    """Read-only view of a JournaledDocument written by another process.
+
+    The files are reread when their size or mtime changes; a record still being
+    appended is skipped until it is complete, and the files are never truncated
+    or compacted from here.
+    """
+
+    def __init__(self, snapshot_path, log_path=None):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path or f"{os.path.splitext(snapshot_path)[0]}.log"
+        self.state = {}
+        self._stamp = None
+
+    def _stat(self, path):
+        try:
+            stat = os.stat(path)
+            return stat.st_size, stat.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self):
+        stamp = (self._stat(self.snapshot_path), self._stat(self.log_path))
+        if stamp != self._stamp:
+            self.state = read_journal(self.snapshot_path, self.log_path)[0]
+            self._stamp = stamp
+
+    def get(self, key, default=None):
+        self._refresh()
+        return self.state.get(key, default)
+
+    def __contains__(self, key):
+        self._refresh()
+        return key in self.state
+
+    def items(self):
+        self._refresh()
+        return self.state.items()
+
+def close_journals():
+    """Compact and close every open journaled document (called on shutdown)."""
+    for document in list(_open_documents):
+        try:
+            document.close()
+        except OSError as e:
+            logging.error(f"Failed to close journal {document.log_path}: {e}")
@@ -0,0 +1,176 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import json
+import os
+import socket
+import time
+
+from data_management.history_store import history_store
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS subscription_mirror (
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (kind, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_subscription_mirror_user ON subscription_mirror (kind, user_id, id);
+CREATE TABLE IF NOT EXISTS subscription_ops (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    action TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    app_name TEXT,
+    record TEXT
+);
+"""
+
+class LeaderLease:
+    """A named lease in the history database, held by at most one process at a time.
+
+    acquire() takes the lease if it is free or expired, or extends it if this
+    process already holds it, in a single upsert, so two processes racing for an
+    expired lease cannot both win. The holder must call it again well before
+    `ttl` seconds pass; a process that stops renewing loses the lease to the next
+    one that asks.
+    """
+
+    def __init__(self, name='scraper', ttl=30, store=history_store, holder=None):
+        self.name = name
+        self.ttl = ttl
+        self.store = store
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}"
+        self._schema_ready = False
+
+    def _ensure_schema(self):
+        if not self._schema_ready:
+            self.store.executescript(SCHEMA)
+            self._schema_ready = True
+
+    def acquire(self):
+        """Take or renew the lease; True if this process holds it afterwards."""
+        self._ensure_schema()
+        now = time.time()
+        self.store.execute(
+            "INSERT INTO leases (name, holder, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires = excluded.expires "
+            "WHERE leases.holder = excluded.holder OR leases.expires < ?",
+            (self.name, self.holder, now + self.ttl, now)
+        )
+        return self.current_holder() == self.holder
+
+    def current_holder(self):
+        self._ensure_schema()
+        rows = self.store.execute("SELECT holder, expires FROM leases WHERE name = ?", (self.name,))
+        if not rows or rows[0][1] < time.time():
+            return None
+        return rows[0][0]
+
+    def release(self):
+        """Give the lease up now, so another process takes over without waiting for it to expire."""
+        self._ensure_schema()
+        self.store.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder))
+
+class SharedSubscriptions:
+    """Alerts and notifications shared between the leader and follower processes.
+
+    The leader owns the subscription journals and mirrors every record into
+    subscription_mirror, where followers read them by user. Followers never write
+    the journals: their changes are queued in subscription_ops, which the leader
+    applies in order and deletes in the same transaction that mirrors the result.
+    Until then a follower overlays its user's queued changes on the mirror, so a
+    new alert shows up in /myalerts right away.
+    """
+
+    def __init__(self, store=history_store):
+        self.store = store
+        self._schema_ready = False
+
+    def _ensure_schema(self):
+        if not self._schema_ready:
+            self.store.executescript(SCHEMA)
+            self._schema_ready = True
+
+    def enqueue(self, kind, action, user_id, app_name=None, record=None):
+        self._ensure_schema()
+        self.store.execute(
+            "INSERT INTO subscription_ops (kind, action, user_id, app_name, record) VALUES (?, ?, ?, ?, ?)",
+            (kind, action, int(user_id), app_name, json.dumps(record) if record is not None else None)
+        )
+
+    def user_records(self, kind, user_id, canonical=None):
+        """Records of user_id as the leader will hold them once the queued changes are applied.
+
+        canonical maps an app name to its registry id, to match removals by app.
+        """
+        self._ensure_schema()
+        canonical = canonical or (lambda name: name)
+        records = [json.loads(record) for record, in self.store.execute(
+            "SELECT record FROM subscription_mirror WHERE kind = ? AND user_id = ? ORDER BY id", (kind, int(user_id)))]
+        for action, app_name, record in self.store.execute(
+                "SELECT action, app_name, record FROM subscription_ops WHERE kind = ? AND user_id = ? ORDER BY seq", (kind, int(user_id))):
+            if action == 'add':
+                records.append(json.loads(record))
+            elif app_name is None:
+                records = []
+            else:
+                records = [existing for existing in records if canonical(existing['app_name']) != canonical(app_name)]
+        return records
+
+    def remove_user_records(self, kind, user_id, app_name=None, canonical=None):
+        """Queue the removal of user_id's records (only those for app_name if given) and return them."""
+        canonical = canonical or (lambda name: name)
+        removed = [record for record in self.user_records(kind, user_id, canonical)
+                   if app_name is None or canonical(record['app_name']) == canonical(app_name)]
+        if removed:
+            self.enqueue(kind, 'remove', user_id, app_name=app_name)
+        return removed
+
+    def pending(self, after=0, limit=1000):
+        """Changes queued after seq `after`, oldest first, as (seq, kind, action, user_id, app_name, record)."""
+        self._ensure_schema()
+        rows = self.store.execute(
+            "SELECT seq, kind, action, user_id, app_name, record FROM subscription_ops WHERE seq > ? ORDER BY seq LIMIT ?",
+            (after, limit))
+        return [(seq, kind, action, user_id, app_name, json.loads(record) if record is not None else None)
+                for seq, kind, action, user_id, app_name, record in rows]
+
+    def commit(self, changes, applied_seq=None):
+        """Mirror (kind, action, record_id, record) changes and drop the queued changes up to applied_seq."""
+        self._ensure_schema()
+        # Only the last change of a record counts: an alert added and fired in the same batch is never mirrored.
+        latest = {(kind, int(record_id)): (action, record) for kind, action, record_id, record in changes}
+        upserts = [(kind, record_id, int(record['user_id']), json.dumps(record))
+                   for (kind, record_id), (action, record) in latest.items() if action == 'added']
+        deletes = [key for key, (action, _) in latest.items() if action == 'removed']
+        operations = [
+            ("DELETE FROM subscription_mirror WHERE kind = ? AND id = ?", deletes),
+            ("INSERT OR REPLACE INTO subscription_mirror (kind, id, user_id, record) VALUES (?, ?, ?, ?)", upserts),
+        ]
+        if applied_seq is not None:
+            operations.append(("DELETE FROM subscription_ops WHERE seq <= ?", [(applied_seq,)]))
+        self.store.write_batch(operations)
+
+    def replace(self, kinds):
+        """Rewrite the whole mirror from {kind: [(record_id, record), ...]}."""
+        self._ensure_schema()
+        self.store.write_batch([
+            ("DELETE FROM subscription_mirror", [()]),
+            ("INSERT INTO subscription_mirror (kind, id, user_id, record) VALUES (?, ?, ?, ?)",
+             [(kind, int(record_id), int(record['user_id']), json.dumps(record))
+              for kind, records in kinds.items() for record_id, record in records]),
+        ])
+
+shared_subscriptions = SharedSubscriptions()
@@ -0,0 +1,256 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import json
+import logging
+import os
+
+from api.registry import registry
+from data_management.journal import JournaledDocument
+from config import SUBSCRIPTION_FLUSH_MS
+
+ALERTS_STORE_PATH = 'data/alerts_store.json'
+NOTIFS_STORE_PATH = 'data/notifs_store.json'
+# The JSON lists used before the journaled stores; imported once, then renamed to *.migrated.
+ALERTS_FILE_PATH = 'data/alerts.json'
+NOTIFS_FILE_PATH = 'data/notifs.json'
+
+class IndexedRecords:
+    """Records (alerts or notifications) by id, with secondary indexes by user id and by app.
+
+    Every add and remove updates the indexes, so per-user and per-app lookups cost
+    O(number of matching records) rather than a scan of all of them.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.by_user = {}
+        self.by_app = {}
+
+    def add(self, record_id, record):
+        self.records[record_id] = record
+        # Dicts as ordered sets: per-user listings keep their creation order.
+        self.by_user.setdefault(int(record['user_id']), {})[record_id] = None
+        self.by_app.setdefault(registry.canonical(record['app_name']), {})[record_id] = None
+
+    def remove(self, record_id):
+        record = self.records.pop(record_id, None)
+        if record is None:
+            return None
+        for index, key in ((self.by_user, int(record['user_id'])), (self.by_app, registry.canonical(record['app_name']))):
+            ids = index.get(key)
+            ids.pop(record_id, None)
+            if not ids:
+                del index[key]
+        return record
+
+    def for_user(self, user_id):
+        """(id, record) pairs of user_id."""
+        return [(record_id, self.records[record_id]) for record_id in self.by_user.get(int(user_id), ())]
+
+    def for_app(self, app):
+        return [(record_id, self.records[record_id]) for record_id in self.by_app.get(registry.canonical(app), ())]
+
+    def count_for_user(self, user_id):
+        return len(self.by_user.get(int(user_id), ()))
+
+    def clear(self):
+        self.records.clear()
+        self.by_user.clear()
+        self.by_app.clear()
+
+    def __len__(self):
+        return len(self.records)
+
+class SubscriptionRepository:
+    """Every alert and notification, held in memory and persisted as a journal.
+
+    Commands, the alert engine and the notification scheduler read and mutate the
+    records here without touching the disk on the request path. Each kind is a
+    JournaledDocument keyed by a stable record id: creating a record appends it,
+    and removing one (by a command or because the alert fired) appends a tombstone,
+    so a change never rewrites unrelated records. Appends are fsynced together at
+    most every SUBSCRIPTION_FLUSH_MS, and the log is compacted into a snapshot once
+    it is as large as the data. Listeners are called with
+    (kind, action, record_id, record) on every add and remove, so the alert index
+    and the notification schedule stay in sync without reloading.
+
+    In a follower process (see services/leadership.py) the journals belong to the
+    leader: after follow(shared), the *_async methods used by commands queue changes
+    for the leader and read the records it mirrors, until lead() loads the journals here.
+    """
+
+    def __init__(self, alerts_path=ALERTS_STORE_PATH, notifs_path=NOTIFS_STORE_PATH,
+                 legacy_paths=(ALERTS_FILE_PATH, NOTIFS_FILE_PATH), flush_interval=SUBSCRIPTION_FLUSH_MS / 1000,
+                 autoload=True):
+        self.paths = {'alerts': alerts_path, 'notifs': notifs_path}
+        self.legacy_paths = dict(zip(('alerts', 'notifs'), legacy_paths))
+        self.flush_interval = flush_interval
+        self.alerts = IndexedRecords()
+        self.notifs = IndexedRecords()
+        self.documents = {}
+        self.listeners = []
+        self._next_ids = {}
+        self.shared = None
+        if autoload:
+            self.load()
+
+    def _collection(self, kind):
+        return self.alerts if kind == 'alerts' else self.notifs
+
+    def _open(self, kind):
+        document = self.documents.get(kind)
+        if document is None or document.closed:
+            # Only the timer flushes: bulk removals (a rank change firing thousands of alerts) share one fsync.
+            document = self.documents[kind] = JournaledDocument(self.paths[kind], fsync_batch=float('inf'),
+                                                                fsync_interval=self.flush_interval, indent=None)
+        return document
+
+    def _migrate(self, kind, document):
+        path = self.legacy_paths.get(kind)
+        if not path or not os.path.exists(path):
+            return
+        if len(document.state):
+            logging.warning(f"Ignoring {path}: {self.paths[kind]} already holds the {kind}.")
+            return
+        try:
+            with open(path, 'r') as file:
+                content = file.read()
+                records = json.loads(content) if content else []
+        except json.JSONDecodeError as e:
+            logging.error(f"Failed to read {path}, not migrating it: {e}")
+            return
+        document.replace({str(record_id): record for record_id, record in enumerate(records)})
+        os.replace(path, f"{path}.migrated")
+        logging.info(f"Migrated {len(records)} {kind} from {path}.")
+
+    def load(self):
+        for kind in self.paths:
+            document = self._open(kind)
+            self._migrate(kind, document)
+            collection = self._collection(kind)
+            collection.clear()
+            for record_id, record in document.items():
+                collection.add(record_id, record)
+            self._next_ids[kind] = max((int(record_id) for record_id in document.state), default=-1) + 1
+        logging.info(f"Loaded {len(self.alerts)} alert(s) and {len(self.notifs)} notification(s).")
+
+    def follow(self, shared):
+        """Queue changes to shared and read the leader's records from it instead of the journals."""
+        self.close()
+        self.alerts.clear()
+        self.notifs.clear()
+        self.shared = shared
+
+    def lead(self):
+        """Own the journals again (this process became the leader)."""
+        self.shared = None
+        self.load()
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def _notify(self, kind, action, record_id, record):
+        for listener in self.listeners:
+            try:
+                listener(kind, action, record_id, record)
+            except Exception as e:
+                logging.error(f"Subscription listener failed on {action} {kind} {record_id}: {e}")
+
+    def _add(self, kind, record):
+        record_id = str(self._next_ids[kind])
+        self._next_ids[kind] += 1
+        self._collection(kind).add(record_id, record)
+        self._open(kind).set(record_id, record)
+        self._notify(kind, 'added', record_id, record)
+        return record_id
+
+    def _remove(self, kind, record_ids):
+        collection, document = self._collection(kind), self._open(kind)
+        removed = []
+        for record_id in record_ids:
+            record = collection.remove(record_id)
+            if record is not None:
+                document.delete(record_id)
+                removed.append(record)
+                self._notify(kind, 'removed', record_id, record)
+        return removed
+
+    def add_alert(self, alert):
+        return self._add('alerts', alert)
+
+    def add_notif(self, notif):
+        return self._add('notifs', notif)
+
+    def remove_alerts(self, alert_ids):
+        return self._remove('alerts', alert_ids)
+
+    def remove_notifs(self, notif_ids):
+        return self._remove('notifs', notif_ids)
+
+    def user_alerts(self, user_id):
+        return [alert for _, alert in self.alerts.for_user(user_id)]
+
+    def user_notifs(self, user_id):
+        return [notif for _, notif in self.notifs.for_user(user_id)]
+
+    def remove_user_alerts(self, user_id, app_name=None):
+        """Remove the alerts of user_id (only those for app_name if given) and return them."""
+        app = registry.canonical(app_name) if app_name is not None else None
+        ids = [alert_id for alert_id, alert in self.alerts.for_user(user_id) if app is None or registry.canonical(alert['app_name']) == app]
+        return self.remove_alerts(ids)
+
+    def remove_user_notifs(self, user_id):
+        return self.remove_notifs([notif_id for notif_id, _ in self.notifs.for_user(user_id)])
+
+    # Commands use the async variants: in a follower they query the shared store on a worker thread.
+
+    async def add_alert_async(self, alert):
+        if self.shared is not None:
+            return await asyncio.to_thread(self.shared.enqueue, 'alerts', 'add', alert['user_id'], None, alert)
+        return self.add_alert(alert)
+
+    async def add_notif_async(self, notif):
+        if self.shared is not None:
+            return await asyncio.to_thread(self.shared.enqueue, 'notifs', 'add', notif['user_id'], None, notif)
+        return self.add_notif(notif)
+
+    async def user_alerts_async(self, user_id):
+        if self.shared is not None:
+            return await asyncio.to_thread(self.shared.user_records, 'alerts', user_id, registry.canonical)
+        return self.user_alerts(user_id)
+
+    async def user_notifs_async(self, user_id):
+        if self.shared is not None:
+            return await asyncio.to_thread(self.shared.user_records, 'notifs', user_id, registry.canonical)
+        return self.user_notifs(user_id)
+
+    async def remove_user_alerts_async(self, user_id, app_name=None):
+        if self.shared is not None:
+            app = registry.canonical(app_name) if app_name is not None else None
+            return await asyncio.to_thread(self.shared.remove_user_records, 'alerts', user_id, app, registry.canonical)
+        return self.remove_user_alerts(user_id, app_name)
+
+    async def remove_user_notifs_async(self, user_id):
+        if self.shared is not None:
+            return await asyncio.to_thread(self.shared.remove_user_records, 'notifs', user_id)
+        return self.remove_user_notifs(user_id)
+
+    def flush(self):
+        """fsync pending appends now (they are otherwise flushed every SUBSCRIPTION_FLUSH_MS)."""
+        for document in self.documents.values():
+            document.flush()
+
+    def close(self):
+        for document in self.documents.values():
+            document.close()
+
+# Loaded by the process that owns the journals (bot.setup_hook, or the elected leader in
+# services/leadership.py), never at import: worker processes import this module too.
+subscriptions = SubscriptionRepository(autoload=False)
@@ -0,0 +1,198 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import logging
+from bisect import bisect_left, bisect_right
+
+from api.registry import registry
+from data_management.subscriptions import subscriptions
+from services.metrics import metrics
+
+OPERATORS = ('>', '<', '>=', '<=', '==')
+alert_evaluation_seconds = metrics.histogram('alert_evaluation_seconds', 'Time to find the alerts triggered by a rank change.', ('app',))
+alerts_fired = metrics.counter('alerts_fired_total', 'Alerts fired, by app.', ('app',))
+
+class ThresholdList:
+    """Alert thresholds of one (app, operator) pair, kept sorted for bisect lookups."""
+
+    def __init__(self):
+        self.ranks = []
+        self.ids = []
+
+    def add(self, rank, alert_id):
+        position = bisect_right(self.ranks, rank)
+        self.ranks.insert(position, rank)
+        self.ids.insert(position, alert_id)
+
+    def remove(self, rank, alert_id):
+        start, end = bisect_left(self.ranks, rank), bisect_right(self.ranks, rank)
+        for position in range(start, end):
+            if self.ids[position] == alert_id:
+                del self.ranks[position]
+                del self.ids[position]
+                return
+
+    def sort(self):
+        pairs = sorted(zip(self.ranks, self.ids))
+        self.ranks = [rank for rank, _ in pairs]
+        self.ids = [alert_id for _, alert_id in pairs]
+
+    def bounds(self, operator, current_rank):
+        """Slice of the alerts whose condition `current_rank <operator> threshold` holds."""
+        if operator == '>':
+            return 0, bisect_left(self.ranks, current_rank)
+        if operator == '>=':
+            return 0, bisect_right(self.ranks, current_rank)
+        if operator == '<':
+            return bisect_right(self.ranks, current_rank), len(self.ranks)
+        if operator == '<=':
+            return bisect_left(self.ranks, current_rank), len(self.ranks)
+        return bisect_left(self.ranks, current_rank), bisect_right(self.ranks, current_rank)
+
+    def matching(self, operator, current_rank):
+        start, end = self.bounds(operator, current_rank)
+        return self.ids[start:end]
+
+    def pop_matching(self, operator, current_rank):
+        """Remove and return the matching ids; they are contiguous, so this is one slice deletion."""
+        start, end = self.bounds(operator, current_rank)
+        ids = self.ids[start:end]
+        del self.ranks[start:end]
+        del self.ids[start:end]
+        return ids
+
+class AlertIndex:
+    """Alerts indexed by app and operator: a rank change yields its triggered alerts in O(log n + k).
+
+    Alert ids are the ones assigned by the subscription repository.
+    """
+
+    def __init__(self):
+        self.alerts = {}
+        self._thresholds = {}
+
+    def _key(self, alert):
+        return registry.canonical(alert['app_name']), alert['operator']
+
+    def add(self, alert_id, alert):
+        if alert.get('operator') not in OPERATORS:
+            logging.error(f"Unsupported operator {alert.get('operator')}")
+            return None
+        self.alerts[alert_id] = alert
+        self._thresholds.setdefault(self._key(alert), ThresholdList()).add(int(alert['rank']), alert_id)
+        return alert_id
+
+    def load(self, alerts):
+        """Replace the index content with (alert_id, alert) pairs, sorting each threshold list once
+        instead of inserting one by one."""
+        self.clear()
+        for alert_id, alert in alerts:
+            if alert.get('operator') not in OPERATORS:
+                logging.error(f"Unsupported operator {alert.get('operator')}")
+                continue
+            self.alerts[alert_id] = alert
+            thresholds = self._thresholds.setdefault(self._key(alert), ThresholdList())
+            thresholds.ranks.append(int(alert['rank']))
+            thresholds.ids.append(alert_id)
+        for thresholds in self._thresholds.values():
+            thresholds.sort()
+
+    def remove(self, alert_id):
+        alert = self.alerts.pop(alert_id, None)
+        if alert is not None:
+            self._thresholds[self._key(alert)].remove(int(alert['rank']), alert_id)
+        return alert
+
+    def clear(self):
+        self.alerts.clear()
+        self._thresholds.clear()
+
+    def triggered(self, app_id, current_rank):
+        fired = []
+        for operator in OPERATORS:
+            thresholds = self._thresholds.get((app_id, operator))
+            if thresholds:
+                fired.extend(thresholds.matching(operator, current_rank))
+        return fired
+
+    def pop_triggered(self, app_id, current_rank):
+        """Remove the alerts triggered by current_rank from the index and return their ids."""
+        fired = []
+        for operator in OPERATORS:
+            thresholds = self._thresholds.get((app_id, operator))
+            if thresholds:
+                for alert_id in thresholds.pop_matching(operator, current_rank):
+                    del self.alerts[alert_id]
+                    fired.append(alert_id)
+        return fired
+
+    def __len__(self):
+        return len(self.alerts)
+
+class AlertEngine:
+    """Evaluates alerts only when an app's rank changes.
+
+    The index follows the subscription repository: alerts added or removed by
+    commands are applied to it as they happen, and fired alerts are removed from
+    the repository, which persists them write-behind.
+    """
+
+    def __init__(self, send_alert, repository=subscriptions):
+        self.send_alert = send_alert
+        self.repository = repository
+        self.index = AlertIndex()
+        self.last_ranks = {}
+        self.evaluated_ranks = {}
+        repository.subscribe(self._on_change)
+
+    def _on_change(self, kind, action, alert_id, alert):
+        if kind != 'alerts':
+            return
+        if action == 'added':
+            self.index.add(alert_id, alert)
+            # Let the next evaluation check the new alert against the current rank.
+            self.evaluated_ranks.pop(registry.canonical(alert['app_name']), None)
+        else:
+            self.index.remove(alert_id)
+
+    def reload(self):
+        """Rebuild the index from the repository."""
+        self.index.load(self.repository.alerts.records.items())
+        self.evaluated_ranks.clear()
+        logging.info(f"Alert index loaded with {len(self.index)} alert(s).")
+
+    async def on_rank(self, app_id, rank):
+        """Fire the alerts of app_id matched by rank; does nothing if the rank has not changed."""
+        if rank is None:
+            return []
+        self.last_ranks[app_id] = rank
+        if self.evaluated_ranks.get(app_id) == rank:
+            return []
+        self.evaluated_ranks[app_id] = rank
+
+        with alert_evaluation_seconds.time(app=app_id):
+            fired_ids = self.index.pop_triggered(app_id, rank)
+        if not fired_ids:
+            return []
+        alerts_fired.inc(len(fired_ids), app=app_id)
+        fired = self.repository.remove_alerts(fired_ids)
+        for alert in fired:
+            await self.send_alert(alert['user_id'], alert['app_name'], rank)
+        logging.info(f"{len(fired)} alert(s) fired for {app_id} at rank {rank}.")
+        return fired
+
+    async def evaluate(self, app_name):
+        """Check the alerts of one app against its last known rank (after an alert was added)."""
+        app_id = registry.canonical(app_name)
+        if app_id in self.last_ranks:
+            await self.on_rank(app_id, self.last_ranks[app_id])
+
+    async def evaluate_all(self):
+        """Re-check every app against its last known rank (after a reload)."""
+        for app_id, rank in list(self.last_ranks.items()):
+            await self.on_rank(app_id, rank)
@@ -0,0 +1,50 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+# Runs in the chart worker processes: kept free of the bot's imports so workers stay small.
+
+import os
+
+def render_chart(path, title, rank_points, price_points):
+    """Draw rank (inverted axis) and BTC price against time into a PNG. Runs in a worker process."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+    from datetime import datetime, timezone
+
+    figure, rank_axis = plt.subplots(figsize=(10, 5), dpi=100)
+    try:
+        times = [datetime.fromtimestamp(ts, timezone.utc) for ts, _ in rank_points]
+        rank_axis.plot(times, [rank for _, rank in rank_points], color='#1f77b4', linewidth=1.5, label='App Store rank')
+        rank_axis.invert_yaxis()
+        rank_axis.set_ylabel('Rank')
+        rank_axis.grid(alpha=0.3)
+        rank_axis.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+
+        if price_points:
+            price_axis = rank_axis.twinx()
+            price_axis.plot([datetime.fromtimestamp(ts, timezone.utc) for ts, _ in price_points],
+                            [price for _, price in price_points], color='#f7931a', linewidth=1.2, label='BTC (USD)')
+            price_axis.set_ylabel('BTC (USD)')
+
+        rank_axis.set_title(title)
+        figure.autofmt_xdate()
+        figure.tight_layout()
+        # Per-process temporary name: processes sharing the cache dir may render the same chart at once.
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        figure.savefig(temp_path, format='png')
+        os.replace(temp_path, path)
+    finally:
+        plt.close(figure)
+    return path
+
+def warm_up():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot
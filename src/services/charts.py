@@ -0,0 +1,195 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import glob
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import types
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+from data_management.history_store import history_store
+from data_management.aggregates import rank_aggregates
+from services.prices import price_feed
+from services.chart_worker import render_chart, warm_up
+from api.cache import cache_requests
+from config import CHART_CACHE_DIR, CHART_MAX_POINTS, CHART_WORKERS
+
+DURATIONS = {
+    '7_days': 7 * 24 * 3600,
+    '1_month': 30 * 24 * 3600,
+    '3_months': 91 * 24 * 3600,
+    '6_months': 182 * 24 * 3600,
+    '1_year': 365 * 24 * 3600,
+}
+
+# Ranges longer than this are min/max bucketed in the database before LTTB.
+BUCKETED_SPAN = 31 * 24 * 3600
+# Superseded PNGs are kept this long, in case another process sharing the cache dir is still sending one.
+STALE_CHART_GRACE = 120
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets downsampling of (x, y) points to `threshold` points.
+
+    Keeps the first and last points and, in each bucket, the point forming the
+    largest triangle with the previously kept point and the next bucket's average,
+    which preserves peaks and troughs far better than striding.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, len(points))
+        next_bucket = points[end:next_end] or points[-1:]
+        avg_x = sum(x for x, _ in next_bucket) / len(next_bucket)
+        avg_y = sum(y for _, y in next_bucket) / len(next_bucket)
+
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+@contextmanager
+def _main_module_hidden():
+    """Start worker processes without re-importing the entry script (bot.py) in them.
+
+    multiprocessing replays __main__ in every child it starts with spawn or
+    forkserver; bot.py's module body would load the bot, its journals and discord.py.
+    """
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+class ChartRenderer:
+    """Renders app rank vs BTC price charts from the stored history.
+
+    Rendering runs in a process pool. Images are cached on disk keyed by
+    (app, duration, last rank sample, last price sample), so a chart is only
+    re-rendered once new data has arrived; concurrent requests for the same
+    chart share one render. Long ranges are min/max bucketed in SQLite, and any
+    series longer than CHART_MAX_POINTS is downsampled with LTTB before it is
+    sent to the worker.
+    """
+
+    def __init__(self, store=history_store, price_source=None, cache_dir=CHART_CACHE_DIR,
+                 max_points=CHART_MAX_POINTS, workers=CHART_WORKERS):
+        self.store = store
+        self.price_source = price_source
+        self.cache_dir = cache_dir
+        self.max_points = max_points
+        self.workers = workers
+        self._pool = None
+        self._rendered = {}
+        self._inflight = {}
+
+    def start(self):
+        """Create the process pool and import matplotlib in it ahead of the first request."""
+        if self._pool is None:
+            # Not fork: by now aiohttp, SQLite and to_thread workers may hold locks a forked child would inherit.
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['services.chart_worker'])
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            # Workers are started by these submits, so none of them imports bot.py.
+            with _main_module_hidden():
+                for _ in range(self.workers):
+                    self._pool.submit(warm_up)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _version(self, app):
+        aggregates = rank_aggregates.apps.get(app)
+        rank_ts = aggregates.last_ts if aggregates and aggregates.last_ts else None
+        if rank_ts is None:
+            latest = await self.store.latest_async(app)
+            rank_ts = latest[0] if latest else 0
+        price_ts = self.price_source.last_ts() if self.price_source else 0
+        return rank_ts, price_ts
+
+    async def chart(self, app, duration):
+        """Path of the chart PNG of app over duration, or None if there is no data to plot."""
+        version = await self._version(app)
+        cached = self._rendered.get((app, duration))
+        if cached and cached[0] == version and os.path.exists(cached[1]):
+            cache_requests.inc(cache='chart', result='hit')
+            return cached[1]
+        cache_requests.inc(cache='chart', result='miss')
+
+        key = (app, duration, version)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._render(app, duration, version))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _render(self, app, duration, version):
+        path = os.path.join(self.cache_dir, f"{app}_{duration}_{version[0]}_{version[1]}.png")
+        if not os.path.exists(path):
+            span = DURATIONS[duration]
+            start = int(time.time()) - span
+            if span > BUCKETED_SPAN:
+                # Min/max buckets computed in SQLite, then LTTB down to the final size.
+                rank_points = await self.store.bucketed_range_async(app, start, max(1, span // self.max_points))
+            else:
+                rank_points = await self.store.range_async(app, start)
+            if not rank_points:
+                return None
+            price_points = await self.price_source.range_async(start) if self.price_source else []
+            rank_points = lttb(rank_points, self.max_points)
+            price_points = lttb(price_points, self.max_points)
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.start()
+            title = f"{app.capitalize()} rank vs BTC, {duration.replace('_', ' ')}"
+            started = time.perf_counter()
+            await asyncio.get_running_loop().run_in_executor(self._pool, render_chart, path, title, rank_points, price_points)
+            logging.info(f"Rendered {path} in {(time.perf_counter() - started) * 1000:.0f} ms.")
+
+        self._remove_stale(app, duration, version)
+        self._rendered[(app, duration)] = (version, path)
+        return path
+
+    def _remove_stale(self, app, duration, version):
+        """Delete the PNGs of app/duration older than version, once STALE_CHART_GRACE has passed."""
+        prefix = os.path.join(self.cache_dir, f"{app}_{duration}_")
+        for stale in glob.glob(f"{prefix}*.png"):
+            try:
+                stale_version = tuple(int(part) for part in stale[len(prefix):-len('.png')].split('_'))
+            except ValueError:
+                continue
+            if len(stale_version) != 2 or stale_version == version or stale_version[0] > version[0] or stale_version[1] > version[1]:
+                continue
+            try:
+                if time.time() - os.path.getmtime(stale) > STALE_CHART_GRACE:
+                    os.remove(stale)
+            except FileNotFoundError:
+                pass
+
+chart_renderer = ChartRenderer(price_source=price_feed)
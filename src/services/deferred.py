@@ -0,0 +1,99 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+import discord
+
+from api.apps import current_rank
+from api.cache import rank_cache
+from config import FRESH_FETCH_DEADLINE
+
+class ReplyError(Exception):
+    """Raised by a reply builder to answer with an ephemeral message instead of the embed."""
+
+class Reply:
+    def __init__(self, embed=None, files=None, content=None):
+        self.embed = embed
+        self.files = files or []
+        self.content = content
+
+class DeferredResponder:
+    """Acknowledges slash commands right away and edits the response once it is built.
+
+    respond() defers the interaction (Discord's 3-second window only covers the
+    acknowledgement), awaits the builder, then edits the original response. Time
+    to acknowledge and time to complete are recorded per command.
+    """
+
+    def __init__(self, history=1000):
+        self._ack = deque(maxlen=history)
+        self._total = deque(maxlen=history)
+        self.failed = 0
+
+    async def respond(self, interaction, build):
+        created = interaction.created_at.timestamp() if interaction.created_at else time.time()
+        await interaction.response.defer(thinking=True)
+        self._ack.append(time.time() - created)
+        try:
+            reply = await build()
+            await interaction.edit_original_response(content=reply.content, embed=reply.embed, attachments=reply.files)
+        except ReplyError as e:
+            await interaction.delete_original_response()
+            await interaction.followup.send(str(e), ephemeral=True)
+        except Exception as e:
+            self.failed += 1
+            name = interaction.command.name if interaction.command else '?'
+            logging.error(f"Command {name} failed: {e}")
+            try:
+                await interaction.edit_original_response(content="🚨 Something went wrong while building this response.", embed=None, attachments=[])
+            except discord.HTTPException:
+                pass
+        finally:
+            self._total.append(time.time() - created)
+
+    def stats(self):
+        def percentile(values, p):
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(p * len(values)))] * 1000, 1) if values else 0.0
+        return {
+            'ack_p50_ms': percentile(self._ack, 0.5),
+            'ack_p99_ms': percentile(self._ack, 0.99),
+            'total_p50_ms': percentile(self._total, 0.5),
+            'total_p99_ms': percentile(self._total, 0.99),
+            'failed': self.failed,
+        }
+
+async def within_deadline(awaitable, deadline=FRESH_FETCH_DEADLINE, default=None):
+    """Result of awaitable, or default if it takes longer than deadline seconds.
+
+    The awaitable is shielded, so a slow fetch keeps running and fills the cache for the next call.
+    """
+    try:
+        return await asyncio.wait_for(asyncio.shield(asyncio.ensure_future(awaitable)), deadline)
+    except asyncio.TimeoutError:
+        return default
+
+async def rank_with_staleness(app_id, deadline=FRESH_FETCH_DEADLINE):
+    """(rank, age in seconds) of app_id: a fresh rank with age None, or the last known one if the fetch is too slow."""
+    rank = await within_deadline(current_rank(app_id), deadline)
+    if rank is not None:
+        return rank, None
+    return rank_cache.peek(app_id), rank_cache.age(app_id)
+
+def staleness_badge(age):
+    """Short note for values served from the cache after a slow fetch, e.g. '⏳ as of 4 min ago'."""
+    if age is None:
+        return ""
+    minutes = int(age // 60)
+    return f"⏳ as of {minutes} min ago" if minutes else f"⏳ as of {int(age)} s ago"
+
+deferred_responder = DeferredResponder()
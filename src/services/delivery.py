@@ -0,0 +1,181 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+
+import discord
+
+from services.metrics import metrics
+from config import DM_WORKERS, DM_MAX_RETRIES, DM_CONTEXT_TTL, DM_USER_CACHE_SIZE
+
+MAX_EMBEDS_PER_MESSAGE = 10
+dm_delivery_seconds = metrics.histogram('dm_delivery_seconds', 'Time from queueing a direct message to its delivery.',
+                                        buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0))
+
+class DeliveryQueue:
+    """Fan-out queue for direct messages.
+
+    Callers enqueue a builder `build(user, context) -> (embed, files)` per message.
+    Messages to the same user that are still queued are coalesced into one send
+    (up to 10 embeds), a bounded pool of workers delivers them, User objects are
+    cached instead of fetched for every send, and the shared context (e.g. market
+    sentiment) is computed once per DM_CONTEXT_TTL seconds rather than per message.
+    Rate-limit and server errors are retried with backoff, pausing every worker.
+    """
+
+    def __init__(self, bot, prepare=None, workers=DM_WORKERS, max_retries=DM_MAX_RETRIES,
+                 context_ttl=DM_CONTEXT_TTL, user_cache_size=DM_USER_CACHE_SIZE):
+        self.bot = bot
+        self.prepare = prepare
+        self.workers = workers
+        self.max_retries = max_retries
+        self.context_ttl = context_ttl
+        self.user_cache_size = user_cache_size
+        self._pending = {}
+        self._ready = asyncio.Queue()
+        self._users = OrderedDict()
+        self._tasks = []
+        self._context = None
+        self._context_expires = 0.0
+        self._context_lock = asyncio.Lock()
+        self._paused_until = 0.0
+        self._latencies = deque(maxlen=1000)
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.retries = 0
+        metrics.gauge('dm_queue_depth', 'Direct messages waiting to be delivered.', function=self.depth)
+
+    def send(self, user_id, build):
+        """Queue a message for user_id; returns immediately."""
+        entry = (build, time.monotonic())
+        if user_id in self._pending:
+            self._pending[user_id].append(entry)
+            self.coalesced += 1
+        else:
+            self._pending[user_id] = [entry]
+            self._ready.put_nowait(user_id)
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def join(self):
+        """Wait until every queued message has been delivered or dropped."""
+        await self._ready.join()
+
+    async def get_user(self, user_id):
+        user = self.bot.get_user(user_id) or self._users.get(user_id)
+        if user is None:
+            user = await self.bot.fetch_user(user_id)
+        self._users[user_id] = user
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.user_cache_size:
+            self._users.popitem(last=False)
+        return user
+
+    async def context(self):
+        if self.prepare is None:
+            return None
+        async with self._context_lock:
+            if time.monotonic() >= self._context_expires:
+                self._context = await self.prepare()
+                self._context_expires = time.monotonic() + self.context_ttl
+            return self._context
+
+    async def _worker(self):
+        while True:
+            user_id = await self._ready.get()
+            entries = self._pending.pop(user_id, [])
+            try:
+                await self._deliver_all(user_id, entries)
+            except Exception as e:
+                self.failed += len(entries)
+                logging.error(f"An error occurred while sending a message to {user_id}: {e}")
+            finally:
+                self._ready.task_done()
+
+    async def _deliver_all(self, user_id, entries):
+        try:
+            user = await self.get_user(user_id)
+        except discord.NotFound:
+            logging.warning(f"User {user_id} not found.")
+            self.failed += len(entries)
+            return
+        context = await self.context()
+        for start in range(0, len(entries), MAX_EMBEDS_PER_MESSAGE):
+            chunk = entries[start:start + MAX_EMBEDS_PER_MESSAGE]
+            if await self._deliver(user, chunk, context):
+                now = time.monotonic()
+                self.sent += len(chunk)
+                for _, queued in chunk:
+                    self._latencies.append(now - queued)
+                    dm_delivery_seconds.observe(now - queued)
+            else:
+                self.failed += len(chunk)
+
+    async def _deliver(self, user, chunk, context):
+        for attempt in range(self.max_retries + 1):
+            wait = self._paused_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            # Files are rebuilt on every attempt: a discord.File can only be sent once.
+            embeds, files = [], {}
+            for build, _ in chunk:
+                embed, embed_files = build(user, context)
+                embeds.append(embed)
+                for file in embed_files:
+                    if file.filename in files:
+                        file.close()
+                    else:
+                        files[file.filename] = file
+            try:
+                await user.send(embeds=embeds, files=list(files.values()))
+                return True
+            except discord.Forbidden:
+                logging.warning(f"Cannot send messages to {user.id}, their DMs are closed.")
+                return False
+            except discord.HTTPException as e:
+                if e.status != 429 and e.status < 500 or attempt == self.max_retries:
+                    logging.error(f"Failed to send message to {user.id}: {e}")
+                    return False
+                delay = getattr(e, 'retry_after', None) or 2 ** attempt
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                self.retries += 1
+                logging.warning(f"Delivery to {user.id} got HTTP {e.status}, retrying in {delay:.1f}s.")
+            finally:
+                for file in files.values():
+                    file.close()
+        return False
+
+    def depth(self):
+        return sum(len(entries) for entries in self._pending.values())
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+        percentile = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else 0.0
+        return {
+            'queued_users': self._ready.qsize(),
+            'queued_messages': sum(len(entries) for entries in self._pending.values()),
+            'sent': self.sent,
+            'failed': self.failed,
+            'coalesced': self.coalesced,
+            'retries': self.retries,
+            'latency_p50_ms': percentile(0.5),
+            'latency_p99_ms': percentile(0.99),
+        }
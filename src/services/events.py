@@ -0,0 +1,115 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+@dataclass(frozen=True)
+class RankSampled:
+    """Published for every successful scrape, changed or not."""
+    app: str
+    rank: int
+    ts: int
+    created: float = field(default_factory=time.monotonic)
+
+@dataclass(frozen=True)
+class RankChanged:
+    """Published when an app's rank differs from the previous sample."""
+    app: str
+    rank: int
+    previous: int
+    ts: int
+    created: float = field(default_factory=time.monotonic)
+
+class Subscription:
+    def __init__(self, name, handler, max_queue):
+        self.name = name
+        self.handler = handler
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.task = None
+        self.handled = 0
+        self.dropped = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+
+    async def run(self):
+        while True:
+            event = await self.queue.get()
+            try:
+                await self.handler(event)
+            except Exception as e:
+                logging.error(f"Subscriber {self.name} failed on {type(event).__name__}: {e}")
+            finally:
+                latency = time.monotonic() - event.created
+                self.handled += 1
+                self.last_latency = latency
+                self.max_latency = max(self.max_latency, latency)
+                self.queue.task_done()
+
+class EventBus:
+    """In-process publish/subscribe bus.
+
+    Each subscriber has its own queue and worker task, so a slow consumer (e.g. DMs)
+    never delays the others, and the latency from publish to handled is recorded
+    per subscriber.
+    """
+
+    def __init__(self, max_queue=10000):
+        self.max_queue = max_queue
+        self._subscriptions = {}
+        self._started = False
+
+    def subscribe(self, event_type, handler, name=None):
+        subscription = Subscription(name or getattr(handler, '__qualname__', repr(handler)), handler, self.max_queue)
+        self._subscriptions.setdefault(event_type, []).append(subscription)
+        if self._started:
+            subscription.task = asyncio.create_task(subscription.run())
+        return subscription
+
+    def publish(self, event):
+        for subscription in self._subscriptions.get(type(event), ()):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.dropped += 1
+                logging.warning(f"Subscriber {subscription.name} is lagging, dropped {type(event).__name__}.")
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        for subscription in self.subscriptions():
+            subscription.task = asyncio.create_task(subscription.run())
+
+    async def join(self):
+        """Wait until every queued event has been handled."""
+        for subscription in self.subscriptions():
+            await subscription.queue.join()
+
+    async def stop(self):
+        for subscription in self.subscriptions():
+            if subscription.task:
+                subscription.task.cancel()
+        self._started = False
+
+    def subscriptions(self):
+        return [subscription for subscriptions in self._subscriptions.values() for subscription in subscriptions]
+
+    def stats(self):
+        return {
+            subscription.name: {
+                'handled': subscription.handled,
+                'dropped': subscription.dropped,
+                'queued': subscription.queue.qsize(),
+                'last_latency_ms': round(subscription.last_latency * 1000, 2),
+                'max_latency_ms': round(subscription.max_latency * 1000, 2),
+            }
+            for subscription in self.subscriptions()
+        }
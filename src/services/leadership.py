@@ -0,0 +1,149 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import logging
+import os
+import sqlite3
+
+from api.apps import set_rank_source
+from data_management.history_store import history_store
+from data_management.journal import close_journals
+from data_management.shared_state import LeaderLease, shared_subscriptions
+from data_management.subscriptions import subscriptions
+from services.prices import price_feed
+from services.metrics import metrics
+from tracker import RankTracker
+from config import LEADER_LEASE_TTL, LEADER_SYNC_INTERVAL
+
+async def stored_rank(app_id):
+    """Last rank the leader stored in the history database."""
+    sample = await history_store.latest_async(app_id)
+    return sample[1] if sample else None
+
+class Coordinator:
+    """Elects the one process that scrapes when the bot runs as several processes.
+
+    Every process serves the commands of its own shards. The holder of the
+    'scraper' lease (see LeaderLease) also runs the RankTracker: polling, history,
+    alerts, notifications and DMs, and it alone writes the JSON journals. The others
+    follow: ranks and the BTC price come from the history database the leader
+    writes, subscription changes go through SharedSubscriptions, and the per-app
+    rank documents are only read. So the App Store sees one scraper however many
+    processes serve commands.
+
+    The lease is renewed every third of its ttl. When it expires (the leader died
+    or hung) the next follower to ask becomes the leader; a leader that finds it
+    lost the lease exits at once rather than keep writing next to the new one.
+    """
+
+    def __init__(self, bot, documents=(), lease=None, shared=shared_subscriptions, repository=subscriptions,
+                 sync_interval=LEADER_SYNC_INTERVAL):
+        self.bot = bot
+        self.documents = list(documents)
+        self.lease = lease or LeaderLease(ttl=LEADER_LEASE_TTL)
+        self.shared = shared
+        self.repository = repository
+        self.sync_interval = sync_interval
+        self.is_leader = False
+        self._changes = []
+        self._applied_seq = 0
+        self._tasks = []
+        repository.subscribe(self._on_change)
+        metrics.gauge('leader', '1 in the process that holds the scraper lease, 0 in the others.',
+                      function=lambda: int(self.is_leader))
+
+    def _on_change(self, kind, action, record_id, record):
+        if self.is_leader:
+            self._changes.append((kind, action, record_id, record))
+
+    def follow(self):
+        self.repository.follow(self.shared)
+        set_rank_source(stored_rank)
+        for document in self.documents:
+            document.read_only = True
+
+    async def run(self):
+        self.follow()
+        while True:
+            try:
+                held = await asyncio.to_thread(self.lease.acquire)
+            except sqlite3.Error as e:
+                logging.error(f"Failed to renew the leader lease: {e}")
+                held = None
+
+            if held and not self.is_leader:
+                await self.promote()
+            elif held is False and self.is_leader:
+                # Another process may already be writing the journals: exit without flushing anything.
+                logging.critical(f"{self.lease.holder} lost the leader lease, exiting.")
+                os._exit(1)
+            elif not self.is_leader:
+                await asyncio.to_thread(price_feed.load)
+            await asyncio.sleep(self.lease.ttl / 3)
+
+    async def promote(self):
+        logging.info(f"{self.lease.holder} holds the leader lease: scraping and delivering alerts here.")
+        set_rank_source(None)
+        for document in self.documents:
+            document.read_only = False
+        self.repository.lead()
+        await asyncio.to_thread(self.shared.replace, {
+            'alerts': list(self.repository.alerts.records.items()),
+            'notifs': list(self.repository.notifs.records.items()),
+        })
+        self.is_leader = True
+
+        self.bot.tracker = RankTracker(self.bot)
+        self._tasks = [asyncio.create_task(self.bot.tracker.run()), asyncio.create_task(self.sync())]
+
+    async def sync(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.apply_pending()
+            except sqlite3.Error as e:
+                logging.error(f"Failed to sync subscriptions with the followers: {e}")
+
+    async def apply_pending(self):
+        """Apply the followers' queued changes, then mirror every change made since the last sync."""
+        ops = await asyncio.to_thread(self.shared.pending, self._applied_seq)
+        for seq, kind, action, user_id, app_name, record in ops:
+            if action == 'add' and kind == 'alerts':
+                self.repository.add_alert(record)
+                asyncio.create_task(self.bot.tracker.alerts.evaluate(record['app_name']))
+            elif action == 'add':
+                self.repository.add_notif(record)
+            elif kind == 'alerts':
+                self.repository.remove_user_alerts(user_id, app_name)
+            else:
+                self.repository.remove_user_notifs(user_id)
+            self._applied_seq = seq
+
+        changes, self._changes = self._changes, []
+        if not changes and not ops:
+            return
+        try:
+            await asyncio.to_thread(self.shared.commit, changes, self._applied_seq)
+        except sqlite3.Error:
+            self._changes = changes + self._changes
+            raise
+
+    async def stop(self):
+        """Sync and close the journals, then hand the lease over (on shutdown)."""
+        for task in self._tasks:
+            task.cancel()
+        if not self.is_leader:
+            return
+        try:
+            await self.apply_pending()
+        except sqlite3.Error as e:
+            logging.error(f"Failed to sync subscriptions before shutdown: {e}")
+        self.is_leader = False
+        close_journals()
+        await asyncio.to_thread(self.lease.release)
@@ -0,0 +1,267 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from aiohttp import web
+
+from config import METRICS_HOST, METRICS_PORT, METRICS_LOG_INTERVAL
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _snapshot(self):
+        """Sorted (key, value) pairs, read under the lock: observe() runs on worker threads too."""
+        with self._lock:
+            return sorted(self._values.items())
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        lines = self.header()
+        for key, value in self._snapshot():
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+    def summary(self):
+        return {','.join(key) or 'total': value for key, value in self._snapshot()}
+
+class Gauge(Metric):
+    """A value that goes up and down; with `function` it is read on every scrape instead of set."""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), function=None):
+        super().__init__(name, documentation, labels)
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _current(self):
+        if self.function is None:
+            return self._snapshot()
+        try:
+            return [((), self.function())]
+        except Exception as e:
+            logging.error(f"Failed to read gauge {self.name}: {e}")
+            return []
+
+    def render(self):
+        lines = self.header()
+        for key, value in self._current():
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+    def summary(self):
+        return {','.join(key) or 'value': value for key, value in self._current()}
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram (seconds by default), one series per label combination."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (not cumulative), then count and sum.
+                series = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _snapshot(self):
+        with self._lock:
+            return sorted((key, (list(counts), total, value_sum)) for key, (counts, total, value_sum) in self._values.items())
+
+    def quantile(self, q, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            series = (list(series[0]), series[1], series[2]) if series else None
+        return self._quantile(series, q) if series else None
+
+    def _quantile(self, series, q):
+        """Upper bound of the bucket holding the q-th observation (an over-estimate by at most one bucket)."""
+        counts, total, _ = series
+        target, seen = q * total, 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.buckets[-1]
+
+    def render(self):
+        lines = self.header()
+        for key, (counts, total, value_sum) in self._snapshot():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, ('le', _format_value(bound)))} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(value_sum)}")
+            lines.append(f"{self.name}_count{labels} {total}")
+        return lines
+
+    def summary(self):
+        return {
+            ','.join(key) or 'all': {
+                'count': series[1],
+                'mean_ms': round(series[2] / series[1] * 1000, 2),
+                'p50_ms': round(self._quantile(series, 0.5) * 1000, 2),
+                'p99_ms': round(self._quantile(series, 0.99) * 1000, 2),
+            }
+            for key, series in self._snapshot() if series[1]
+        }
+
+class MetricsRegistry:
+    """Process-wide metrics, rendered in the Prometheus text format.
+
+    counter()/gauge()/histogram() return the existing metric when called twice
+    with the same name, so modules can declare their metrics at import time.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, cls, name, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name, documentation, labels=(), function=None):
+        gauge = self._register(Gauge, name, documentation, labels)
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labels, buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        return {name: metric.summary() for name, metric in self._metrics.items()}
+
+    async def log_summary(self, interval=METRICS_LOG_INTERVAL):
+        """Log every metric once per interval seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            for name, values in self.summary().items():
+                if values:
+                    logging.info(f"metrics {name}: {values}")
+
+metrics = MetricsRegistry()
+
+class MetricsServer:
+    """Serves GET /metrics from the bot's own event loop; port 0 disables it."""
+
+    def __init__(self, registry=metrics, host=METRICS_HOST, port=METRICS_PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def handle(self, request):
+        return web.Response(text=self.registry.render(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+    async def start(self):
+        if not self.port or self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            logging.error(f"Could not serve metrics on {self.host}:{self.port}: {e}")
+            await self.stop()
+            return
+        logging.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+metrics_server = MetricsServer()
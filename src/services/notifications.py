@@ -0,0 +1,165 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import count
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from api.registry import registry
+from data_management.journal import JournaledDocument
+from data_management.subscriptions import subscriptions
+from config import NOTIF_DEFAULT_TIMEZONE
+
+NOTIF_STATE_PATH = 'data/notif_state.json'
+RETRY_DELAY = 60
+
+def notification_timezone(notif):
+    try:
+        return ZoneInfo(notif.get('timezone') or NOTIF_DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        logging.warning(f"Unknown time zone {notif.get('timezone')}, using {NOTIF_DEFAULT_TIMEZONE}.")
+        return ZoneInfo(NOTIF_DEFAULT_TIMEZONE)
+
+def week_key(day):
+    return day.strftime('%Y-%U')
+
+def next_due(notif, after):
+    """Next UTC instant at which notif should be sent, strictly after `after` (an aware datetime).
+
+    Daily notifications fire at `hour` in the user's time zone; weekly ones fire at
+    `hour` on the first day of the week (Sunday, matching the %U week numbering).
+    """
+    tz = notification_timezone(notif)
+    hour, minute = (int(part) for part in notif['hour'].split(':'))
+    local_after = after.astimezone(tz)
+    day = local_after.date()
+    if notif['interval'] == 'weekly':
+        day -= timedelta(days=(day.weekday() + 1) % 7)
+        step = timedelta(days=7)
+    else:
+        step = timedelta(days=1)
+
+    while True:
+        candidate = datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz)
+        already_sent = (notif.get('last_sent_day') == day.isoformat() if notif['interval'] != 'weekly'
+                        else notif.get('last_sent_week') == week_key(day))
+        if candidate > local_after and not already_sent:
+            return candidate.astimezone(timezone.utc)
+        day += step
+
+def notification_key(notif):
+    return f"{notif['user_id']}:{registry.canonical(notif['app_name'])}:{notif['interval']}:{notif['hour']}"
+
+class NotificationScheduler:
+    """Min-heap of notifications keyed on their next due instant.
+
+    The scheduler sleeps until the earliest due time (or until a change wakes it),
+    sends everything due, and appends the new last_sent_* state to a journal
+    instead of rewriting notifs.json. Notifications added or removed in the
+    subscription repository are scheduled or dropped as they happen; a heap entry
+    is only honoured if it is still the latest one pushed for its notification.
+    """
+
+    def __init__(self, send_notif, get_rank, repository=subscriptions, state_path=NOTIF_STATE_PATH):
+        self.send_notif = send_notif
+        self.get_rank = get_rank
+        self.repository = repository
+        self.sent_state = JournaledDocument(state_path)
+        self.notifications = {}
+        self._heap = []
+        self._scheduled = {}
+        self._seq = count()
+        self._wake = asyncio.Event()
+        repository.subscribe(self._on_change)
+
+    def _on_change(self, kind, action, notif_id, notif):
+        if kind != 'notifs':
+            return
+        if action == 'added':
+            self._schedule(notif_id, notif, datetime.now(timezone.utc))
+            self._wake.set()
+        else:
+            self.notifications.pop(notif_id, None)
+            self._scheduled.pop(notif_id, None)
+
+    def _schedule(self, notif_id, notif, now):
+        # A copy merged with the journaled send state; the repository record stays as the user set it.
+        notif = {**notif, **self.sent_state.get(notification_key(notif), {})}
+        try:
+            due = next_due(notif, now)
+        except (KeyError, ValueError) as e:
+            logging.error(f"Invalid notification {notif}: {e}")
+            return
+        self.notifications[notif_id] = notif
+        self._push(notif_id, due)
+
+    def reload(self):
+        """Rebuild the schedule from the repository, merging the journaled send state."""
+        now = datetime.now(timezone.utc)
+        self.notifications = {}
+        self._heap = []
+        self._scheduled = {}
+        for notif_id, notif in self.repository.notifs.records.items():
+            self._schedule(notif_id, notif, now)
+        self._wake.set()
+        logging.info(f"Notification schedule loaded with {len(self.notifications)} notification(s).")
+
+    def _push(self, notif_id, due):
+        seq = next(self._seq)
+        self._scheduled[notif_id] = seq
+        heapq.heappush(self._heap, (due.timestamp(), seq, notif_id))
+
+    def next_due_in(self):
+        return self._heap[0][0] - time.time() if self._heap else None
+
+    async def run(self):
+        logging.info("Starting the notification scheduler.")
+        while True:
+            delay = self.next_due_in()
+            if delay is None or delay > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self.dispatch_due()
+            except Exception as e:
+                logging.error(f"Failed to dispatch notifications: {e}")
+
+    async def dispatch_due(self):
+        now = datetime.now(timezone.utc)
+        due = []
+        while self._heap and self._heap[0][0] <= now.timestamp():
+            _, seq, notif_id = heapq.heappop(self._heap)
+            if self._scheduled.get(notif_id) == seq:
+                due.append(notif_id)
+
+        for notif_id in due:
+            notif = self.notifications.get(notif_id)
+            if notif is None:
+                continue
+            app = registry.resolve(notif['app_name'])
+            rank = await self.get_rank(app.id) if app else None
+            if not rank:
+                self._push(notif_id, now + timedelta(seconds=RETRY_DELAY))
+                continue
+
+            await self.send_notif(notif['user_id'], notif['app_name'], notif['interval'], notif['hour'], rank)
+            sent_day = now.astimezone(notification_timezone(notif)).date()
+            state = {'last_sent_day': sent_day.isoformat()} if notif['interval'] != 'weekly' else {'last_sent_week': week_key(sent_day)}
+            notif.update(state)
+            key = notification_key(notif)
+            self.sent_state.set(key, {**self.sent_state.get(key, {}), **state})
+            self._push(notif_id, next_due(notif, now))
+        return len(due)
@@ -0,0 +1,127 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import heapq
+import logging
+import random
+import time
+
+from api.apps import scrape_rank, RankFetchError
+from api.cache import rank_cache
+from api.registry import registry
+from config import (RANK_POLL_INTERVAL, RANK_POLL_MIN_INTERVAL, RANK_POLL_MAX_INTERVAL,
+                    RANK_POLL_JITTER, RANK_BACKOFF_MAX)
+
+class AppPollState:
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self.last_rank = None
+        self.failures = 0
+        self.requests = 0
+        self.errors = 0
+
+class PollScheduler:
+    """Polls every app on its own cadence.
+
+    The cadence starts at the app's poll_interval (or RANK_POLL_INTERVAL). It is
+    halved when the rank moves and stretched by 25% while it holds, within
+    [RANK_POLL_MIN_INTERVAL, RANK_POLL_MAX_INTERVAL]. Errors back off
+    exponentially up to RANK_BACKOFF_MAX, honouring Retry-After. Every delay
+    gets +/- RANK_POLL_JITTER of random jitter so polls never line up. Hosts are
+    protected by the circuit breakers in api.circuit.
+    """
+
+    def __init__(self, on_rank, apps=None, min_interval=RANK_POLL_MIN_INTERVAL, max_interval=RANK_POLL_MAX_INTERVAL,
+                 jitter=RANK_POLL_JITTER, max_backoff=RANK_BACKOFF_MAX):
+        self.on_rank = on_rank
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.states = {app.id: AppPollState(app, app.poll_interval or RANK_POLL_INTERVAL) for app in (apps or registry)}
+        self._heap = []
+        self._tasks = set()
+        self._wake = asyncio.Event()
+
+    def _jittered(self, delay):
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _schedule(self, app_id, delay):
+        heapq.heappush(self._heap, (time.monotonic() + self._jittered(delay), app_id))
+        self._wake.set()
+
+    async def run(self):
+        logging.info(f"Starting the rank poller for {len(self.states)} app(s).")
+        # Spread the first polls over a few seconds instead of a burst.
+        for index, app_id in enumerate(self.states):
+            self._schedule(app_id, index * 2)
+        while True:
+            wait = self._heap[0][0] - time.monotonic() if self._heap else None
+            if wait is None or wait > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, app_id = heapq.heappop(self._heap)
+            task = asyncio.create_task(self._poll(self.states[app_id]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _poll(self, state):
+        app = state.app
+        try:
+            delay = await self.poll_once(state)
+        except Exception as e:
+            logging.error(f"An error occurred while polling {app.name}: {e}")
+            delay = state.interval
+        self._schedule(app.id, delay)
+
+    async def poll_once(self, state):
+        """Scrape one app, publish its rank and return the delay until its next poll."""
+        app = state.app
+        try:
+            state.requests += 1
+            rank = await scrape_rank(app.url, app.category)
+        except RankFetchError as e:
+            if e.status is None:
+                # Refused by the breaker: wait until it reopens, or, while another app's
+                # probe is in flight (retry_after 0), for a normal interval.
+                state.requests -= 1
+                return e.retry_after or state.interval
+            state.errors += 1
+            state.failures += 1
+            delay = min(self.max_backoff, state.interval * 2 ** state.failures)
+            delay = max(delay, e.retry_after or 0)
+            logging.warning(f"Failed to fetch {app.name} rank ({e}), retrying in {delay:.0f}s.")
+            return delay
+
+        state.failures = 0
+        if rank is None:
+            logging.warning(f"No rank found on the {app.name} page.")
+            return state.interval
+
+        changed = state.last_rank is not None and rank != state.last_rank
+        if changed:
+            state.interval = max(self.min_interval, state.interval / 2)
+        else:
+            state.interval = min(self.max_interval, state.interval * 1.25)
+        state.last_rank = rank
+        rank_cache.set(app.id, rank)
+        logging.info(f"Fetched {app.name} rank: {rank} (next poll in ~{state.interval:.0f}s)")
+        await self.on_rank(app.id, rank)
+        return state.interval
+
+    def stats(self):
+        return {
+            app_id: {'interval': round(state.interval, 1), 'requests': state.requests, 'errors': state.errors, 'failures': state.failures}
+            for app_id, state in self.states.items()
+        }
@@ -0,0 +1,152 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import csv
+import json
+import logging
+import sys
+import time
+
+from api.cache import RankCache
+from api.http_client import http_client
+from data_management.history_store import history_store, to_epoch
+from config import BTC_PRICE_URL, BTC_PRICE_TTL, BTC_POLL_INTERVAL
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_history (
+    ts INTEGER PRIMARY KEY,
+    price REAL NOT NULL
+);
+"""
+
+def parse_price_samples(data):
+    """(ts, price) pairs from a CoinGecko market_chart payload ({"prices": [[ms, price], ...]}),
+    a list of [ts, price] pairs or a list of {"timestamp": ..., "price": ...} objects."""
+    if isinstance(data, dict):
+        data = data.get('prices', [])
+    samples = []
+    for item in data:
+        if isinstance(item, dict):
+            ts, price = item['timestamp'], item['price']
+        else:
+            ts, price = item[0], item[1]
+        if isinstance(ts, (int, float)) and ts > 10 ** 11:
+            ts = ts / 1000  # milliseconds
+        samples.append((to_epoch(ts), float(price)))
+    return samples
+
+class PriceFeed:
+    """BTC/USD price series, polled on a schedule and stored next to the rank history.
+
+    The latest price is served from memory (latest()), so commands never wait on
+    CoinGecko. Fetches go through a TTL cache with single-flight refreshes, and
+    past prices can be bulk loaded with backfill().
+    """
+
+    def __init__(self, store=history_store, url=BTC_PRICE_URL, ttl=BTC_PRICE_TTL, poll_interval=BTC_POLL_INTERVAL):
+        self.store = store
+        self.url = url
+        self.poll_interval = poll_interval
+        self.cache = RankCache(ttl=ttl, negative_ttl=min(ttl, 30), name='btc_price')
+        self._latest = None
+        self._schema_ready = False
+
+    def _ensure_schema(self):
+        if not self._schema_ready:
+            self.store.executescript(SCHEMA)
+            self._schema_ready = True
+
+    def load(self):
+        """Restore the last stored price so latest() works before the first poll."""
+        self._ensure_schema()
+        rows = self.store.execute("SELECT ts, price FROM price_history ORDER BY ts DESC LIMIT 1")
+        if rows:
+            self._latest = rows[0]
+
+    async def _fetch(self):
+        data = await http_client.get_json(self.url)
+        price = float(data['bitcoin']['usd'])
+        ts = int(time.time())
+        await asyncio.to_thread(self.record, ts, price)
+        return price
+
+    def record(self, ts, price):
+        self._ensure_schema()
+        self.store.execute("INSERT OR REPLACE INTO price_history (ts, price) VALUES (?, ?)", (ts, price))
+        if self._latest is None or ts >= self._latest[0]:
+            self._latest = (ts, price)
+
+    async def get(self):
+        """Current price, fetched at most once per TTL; None if it was never available."""
+        price = await self.cache.get('btc', self._fetch)
+        return price if price is not None else self.latest()
+
+    def latest(self):
+        """Last known price without any network I/O, or None."""
+        return self._latest[1] if self._latest else None
+
+    def last_ts(self):
+        return self._latest[0] if self._latest else 0
+
+    async def poll(self):
+        logging.info("Starting the BTC price feed.")
+        await asyncio.to_thread(self.load)
+        while True:
+            await self.cache.refresh('btc', self._fetch)
+            await asyncio.sleep(self.poll_interval)
+
+    def range(self, start, end=None):
+        """(ts, price) samples between start and end (inclusive), oldest first."""
+        self._ensure_schema()
+        end = to_epoch(end) if end is not None else 2 ** 62
+        return self.store.execute("SELECT ts, price FROM price_history WHERE ts BETWEEN ? AND ? ORDER BY ts", (to_epoch(start), end))
+
+    async def range_async(self, start, end=None):
+        return await asyncio.to_thread(self.range, start, end)
+
+    def add_samples(self, samples):
+        self._ensure_schema()
+        rows = list(samples)
+        self.store.executemany("INSERT OR IGNORE INTO price_history (ts, price) VALUES (?, ?)", rows)
+        if rows:
+            newest = max(rows)
+            if self._latest is None or newest[0] > self._latest[0]:
+                self._latest = newest
+        return len(rows)
+
+    async def backfill(self, source):
+        """Bulk load prices from a JSON/CSV file or an http(s) URL returning JSON."""
+        if source.startswith(('http://', 'https://')):
+            samples = parse_price_samples(await http_client.get_json(source))
+        else:
+            samples = await asyncio.to_thread(self._read_file, source)
+        inserted = await asyncio.to_thread(self.add_samples, samples)
+        logging.info(f"Backfilled {inserted} BTC prices from {source}.")
+        return inserted
+
+    def _read_file(self, path):
+        with open(path, 'r') as file:
+            if path.endswith('.csv'):
+                return [(to_epoch(float(row[0]) if row[0].replace('.', '', 1).isdigit() else row[0]), float(row[1]))
+                        for row in csv.reader(file) if row and row[0] != 'timestamp']
+            return parse_price_samples(json.load(file))
+
+price_feed = PriceFeed()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    async def backfill(sources):
+        try:
+            return sum([await price_feed.backfill(source) for source in sources])
+        finally:
+            await http_client.close()
+
+    total = asyncio.run(backfill(sys.argv[1:]))
+    print(f"Backfilled {total} prices into {history_store.path}.")
@@ -0,0 +1,157 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+
+from data_management.journal import atomic_write_json
+from config import (RATE_LIMIT_USER, RATE_LIMIT_GUILD, RATE_LIMIT_COMMANDS, RATE_LIMIT_MAX_KEYS,
+                    RATE_LIMIT_SNAPSHOT_PATH, RATE_LIMIT_SNAPSHOT_INTERVAL)
+
+def parse_quota(quota):
+    """'3/10' -> (3, 10.0): at most 3 calls per 10 seconds. Empty means no limit."""
+    if not quota:
+        return None
+    calls, seconds = quota.split('/')
+    return int(calls), float(seconds)
+
+def parse_command_quotas(spec):
+    """'chart=1/30,ranking-data=1/30' -> {'chart': (1, 30.0), 'ranking-data': (1, 30.0)}."""
+    quotas = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        command, quota = item.split('=')
+        quotas[command.strip()] = parse_quota(quota.strip())
+    return quotas
+
+class TokenBucketLimiter:
+    """Token buckets keyed by arbitrary strings, kept in memory.
+
+    A bucket holds up to `calls` tokens and refills at calls/seconds per second.
+    Buckets are kept in least-recently-used order; a bucket idle long enough to be
+    full again is indistinguishable from a new one, so it is evicted from the front
+    on the next check. max_keys puts a hard bound on memory. A check never awaits,
+    so it is atomic on the event loop without any lock.
+    """
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _evict(self, now):
+        while self._buckets:
+            key, (_, updated, refill) = next(iter(self._buckets.items()))
+            if now - updated < refill and len(self._buckets) <= self.max_keys:
+                break
+            self._buckets.popitem(last=False)
+
+    def peek(self, key, quota, now):
+        """Seconds to wait before key may be hit again under quota (0 if allowed now)."""
+        calls, seconds = quota
+        entry = self._buckets.get(key)
+        if entry is None:
+            return 0.0
+        tokens, updated, _ = entry
+        tokens = min(calls, tokens + (now - updated) * calls / seconds)
+        return 0.0 if tokens >= 1 else (1 - tokens) * seconds / calls
+
+    def consume(self, key, quota, now):
+        calls, seconds = quota
+        entry = self._buckets.pop(key, None)
+        tokens = calls if entry is None else min(calls, entry[0] + (now - entry[1]) * calls / seconds)
+        self._buckets[key] = (tokens - 1, now, seconds)
+        self._evict(now)
+
+    def snapshot(self):
+        """Buckets as JSON-friendly data, with wall-clock timestamps."""
+        offset = time.time() - time.monotonic()
+        return {key: [tokens, updated + offset, refill] for key, (tokens, updated, refill) in self._buckets.items()}
+
+    def restore(self, data):
+        offset = time.time() - time.monotonic()
+        for key, (tokens, updated, refill) in sorted(data.items(), key=lambda item: item[1][1]):
+            self._buckets[key] = (tokens, updated - offset, refill)
+        self._evict(time.monotonic())
+
+class CommandRateLimiter:
+    """Per-user, per-user-and-command and per-guild quotas for slash commands."""
+
+    def __init__(self, user_quota=RATE_LIMIT_USER, guild_quota=RATE_LIMIT_GUILD, command_quotas=RATE_LIMIT_COMMANDS,
+                 snapshot_path=RATE_LIMIT_SNAPSHOT_PATH, snapshot_interval=RATE_LIMIT_SNAPSHOT_INTERVAL):
+        self.user_quota = parse_quota(user_quota)
+        self.guild_quota = parse_quota(guild_quota)
+        self.command_quotas = parse_command_quotas(command_quotas)
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.buckets = TokenBucketLimiter()
+        self._snapshot_task = None
+        self.allowed = 0
+        self.rejected = 0
+
+    def hit(self, user_id, guild_id=None, command=None):
+        """Record a command call; returns 0 if it may run, else the seconds to wait.
+
+        Nothing is consumed unless every applicable quota allows the call.
+        """
+        now = time.monotonic()
+        checks = []
+        if self.user_quota:
+            checks.append((f"u:{user_id}", self.user_quota))
+        if command in self.command_quotas and self.command_quotas[command]:
+            checks.append((f"c:{command}:{user_id}", self.command_quotas[command]))
+        if guild_id is not None and self.guild_quota:
+            checks.append((f"g:{guild_id}", self.guild_quota))
+
+        retry_after = max((self.buckets.peek(key, quota, now) for key, quota in checks), default=0.0)
+        if retry_after > 0:
+            self.rejected += 1
+            return retry_after
+        for key, quota in checks:
+            self.buckets.consume(key, quota, now)
+        self.allowed += 1
+        return 0.0
+
+    def load(self):
+        if not self.snapshot_path:
+            return
+        try:
+            with open(self.snapshot_path, 'r') as file:
+                self.buckets.restore(json.load(file))
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, ValueError, TypeError) as e:
+            logging.error(f"Ignoring unreadable rate limit snapshot {self.snapshot_path}: {e}")
+
+    def snapshot(self):
+        if self.snapshot_path:
+            atomic_write_json(self.snapshot_path, self.buckets.snapshot(), indent=None)
+
+    def start(self):
+        """Restore the last snapshot and snapshot periodically, if a snapshot path is configured."""
+        if not self.snapshot_path or self._snapshot_task is not None:
+            return
+        self.load()
+        self._snapshot_task = asyncio.create_task(self._snapshot_loop())
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await asyncio.to_thread(atomic_write_json, self.snapshot_path, self.buckets.snapshot(), None)
+            except OSError as e:
+                logging.error(f"Failed to snapshot rate limits: {e}")
+
+    def stats(self):
+        return {'keys': len(self.buckets), 'allowed': self.allowed, 'rejected': self.rejected}
+
+command_limiter = CommandRateLimiter()
@@ -0,0 +1,115 @@
+#                     GNU GENERAL PUBLIC LICENSE
+#                        Version 3, 29 June 2007
+#                     SeedSnake | CryptoAppIndex
+
+#  Copyright (C) 2007 Free Software Foundation, Inc. <https://fsf.org/>
+#  Everyone is permitted to copy and distribute verbatim copies
+#  of this license document, but changing it is not allowed.
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from api.apps import fetch_ranks
+from api.cache import rank_cache
+from api.registry import registry
+from data_management.history_store import history_store, to_epoch
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentiment_history (
+    ts INTEGER PRIMARY KEY,
+    score REAL NOT NULL,
+    label TEXT NOT NULL
+);
+"""
+
+# (minimum score, label, image), checked from the top.
+SENTIMENT_LEVELS = [
+    (90, "🟢🟢🟢 Extreme Greed!", "extreme_greed.png"),
+    (80, "🟢🟢 Greed!", "greed.png"),
+    (75, "🟢 Optimism", "optimism.png"),
+    (70, "🟡 Doubt", "doubt.png"),
+    (65, "🟠 Anxiety", "anxiety.png"),
+    (50, "🔴🔴 Fear!", "fear.png"),
+    (float('-inf'), "🔴🔴🔴 Capitulation!", "capitulation.png"),
+]
+
+def sentiment_level(score):
+    """(label, image) of a sentiment score."""
+    for minimum, label, image in SENTIMENT_LEVELS:
+        if score >= minimum:
+            return label, image
+
+def weighted_average_rank(ranks):
+    """Average rank of the sentiment apps, weighted by their registry weight."""
+    apps = registry.weighted()
+    return sum(app.weight * int(ranks[app.id]) for app in apps) / sum(app.weight for app in apps)
+
+@dataclass(frozen=True)
+class Sentiment:
+    score: float
+    value: int
+    label: str
+    image: str
+    version: int
+    ts: int
+
+class SentimentService:
+    """Market sentiment computed once per rank snapshot.
+
+    The result is memoized on rank_cache.version, so every command and DM reading
+    it between two rank changes shares one computation and no network request.
+    Each new score is appended to the sentiment_history table for charting.
+    """
+
+    def __init__(self, cache=rank_cache, store=history_store):
+        self.cache = cache
+        self.store = store
+        self._current = None
+        self._schema_ready = False
+
+    def _ensure_schema(self):
+        if not self._schema_ready:
+            self.store.executescript(SCHEMA)
+            self._schema_ready = True
+
+    async def current(self):
+        """The Sentiment of the latest rank snapshot, or None if a weighted app has no rank."""
+        # Read through the cache so a rank past its TTL is refreshed rather than served stale.
+        ranks = await fetch_ranks(registry.weighted())
+        if None in ranks.values():
+            return None
+
+        version = self.cache.version
+        if self._current is not None and self._current.version == version:
+            return self._current
+
+        average = weighted_average_rank(ranks)
+        score = 100 - average
+        label, image = sentiment_level(score)
+        previous, self._current = self._current, Sentiment(score, 100 - round(average), label, image, version, int(time.time()))
+        if previous is None or previous.score != score:
+            try:
+                await asyncio.to_thread(self.record, self._current)
+            except Exception as e:
+                logging.error(f"Failed to record sentiment history: {e}")
+        return self._current
+
+    def record(self, sentiment):
+        self._ensure_schema()
+        self.store.execute(
+            "INSERT OR REPLACE INTO sentiment_history (ts, score, label) VALUES (?, ?, ?)",
+            (sentiment.ts, sentiment.score, sentiment.label)
+        )
+
+    def history(self, start, end=None):
+        """(ts, score) samples between start and end (inclusive), oldest first."""
+        self._ensure_schema()
+        end = to_epoch(end) if end is not None else 2 ** 62
+        return self.store.execute("SELECT ts, score FROM sentiment_history WHERE ts BETWEEN ? AND ? ORDER BY ts", (to_epoch(start), end))
+
+    async def history_async(self, start, end=None):
+        return await asyncio.to_thread(self.history, start, end)
+
+sentiment_service = SentimentService()
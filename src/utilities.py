@@ -6,7 +6,7 @@
 #  Everyone is permitted to copy and distribute verbatim copies
 #  of this license document, but changing it is not allowed.
 
-from api.apps import current_rank_binance, current_rank_coinbase, current_rank_cryptodotcom, current_rank_wallet
+from services.sentiment import sentiment_service, sentiment_level, weighted_average_rank
 
 def number_to_emoji(number):
     digit_to_emoji = {
@@ -23,70 +23,15 @@ def number_to_emoji(number):
         return None
 
 async def evaluate_sentiment():
-    coinbase_current_rank = await current_rank_coinbase()
-    wallet_current_rank = await current_rank_wallet()
-    binance_current_rank = await current_rank_binance()
-    cryptodotcom_current_rank = await current_rank_cryptodotcom()
-
-    if None in (coinbase_current_rank, wallet_current_rank, binance_current_rank, cryptodotcom_current_rank):
+    sentiment = await sentiment_service.current()
+    if sentiment is None:
         print("Debug: One or both ranks are None.")
         return "No data available for sentiment analysis.", None
-
-    try:
-        coinbase_current_rank = int(coinbase_current_rank)
-        wallet_current_rank = int(wallet_current_rank)
-        binance_current_rank = int(binance_current_rank)
-        cryptodotcom_current_rank = int(cryptodotcom_current_rank)
-        
-        weighted_average_rank = 100 - (5 * (coinbase_current_rank + cryptodotcom_current_rank) + 2.5 * binance_current_rank + wallet_current_rank) / 13.5
-        
-        sentiment, image_file = await evaluate_based_on_weighted_average(weighted_average_rank)
-
-        return sentiment, image_file
-
-    except TypeError as e:
-        print(f"Error in evaluate_sentiment: {e}")
-        return "Error processing rank values.", None
-
-    except ValueError as e:
-        print(f"Error converting rank values to integers: {e}")
-        return "Error processing rank values.", None
+    return sentiment.label, sentiment.image
 
 async def evaluate_based_on_weighted_average(weighted_average_rank):
-    if weighted_average_rank >= 90:
-        sentiment = "🟢🟢🟢 Extreme Greed!"
-    elif weighted_average_rank >= 80:
-        sentiment = "🟢🟢 Greed!"
-    elif weighted_average_rank >= 75:
-        sentiment = "🟢 Optimism"
-    elif weighted_average_rank >= 70:
-        sentiment = "🟡 Doubt"
-    elif weighted_average_rank >= 65:
-        sentiment = "🟠 Anxiety"
-    elif weighted_average_rank >= 50:
-        sentiment = "🔴🔴 Fear!"
-    else:
-        sentiment = "🔴🔴🔴 Capitulation!"
-
-    sentiment_images = {
-        "🟢🟢🟢 Extreme Greed!": "extreme_greed.png",
-        "🟢🟢 Greed!": "greed.png",
-        "🟢 Optimism": "optimism.png",
-        "🟡 Doubt": "doubt.png",
-        "🟠 Anxiety": "anxiety.png",
-        "🔴🔴 Fear!": "fear.png",
-        "🔴🔴🔴 Capitulation!": "capitulation.png"
-    }
-    
-    image_file = sentiment_images.get(sentiment)
-    return sentiment, image_file
+    return sentiment_level(weighted_average_rank)
 
 async def weighted_average_sentiment_calculation():
-    rank_number_coinbase = int(await current_rank_coinbase())
-    rank_number_binance = int(await current_rank_binance())
-    rank_number_wallet = int(await current_rank_wallet())
-    rank_number_cryptodotcom = int(await current_rank_cryptodotcom())
-
-    weighted_average_rank = (5 * (rank_number_coinbase + rank_number_cryptodotcom) + 2.5 * rank_number_binance + rank_number_wallet) / 13.5
-
-    return 100 - round(weighted_average_rank)
\ No newline at end of file
+    sentiment = await sentiment_service.current()
+    return sentiment.value if sentiment else None